@@ -0,0 +1,84 @@
+"""
+Celery application shared by the API and the workers
+
+Only the app, its routing and the pipeline chain live here. The API builds
+chains from task names, so it never imports the task code (and the
+extraction stack behind it); the tasks are registered by app.worker.
+"""
+
+from celery import Celery, chain
+
+from app.config import settings
+from app.services.cancellation import pipeline_task_ids
+
+celery_app = Celery(
+    "contract_tasks",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL,
+)
+
+# Each pipeline stage gets its own queue so CPU-bound extraction and
+# network-bound LLM calls can be served by differently sized worker pools.
+celery_app.conf.task_routes = {
+    "extract_contract": {"queue": settings.EXTRACT_QUEUE},
+    "parse_contract": {"queue": settings.LLM_QUEUE},
+    "score_contract": {"queue": settings.SCORE_QUEUE},
+    "remove_contract_analytics": {"queue": settings.SCORE_QUEUE},
+    "sweep_stale_contracts": {"queue": settings.SCORE_QUEUE},
+    "release_deferred": {"queue": settings.SCORE_QUEUE},
+}
+
+
+def _time_limits(budget: float) -> dict:
+    # The stages stop themselves at their budget; these only catch work
+    # that cannot be interrupted (a hung page). The prefork pool raises
+    # SoftTimeLimitExceeded first and kills the process at the hard limit.
+    # The gevent pool ignores the soft limit and raises gevent.Timeout at
+    # the hard one (handled in worker.parse_contract_task). A killed
+    # stage is failed by the sweeper (worker.sweep_stale_contracts).
+    grace = settings.STAGE_TIME_LIMIT_GRACE
+    return {"soft_time_limit": budget + grace, "time_limit": budget + 2 * grace}
+
+
+celery_app.conf.task_annotations = {
+    "extract_contract": _time_limits(settings.EXTRACTION_TIMEOUT),
+    # A stream is checked against the budget between chunks, so a stalled
+    # one can run a read timeout past it before the parser gives up
+    "parse_contract": _time_limits(settings.LLM_TIMEOUT + settings.LLM_REQUEST_TIMEOUT),
+    "score_contract": _time_limits(settings.SCORE_TIMEOUT),
+}
+celery_app.conf.beat_schedule = {
+    "sweep-stale-contracts": {
+        "task": "sweep_stale_contracts",
+        "schedule": settings.STALE_SWEEP_INTERVAL_SECONDS,
+    },
+    "release-deferred": {
+        "task": "release_deferred",
+        "schedule": settings.DEFERRED_RELEASE_INTERVAL_SECONDS,
+    },
+}
+celery_app.conf.worker_prefetch_multiplier = 1
+celery_app.conf.task_acks_late = True
+# Honour per-message priorities (0 = highest) on the Redis broker
+celery_app.conf.broker_transport_options = {
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+    "sep": ":",
+}
+
+
+def contract_pipeline(
+    contract_id: str, file_path: str, priority: int = 5, profile: bool = False
+):
+    """
+    Build the extract -> parse -> score chain for a contract. The stages get
+    fixed task ids so a cancellation can revoke them without a lookup.
+    """
+    extract_id, parse_id, score_id = pipeline_task_ids(contract_id)
+    return chain(
+        celery_app.signature(
+            "extract_contract", args=(contract_id, file_path, profile)
+        ).set(priority=priority, task_id=extract_id),
+        celery_app.signature("parse_contract").set(priority=priority, task_id=parse_id),
+        celery_app.signature("score_contract").set(priority=priority, task_id=score_id),
+    )
@@ -0,0 +1,215 @@
+"""
+Maintenance commands
+
+    python -m app.cli rebuild-analytics
+    python -m app.cli export --format parquet --since 2024-01-01T00:00:00 -o out.parquet
+    python -m app.cli batch /data/backfill -o results.ndjson --load
+    python -m app.cli compact-scores
+    python -m app.cli reindex-search
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from app.config import settings
+
+
+def get_db():
+    return MongoClient(settings.MONGO_URL)[settings.MONGO_DB]
+
+
+def rebuild_analytics(args):
+    from app.services.analytics import rebuild_rollups
+
+    count = rebuild_rollups(get_db(), batch_size=args.batch_size)
+    print(f"Rebuilt analytics rollups from {count} completed contracts")
+
+
+def export(args):
+    from app.services.export import export_cursor, get_writer, iter_export
+
+    try:
+        writer = get_writer(args.format)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    if args.after_id and not args.since:
+        sys.exit("--after-id needs --since")
+    cursor = export_cursor(
+        get_db().contracts, args.since, args.batch_size, args.after_id
+    )
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_export(cursor, writer, args.batch_size):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+    # The watermark to pass as --since and --after-id next time
+    last = "none"
+    if writer.last_completed_at:
+        since = writer.last_completed_at.isoformat()
+        last = f"--since {since} --after-id {writer.last_id}"
+    print(f"Exported {writer.rows} contracts (next: {last})", file=sys.stderr)
+
+
+def batch(args):
+    from app.services.batch import BatchRunner, find_pdfs, load_results
+
+    paths = find_pdfs(args.inputs)
+    if not paths:
+        sys.exit("No PDF files found")
+    runner = BatchRunner(args.output, args.workers, args.llm_concurrency)
+    summary = runner.run(paths)
+    with open(f"{args.output}.summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    print(
+        f"{summary['completed']} completed, {summary['failed']} failed, "
+        f"{summary['skipped']} already done in {summary['elapsed_seconds']}s "
+        f"({summary['files_per_second']} files/s, "
+        f"{summary['pages_per_second']} pages/s)",
+        file=sys.stderr,
+    )
+    if args.load:
+        count = load_results(get_db(), args.output)
+        print(f"Loaded {count} contracts into MongoDB", file=sys.stderr)
+
+
+def compact_scores(args):
+    """Rewrite label lists stored before the field codes as codes"""
+    from pymongo import UpdateOne
+
+    from app.services.field_codes import compact_scores as compact
+
+    contracts = get_db().contracts
+    cursor = contracts.find(
+        {"status": "completed", "parsed_data.missing_mask": {"$exists": False}},
+        {"parsed_data.missing_fields": 1, "parsed_data.confidence_levels": 1},
+        batch_size=args.batch_size,
+    )
+    operations, count = [], 0
+    for contract in cursor:
+        parsed_data = contract.get("parsed_data") or {}
+        update = {"$set": {}, "$unset": {}}
+        for field, value in compact(parsed_data).items():
+            update["$set"][f"parsed_data.{field}"] = value
+        for field in ("missing_fields", "confidence_levels"):
+            if field in parsed_data and f"parsed_data.{field}" not in update["$set"]:
+                update["$unset"][f"parsed_data.{field}"] = ""
+        if not update["$unset"]:
+            del update["$unset"]
+        operations.append(UpdateOne({"_id": contract["_id"]}, update))
+        if len(operations) >= args.batch_size:
+            count += contracts.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        count += contracts.bulk_write(operations, ordered=False).modified_count
+    print(f"Compacted the scores of {count} contracts")
+
+
+def reindex_search(args):
+    """Recompute the search.* filter values of completed contracts"""
+    from pymongo import UpdateOne
+
+    from app.services.search import search_fields
+
+    contracts = get_db().contracts
+    cursor = contracts.find(
+        {"status": "completed"},
+        {
+            "parsed_data.party_identification": 1,
+            "parsed_data.financial_details.currency": 1,
+            "parsed_data.revenue_classification.billing_cycle": 1,
+            "parsed_data.missing_mask": 1,
+            "parsed_data.missing_fields": 1,
+        },
+        batch_size=args.batch_size,
+    )
+    operations, count = [], 0
+    for contract in cursor:
+        fields = search_fields(contract.get("parsed_data") or {})
+        operations.append(UpdateOne({"_id": contract["_id"]}, {"$set": fields}))
+        if len(operations) >= args.batch_size:
+            count += contracts.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        count += contracts.bulk_write(operations, ordered=False).modified_count
+    print(f"Updated the search fields of {count} contracts")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Contract service maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-analytics", help="recompute the analytics rollups from scratch"
+    )
+    rebuild.add_argument("--batch-size", type=int, default=500)
+    rebuild.set_defaults(func=rebuild_analytics)
+
+    exporter = commands.add_parser(
+        "export", help="write completed contracts as NDJSON, CSV or Parquet"
+    )
+    exporter.add_argument(
+        "--format", choices=["ndjson", "csv", "parquet"], default="ndjson"
+    )
+    exporter.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="only contracts completed at or after this ISO timestamp",
+    )
+    exporter.add_argument(
+        "--after-id",
+        type=ObjectId,
+        help="with --since: skip contracts completed at that time up to this id",
+    )
+    exporter.add_argument("-o", "--output", help="file to write (default: stdout)")
+    exporter.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    exporter.set_defaults(func=export)
+
+    batcher = commands.add_parser(
+        "batch",
+        help="process PDFs offline (no API, GridFS or Celery) into NDJSON",
+    )
+    batcher.add_argument("inputs", nargs="+", help="directories, globs or files")
+    batcher.add_argument(
+        "-o",
+        "--output",
+        required=True,
+        help="NDJSON results; rerunning with the same file resumes",
+    )
+    batcher.add_argument(
+        "--workers", type=int, help="extraction processes (default: all cores)"
+    )
+    batcher.add_argument(
+        "--llm-concurrency", type=int, default=8, help="LLM requests in flight"
+    )
+    batcher.add_argument(
+        "--load", action="store_true", help="upsert the results into MongoDB"
+    )
+    batcher.set_defaults(func=batch)
+
+    compacter = commands.add_parser(
+        "compact-scores",
+        help="store missing fields and confidence of older contracts as codes",
+    )
+    compacter.add_argument("--batch-size", type=int, default=500)
+    compacter.set_defaults(func=compact_scores)
+
+    reindexer = commands.add_parser(
+        "reindex-search",
+        help="recompute the normalized search filter values of completed contracts",
+    )
+    reindexer.add_argument("--batch-size", type=int, default=500)
+    reindexer.set_defaults(func=reindex_search)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
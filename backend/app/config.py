@@ -2,7 +2,6 @@
 Configuration settings for Contract Intelligence System
 """
 
-import os
 from pydantic_settings import BaseSettings
 from typing import Optional
 from dotenv import load_dotenv
@@ -10,8 +9,6 @@ from dotenv import load_dotenv
 load_dotenv()
 from typing import Tuple
 
-print(os.getenv("ALLOWED_EXTENSIONS"))
-
 
 class Settings(BaseSettings):
     MONGO_URL: str
@@ -25,11 +22,120 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: Optional[str] = None
     GEMINI_MODEL: str = "gemini-2.5-pro"
 
+    # "fake" uses app/utils/fake_llm.py, "replay" serves recorded responses
+    LLM_PROVIDER: Optional[str] = None
+    LLM_RECORD: bool = False  # capture live prompt/response pairs
+    LLM_RECORDINGS_DIR: str = "/app/uploads/llm-recordings"
+    LLM_REPLAY_LATENCY: bool = False  # sleep for the recorded latency on replay
+    LLM_STREAMING: bool = True  # stream completions and persist sections early
+    LLM_PROMPT_CACHING: bool = True  # mark the static prompt prefix as cacheable
+    # "tiered" runs the rule extractor first and asks the LLM only for the
+    # sections scoring below RULES_MIN_CONFIDENCE; "llm" sends everything
+    EXTRACTION_MODE: str = "llm"
+    RULES_MIN_CONFIDENCE: str = "high"
+    # Memoize LLM output per clause in Redis so shared boilerplate is only
+    # extracted once
+    CLAUSE_CACHE: bool = False
+    CLAUSE_CACHE_TTL: int = 30 * 24 * 3600
+    CLAUSE_MIN_CHARS: int = 80
+    # MinHash/LSH near-duplicate index; changing the permutations or bands
+    # invalidates the stored signatures (the shingle cap only those of
+    # contracts above it, roughly 20 pages). Computed while SIMILARITY_INDEX
+    # or TEMPLATE_REUSE is on; GET /contracts/{id}/similar needs the index
+    SIMILARITY_INDEX: bool = True
+    MINHASH_PERMUTATIONS: int = 128
+    MINHASH_MAX_SHINGLES: int = 8192
+    LSH_BANDS: int = 16  # 16 bands x 8 rows: candidates from ~0.7 similarity
+    SIMILARITY_MAX_CANDIDATES: int = 50
+    # Reuse a near-duplicate's extraction and ask the LLM only for what changed
+    TEMPLATE_REUSE: bool = True
+    TEMPLATE_MATCH_THRESHOLD: float = 0.9
+    FAKE_LLM_LATENCY_DISTRIBUTION: str = "lognormal"  # constant/uniform/normal
+    FAKE_LLM_LATENCY_MS: float = 800.0
+    FAKE_LLM_LATENCY_SIGMA: float = 0.5
+    FAKE_LLM_SEED: int = 0
+
     MAX_FILE_SIZE: int = 52428800  # 50MB
     ALLOWED_EXTENSIONS: str = "pdf"
     UPLOAD_DIR: str = "/app/uploads"
 
-    EXTRACTION_TIMEOUT: int = 300  # 5 minutes
+    # Time budgets per pipeline stage, in seconds. A stage that runs out
+    # keeps what it has (pages read so far, sections the LLM finished) and
+    # moves on. Celery's time limits sit above the budgets (see celery_app)
+    # for work that cannot be interrupted; the gevent pool of the llm queue
+    # has no soft limit, so the parser keeps each provider request within
+    # the budget itself
+    EXTRACTION_TIMEOUT: int = 300  # 5 minutes, OCR included
+    OCR_TIMEOUT: int = 240
+    LLM_TIMEOUT: int = 300
+    LLM_REQUEST_TIMEOUT: float = 120.0  # client side, per provider request
+    SCORE_TIMEOUT: int = 60
+    STAGE_TIME_LIMIT_GRACE: int = 30
+    # Periodic sweep for contracts whose stage died with its worker (see
+    # services/stage_leases.py); "processing" longer than this without a
+    # running stage is failed as well (0 disables that backstop)
+    STALE_SWEEP_INTERVAL_SECONDS: int = 60
+    STALE_PROCESSING_SECONDS: int = 21600  # 6 hours
+    # Map pricing and payment-schedule tables straight to fields and send
+    # the LLM a one-line summary of each instead of the flattened cells
+    TABLE_EXTRACTION: bool = True
+    # Text extraction engines (see utils/extraction_backends.py), tried in
+    # this order until speed stats exist for a kind of document; then the
+    # fastest one that reliably yields text goes first. "ocr" is available
+    EXTRACTION_BACKENDS: str = "pdfplumber,pdfium,pypdf2"
+    EXTRACTION_PLUGINS: str = ""  # Modules that register more backends
+    EXTRACTION_MIN_SAMPLES: int = 5  # Runs per document class before ranking
+    EXTRACTION_EXPLORE_RATE: float = 0.1  # Share of runs that sample others
+
+    # Contracts read and encoded per batch by the bulk export
+    EXPORT_BATCH_SIZE: int = 500
+    # Contracts completed more recently wait for the next export (see
+    # services/export.py)
+    EXPORT_SETTLE_SECONDS: int = 60
+
+    # Celery queues per pipeline stage (see docker-compose for the pools)
+    EXTRACT_QUEUE: str = "extract"
+    LLM_QUEUE: str = "llm"
+    SCORE_QUEUE: str = "score"
+
+    # Priority classes for scheduling (page count, or bytes when unreadable)
+    SMALL_CONTRACT_PAGES: int = 10
+    MEDIUM_CONTRACT_PAGES: int = 50
+    SMALL_CONTRACT_BYTES: int = 1048576  # 1MB
+    MEDIUM_CONTRACT_BYTES: int = 10485760  # 10MB
+    DEFAULT_CONTRACT_SECONDS: float = 60.0
+    # Contracts a tenant has in flight before its further uploads drop a
+    # priority step (one more step per this many, at most 3)
+    TENANT_FAIR_SHARE_SLOTS: int = 4
+    PIPELINE_CONCURRENCY: int = 2
+
+    # Upload admission control (0 disables a limit): contracts admitted but
+    # not finished, and messages waiting in the extract queue
+    ADMISSION_MAX_INFLIGHT: int = 500
+    ADMISSION_MAX_QUEUE_DEPTH: int = 200
+    ADMISSION_THROUGHPUT_WINDOW_SECONDS: int = 300
+    ADMISSION_MAX_RETRY_AFTER: int = 900
+    # Tenants (X-Tenant-ID) allowed to use the deferred upload lane
+    BULK_TENANTS: str = ""
+    # Periodic release of deferred uploads while the pipeline has room
+    DEFERRED_RELEASE_INTERVAL_SECONDS: int = 30
+
+    # Redis hash holding each contract's status and progress for polling
+    STATUS_CACHE_TTL: int = 86400
+    QUEUE_POSITION_CACHE_SECONDS: int = 5
+    # How often a running stage polls the cancellation flag (pages, LLM chunks)
+    CANCEL_CHECK_INTERVAL_SECONDS: float = 0.5
+
+    WORKER_METRICS_PORT: int = 9100
+
+    # Log the in-flight API requests whenever the event loop is blocked longer
+    EVENT_LOOP_LAG_THRESHOLD_MS: float = 100.0
+    EVENT_LOOP_LAG_INTERVAL_MS: float = 20.0
+
+    # Opt-in stage profiling (?profile=true on upload, or a random sample)
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SLOW_SECONDS: float = 30.0
+    PROFILE_DIR: str = "/app/uploads/profiles"
 
     class Config:
         env_file = ".env"
@@ -1,27 +1,91 @@
+import asyncio
+import io
+import json
 import os
-from fastapi import FastAPI, File, Request, UploadFile
-from fastapi.responses import JSONResponse
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import FastAPI, File, Query, Request, UploadFile
 from fastapi.exceptions import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+import redis.asyncio as aioredis
 from bson import ObjectId
 from app.config import settings
-from celery import Celery
-from datetime import datetime
-from app.services.parser import ContractParser
-from app.services.scoring import ContractScorer
+from app.services.admission import (
+    bulk_tenants,
+    broker_queue_names,
+    check_admission,
+)
+from app.services.analytics import SUMMARY_ID, build_summary
+from app.services.cancellation import (
+    CANCELLABLE_STATUSES,
+    pipeline_task_ids,
+    request_cancel,
+)
+from app.services.field_codes import (
+    MISSING_FIELDS,
+    confidence_levels,
+    missing_labels,
+)
+from app.services.export import (
+    EXPORT_INDEX,
+    export_cursor,
+    get_writer,
+    stream_export,
+)
+from app.services.search import (
+    SORT_FIELDS,
+    apply_cursor,
+    build_search_query,
+    create_search_indexes,
+    page_items,
+)
+from app.services.similarity import (
+    candidate_query,
+    rank_candidates,
+    similarity_enabled,
+)
+from app.services.status_cache import (
+    TERMINAL_STATUSES,
+    queue_key,
+    read_status,
+    status_key,
+    write_status_async,
+)
+from app.services.scheduling import (
+    LOWEST_PRIORITY,
+    assign_priority,
+    classify_priority,
+    estimate_wait_seconds,
+    release_tenant_slot_async,
+    reserve_tenant_slot_async,
+)
 from app.utils.pdf_extractor import PDFExtractor
+from app.utils.loop_monitor import LoopLagMonitor
+from app.utils.tracing import should_profile, summarize_trace
+from app.utils.metrics import (
+    ADMISSION_DECISIONS,
+    CONTRACTS_CANCELLED,
+    QUEUE_DEPTH,
+    REQUEST_DURATION,
+    MongoCommandMetrics,
+    render_latest,
+)
 from app.models.contract import (
     ContractResponse,
     ContractStatus,
     ProcessingStatus,
     ContractListResponse,
     ContractData,
+    AnalyticsSummary,
+    ContractTrace,
+    ContractSearchResponse,
+    SimilarContractsResponse,
 )
-from typing import List, Optional
-from fastapi.responses import StreamingResponse
-import io
 
 app = FastAPI()
 app.add_middleware(
@@ -33,25 +97,46 @@ app.add_middleware(
 )
 
 
-celery_app = Celery(
-    "contract_tasks",
-    broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL,
-)
-
 mongodb_client = None
 db = None
 fs_bucket = None
+redis_client = None
+
+loop_monitor = LoopLagMonitor()
+
+# Extracted text is only needed by the search index; keep it out of reads
+WITHOUT_SEARCH_TEXT = {"search.text": 0}
+# Contract fields mirrored in the Redis status cache
+STATUS_FIELDS = (
+    "status",
+    "progress",
+    "error",
+    "updated_at",
+    "priority_class",
+    "priority",
+    "uploaded_at",
+)
 
 
 @app.on_event("startup")
 async def startup_db_client():
     print("Connecting to MongoDB...")
-    global mongodb_client, db, fs_bucket
+    global mongodb_client, db, fs_bucket, redis_client
     try:
-        mongodb_client = AsyncIOMotorClient(settings.MONGO_URL)
+        mongodb_client = AsyncIOMotorClient(
+            settings.MONGO_URL, event_listeners=[MongoCommandMetrics()]
+        )
         db = mongodb_client[settings.MONGO_DB]
         fs_bucket = AsyncIOMotorGridFSBucket(db)
+        await db.contracts.create_index(
+            [("status", 1), ("priority", 1), ("uploaded_at", 1)]
+        )
+        await db.contracts.create_index("similarity.bands")
+        await create_search_indexes(db.contracts)
+        await db.contracts.create_index(EXPORT_INDEX)
+        await db.analytics_vendors.create_index([("contracts", -1)])
+        redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        loop_monitor.start()
         print("Connected to MongoDB!")
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
@@ -60,96 +145,132 @@ async def startup_db_client():
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await loop_monitor.stop()
     if mongodb_client:
         try:
             print("Closing MongoDB connection...")
             mongodb_client.close()
+            if redis_client:
+                await redis_client.aclose()
         except Exception as e:
             print(f"Error closing MongoDB connection: {e}")
 
 
-# Celery task for async processing
-@celery_app.task(name="process_contract")
-def process_contract_task(contract_id: str, file_path: str):
-    """Background task to process contract"""
-    from pymongo import MongoClient
+def process_contract_task(
+    contract_id: str, file_path: str, priority: int = 5, profile: bool = False
+):
+    """The pipeline chain; Celery is only imported once there is work to send"""
+    from app.celery_app import contract_pipeline
+
+    return contract_pipeline(contract_id, file_path, priority, profile)
+
+
+def _save_upload(contract_id: str, contents: bytes) -> str:
+    """Write the worker's copy of an upload (blocking; run in a thread)"""
+    folder = settings.UPLOAD_DIR
+    os.makedirs(folder, exist_ok=True)
+    temp_file = os.path.join(folder, f"{contract_id}.pdf")
+    with open(temp_file, "wb") as f:
+        f.write(contents)
+    return temp_file
+
+
+def remove_contract_analytics(parsed_data: dict):
+    """Have a worker take a deleted contract out of the analytics rollups"""
+    from app.celery_app import celery_app
+
+    celery_app.send_task("remove_contract_analytics", args=[parsed_data])
+
 
-    # Sync MongoDB connection for Celery
-    sync_client = MongoClient(settings.MONGO_URL)
-    sync_db = sync_client[settings.MONGO_DB]
+def revoke_contract_tasks(contract_id: str):
+    """Tell the workers to discard the contract's queued pipeline stages"""
+    from app.celery_app import celery_app
 
+    celery_app.control.revoke(pipeline_task_ids(contract_id))
+
+
+def _remove_upload(contract_id: str):
+    """Delete the worker's copy of an upload (blocking; run in a thread)"""
     try:
-        # Update status to processing
-        sync_db.contracts.update_one(
-            {"_id": ObjectId(contract_id)},
-            {
-                "$set": {
-                    "status": "processing",
-                    "progress": 10,
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-        )
+        os.remove(os.path.join(settings.UPLOAD_DIR, f"{contract_id}.pdf"))
+    except FileNotFoundError:
+        pass
 
-        # Extract text from PDF
-        extractor = PDFExtractor()
-        pdf_text = extractor.extract_text(file_path)
-        print(f"Extracted text from PDF Extractor \n${pdf_text}")
-        sync_db.contracts.update_one(
-            {"_id": ObjectId(contract_id)}, {"$set": {"progress": 30}}
-        )
-        print(f"Parsing the PDF Text using LLM")
-        # Parse contract using LLM
-        parser = ContractParser()
-        parsed_data = parser.parse_contract(pdf_text)
-        sync_db.contracts.update_one(
-            {"_id": ObjectId(contract_id)}, {"$set": {"progress": 60}}
-        )
 
-        print(f"parsed_data \n${parsed_data}")
-        # Calculate scores
-        scorer = ContractScorer()
-        score_result = scorer.calculate_score(parsed_data)
-        print(f"Scored Result \n${score_result}")
-        # Prepare final data
-        contract_data = {
-            **parsed_data,
-            "overall_score": score_result["overall_score"],
-            "category_scores": score_result["category_scores"],
-            "missing_fields": score_result["missing_fields"],
-            "confidence_levels": score_result["confidence_levels"],
-        }
+async def _release_deferred() -> Optional[str]:
+    """
+    Enqueue the oldest deferred upload if the pipeline has room; returns
+    its id. Workers do this as contracts finish, but an upload deferred
+    while the pipeline drains (or sits idle) would wait for a finish that
+    never comes, so the API tries once after deferring one.
+    """
+    if not (await check_admission(redis_client)).admitted:
+        return None
+    contract = await db.contracts.find_one_and_update(
+        {"status": "deferred", "priority": LOWEST_PRIORITY},
+        {"$set": {"status": "pending", "updated_at": datetime.utcnow()}},
+        sort=[("priority", 1), ("uploaded_at", 1)],
+        projection={"tenant_id": 1, "priority": 1, "profile": 1},
+    )
+    if not contract:
+        return None
+    await reserve_tenant_slot_async(redis_client, contract.get("tenant_id"))
+    contract_id = str(contract["_id"])
+    await write_status_async(redis_client, contract_id, status="pending")
+    await asyncio.to_thread(
+        process_contract_task(
+            contract_id,
+            os.path.join(settings.UPLOAD_DIR, f"{contract_id}.pdf"),
+            contract["priority"],
+            contract.get("profile", False),
+        ).apply_async
+    )
+    return contract_id
 
-        # Update contract with results
-        sync_db.contracts.update_one(
-            {"_id": ObjectId(contract_id)},
-            {
-                "$set": {
-                    "status": "completed",
-                    "progress": 100,
-                    "parsed_data": contract_data,
-                    "completed_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-        )
 
-    except Exception as e:
-        # Update with error status
-        sync_db.contracts.update_one(
-            {"_id": ObjectId(contract_id)},
-            {
-                "$set": {
-                    "status": "failed",
-                    "error": str(e),
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-        )
-        raise
+async def _cancel_contract(contract_id: str) -> Optional[dict]:
+    """
+    Stop a contract that has not finished: mark it cancelled, flag it for
+    the stage that is running, revoke the queued ones, free its tenant
+    slot and remove the upload copy and cached status. Returns the updated
+    contract, or None if it was not in a cancellable state.
+    """
+    contract = await db.contracts.find_one_and_update(
+        {"_id": ObjectId(contract_id), "status": {"$in": list(CANCELLABLE_STATUSES)}},
+        {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}},
+        projection={name: 1 for name in STATUS_FIELDS + ("tenant_id",)},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not contract:
+        return None
+    await request_cancel(redis_client, contract_id)
+    await asyncio.to_thread(revoke_contract_tasks, contract_id)
+    # Deferred uploads have not taken a slot yet
+    if contract["status"] != "deferred":
+        await release_tenant_slot_async(redis_client, contract.get("tenant_id"))
+    await asyncio.to_thread(_remove_upload, contract_id)
+    await redis_client.delete(status_key(contract_id), queue_key(contract_id))
+    contract.update(status="cancelled", updated_at=datetime.utcnow())
+    await write_status_async(
+        redis_client,
+        contract_id,
+        **{name: contract.get(name) for name in STATUS_FIELDS},
+    )
+    CONTRACTS_CANCELLED.inc()
+    return contract
+
 
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    try:
+        with loop_monitor.track(request.scope):
+            return await call_next(request)
     finally:
-        sync_client.close()
+        route = request.scope.get("route")
+        REQUEST_DURATION.labels(
+            request.method, route.path if route else "unmatched"
+        ).observe(time.perf_counter() - start)
 
 
 @app.exception_handler(Exception)
@@ -161,7 +282,16 @@ async def generic_exception_handler(request: Request, exc: Exception):
 
 
 @app.post("/contracts/upload", response_model=ContractResponse)
-async def upload_contract(file: UploadFile = File(...)):
+async def upload_contract(
+    request: Request,
+    file: UploadFile = File(...),
+    profile: bool = Query(False),
+    lane: str = Query(
+        "standard",
+        regex="^(standard|deferred)$",
+        description="deferred: bulk clients queue uploads instead of getting 429",
+    ),
+):
     if not file.filename.endswith(".pdf"):
         return JSONResponse(
             status_code=400,
@@ -178,7 +308,40 @@ async def upload_contract(file: UploadFile = File(...)):
         )
 
     await file.seek(0)
+    tenant_id = request.headers.get("X-Tenant-ID") or (
+        request.client.host if request.client else "anonymous"
+    )
+    if lane == "deferred" and tenant_id not in bulk_tenants():
+        return JSONResponse(
+            status_code=403,
+            content={"message": "The deferred lane is reserved for bulk clients."},
+        )
+    admission = await check_admission(redis_client)
+    if not admission.admitted and lane != "deferred":
+        ADMISSION_DECISIONS.labels("rejected").inc()
+        return JSONResponse(
+            status_code=429,
+            content={
+                "message": "The processing pipeline is at capacity; retry later.",
+                "retry_after": admission.retry_after,
+            },
+            headers={"Retry-After": str(admission.retry_after)},
+        )
+    # Over capacity on the deferred lane: store now, a worker enqueues it later
+    deferred = not admission.admitted
+
+    # Parsing the PDF is CPU work; keep it off the event loop
+    page_count = await asyncio.to_thread(PDFExtractor().count_pages, contents)
     try:
+        if deferred:
+            priority_class = classify_priority(page_count, len(contents))
+            priority = LOWEST_PRIORITY
+        else:
+            priority_class, priority = await assign_priority(
+                redis_client, tenant_id, page_count, len(contents)
+            )
+            if lane == "deferred":
+                priority = LOWEST_PRIORITY
         file_id = await fs_bucket.upload_from_stream(
             filename=file.filename,
             source=file.file,
@@ -191,20 +354,42 @@ async def upload_contract(file: UploadFile = File(...)):
             "filename": file.filename,
             "file_id": str(file_id),
             "file_size": len(contents),
-            "status": "pending",
+            "page_count": page_count,
+            "tenant_id": tenant_id,
+            "priority_class": priority_class,
+            "priority": priority,
+            "profile": should_profile(profile),
+            "status": "deferred" if deferred else "pending",
             "progress": 0,
             "uploaded_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
         }
         result = await db.contracts.insert_one(contract_doc)
         contract_id = str(result.inserted_id)
-        folder = "/app/uploads"
-        os.makedirs(folder, exist_ok=True)
-        temp_file = os.path.join(folder, f"{contract_id}.pdf")
-        with open(temp_file, "wb") as f:
-            f.write(contents)
-
-        process_contract_task.delay(contract_id, temp_file)
+        await write_status_async(
+            redis_client,
+            contract_id,
+            **{name: contract_doc[name] for name in STATUS_FIELDS if name != "error"},
+        )
+        temp_file = await asyncio.to_thread(_save_upload, contract_id, contents)
+        if deferred:
+            ADMISSION_DECISIONS.labels("deferred").inc()
+            # The pipeline may have drained since the admission check
+            if await _release_deferred() != contract_id:
+                return ContractResponse(
+                    contract_id=contract_id,
+                    filename=file.filename,
+                    status=ContractStatus.deferred,
+                    message="Contract stored and will be queued once the pipeline has capacity.",
+                )
+        else:
+            # Publishing to the broker is a blocking Redis call
+            await asyncio.to_thread(
+                process_contract_task(
+                    contract_id, temp_file, priority, contract_doc["profile"]
+                ).apply_async
+            )
+            ADMISSION_DECISIONS.labels("admitted").inc()
 
         return ContractResponse(
             contract_id=contract_id,
@@ -217,28 +402,300 @@ async def upload_contract(file: UploadFile = File(...)):
         raise
 
 
+async def _cached_queue_ahead(contract_id: str, contract: dict) -> dict:
+    """_queue_ahead, shared by the polls of the next few seconds"""
+    key = queue_key(contract_id)
+    cached = await redis_client.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    queue_ahead = await _queue_ahead(contract)
+    await redis_client.set(
+        key, json.dumps(queue_ahead), ex=settings.QUEUE_POSITION_CACHE_SECONDS
+    )
+    return queue_ahead
+
+
+async def _queue_ahead(contract: dict) -> dict:
+    """Count pending contracts scheduled ahead of this one, per priority class"""
+    pipeline = [
+        {
+            "$match": {
+                "status": "pending",
+                "$or": [
+                    {"priority": {"$lt": contract["priority"]}},
+                    {
+                        "priority": contract["priority"],
+                        "uploaded_at": {"$lt": contract["uploaded_at"]},
+                    },
+                ],
+            }
+        },
+        {"$group": {"_id": "$priority_class", "count": {"$sum": 1}}},
+    ]
+    return {
+        group["_id"]: group["count"] async for group in db.contracts.aggregate(pipeline)
+    }
+
+
+@app.get("/contracts/search", response_model=ContractSearchResponse)
+async def search_contracts(
+    q: Optional[str] = Query(None, description="Full-text search"),
+    vendor: Optional[str] = Query(None, description="Vendor name prefix"),
+    customer: Optional[str] = Query(None, description="Customer name prefix"),
+    status: Optional[ContractStatus] = Query(None),
+    currency: Optional[str] = Query(None),
+    billing_cycle: Optional[str] = Query(None),
+    auto_renewal: Optional[bool] = Query(None),
+    min_total: Optional[float] = Query(None, ge=0),
+    max_total: Optional[float] = Query(None, ge=0),
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    max_score: Optional[float] = Query(None, ge=0, le=100),
+    missing: Optional[List[str]] = Query(
+        None, description="Field codes the contract lacks (see /field-codes)"
+    ),
+    sort_by: str = Query(
+        "uploaded_at", regex="^(uploaded_at|total_value|overall_score)$"
+    ),
+    order: str = Query("desc", regex="^(asc|desc)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    try:
+        sort_path = SORT_FIELDS[sort_by]
+        sort_order = 1 if order == "asc" else -1
+        query = build_search_query(
+            q=q,
+            vendor=vendor,
+            customer=customer,
+            status=status.value if status else None,
+            currency=currency,
+            billing_cycle=billing_cycle,
+            auto_renewal=auto_renewal,
+            min_total=min_total,
+            max_total=max_total,
+            min_score=min_score,
+            max_score=max_score,
+            missing=missing,
+        )
+        query = apply_cursor(query, sort_path, sort_order, cursor)
+
+        # One extra row tells whether there is a next page
+        contracts = (
+            await db.contracts.find(
+                query,
+                {
+                    "filename": 1,
+                    "status": 1,
+                    "uploaded_at": 1,
+                    "progress": 1,
+                    "file_size": 1,
+                    "parsed_data.overall_score": 1,
+                    "parsed_data.party_identification.vendor.name": 1,
+                    "parsed_data.party_identification.customer.name": 1,
+                    "parsed_data.financial_details.total_value": 1,
+                    "parsed_data.financial_details.currency": 1,
+                },
+            )
+            .sort([(sort_path, sort_order), ("_id", sort_order)])
+            .limit(limit + 1)
+            .to_list(length=limit + 1)
+        )
+        contracts, next_cursor = page_items(contracts, limit, sort_path)
+
+        items = []
+        for contract in contracts:
+            parsed_data = contract.get("parsed_data", {})
+            parties = parsed_data.get("party_identification", {})
+            financial = parsed_data.get("financial_details", {})
+            items.append(
+                {
+                    "contract_id": str(contract["_id"]),
+                    "filename": contract["filename"],
+                    "status": contract["status"],
+                    "uploaded_at": contract["uploaded_at"],
+                    "progress": contract.get("progress", 0),
+                    "overall_score": parsed_data.get("overall_score"),
+                    "file_size": contract.get("file_size"),
+                    "vendor_name": parties.get("vendor", {}).get("name"),
+                    "customer_name": parties.get("customer", {}).get("name"),
+                    "total_value": financial.get("total_value"),
+                    "currency": financial.get("currency"),
+                }
+            )
+        return ContractSearchResponse(limit=limit, next_cursor=next_cursor, items=items)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/contracts/export")
+async def export_contracts(
+    format: str = Query("ndjson", regex="^(ndjson|csv|parquet)$"),
+    since: Optional[datetime] = Query(
+        None,
+        description="Only contracts completed at or after this time; the "
+        "previous export's last completed_at",
+    ),
+    after_id: Optional[str] = Query(
+        None,
+        description="The previous export's last contract_id: contracts "
+        "completed at `since` up to and including it are skipped",
+    ),
+):
+    """Stream every completed contract's parsed data and scores"""
+    if after_id is not None and (since is None or not ObjectId.is_valid(after_id)):
+        raise HTTPException(
+            status_code=400, detail="after_id needs `since` and a valid contract id"
+        )
+    try:
+        # Parquet imports pyarrow and the columns load the parser; off the loop
+        writer = await asyncio.to_thread(get_writer, format)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    cursor = export_cursor(
+        db.contracts,
+        since,
+        settings.EXPORT_BATCH_SIZE,
+        ObjectId(after_id) if after_id else None,
+    )
+    return StreamingResponse(
+        stream_export(cursor, writer, settings.EXPORT_BATCH_SIZE),
+        media_type=writer.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="contracts.{writer.extension}"'
+        },
+    )
+
+
 @app.get("/contracts/{contract_id}/status", response_model=ProcessingStatus)
 async def get_contract_status(contract_id: str):
     try:
-        contract = await db.contracts.find_one({"_id": ObjectId(contract_id)})
-        if not contract:
-            raise HTTPException(status_code=404, detail="Contract not found")
+        contract = await read_status(redis_client, contract_id)
+        if contract is None:
+            contract = await db.contracts.find_one(
+                {"_id": ObjectId(contract_id)},
+                {name: 1 for name in STATUS_FIELDS},
+            )
+            if not contract:
+                raise HTTPException(status_code=404, detail="Contract not found")
+            # In-progress contracts are cached by the workers; only settled
+            # ones (or those older than the TTL) fall through to MongoDB
+            if contract["status"] in TERMINAL_STATUSES:
+                await write_status_async(
+                    redis_client,
+                    contract_id,
+                    **{name: contract.get(name) for name in STATUS_FIELDS},
+                )
+        queue_position = None
+        estimated_wait = None
+        if contract["status"] == "pending" and "priority" in contract:
+            queue_ahead = await _cached_queue_ahead(contract_id, contract)
+            queue_position = sum(queue_ahead.values()) + 1
+            estimated_wait = await estimate_wait_seconds(redis_client, queue_ahead)
         return ProcessingStatus(
             contract_id=contract_id,
             status=contract["status"],
             progress=contract["progress"],
             error=contract.get("error"),
             updated_at=contract["updated_at"],
+            priority_class=contract.get("priority_class"),
+            queue_position=queue_position,
+            estimated_wait_seconds=estimated_wait,
+            partial_results=contract.get("partial_results"),
         )
     except Exception as e:
         print(f"Error getting contract status: {e}")
         raise
 
 
+@app.get("/contracts/{contract_id}/trace", response_model=ContractTrace)
+async def get_contract_trace(contract_id: str):
+    try:
+        contract = await db.contracts.find_one(
+            {"_id": ObjectId(contract_id)},
+            {"status": 1, "uploaded_at": 1, "trace": 1},
+        )
+        if not contract:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        return ContractTrace(
+            contract_id=contract_id,
+            status=contract["status"],
+            **summarize_trace(contract),
+        )
+    except Exception as e:
+        print(f"Error getting contract trace: {e}")
+        raise
+
+
+@app.get("/contracts/{contract_id}/similar", response_model=SimilarContractsResponse)
+async def get_similar_contracts(
+    contract_id: str,
+    threshold: float = Query(0.5, ge=0, le=1),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Near-duplicates of a completed contract via the LSH index"""
+    if not similarity_enabled():
+        raise HTTPException(
+            status_code=501,
+            detail="Similarity search is disabled (SIMILARITY_INDEX and "
+            "TEMPLATE_REUSE are off)",
+        )
+    try:
+        contract = await db.contracts.find_one(
+            {"_id": ObjectId(contract_id)},
+            {"status": 1, "similarity.minhash": 1, "template_id": 1},
+        )
+        if not contract:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        signature = contract.get("similarity", {}).get("minhash")
+        if not signature and contract["status"] == "completed":
+            raise HTTPException(
+                status_code=404,
+                detail="Contract was completed while the similarity index was off",
+            )
+        if not signature:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Contract status is {contract['status']}. Similarity available only when completed.",
+            )
+
+        candidates = await db.contracts.find(
+            candidate_query(signature, contract_id),
+            {"filename": 1, "uploaded_at": 1, "similarity.minhash": 1},
+        ).to_list(length=settings.SIMILARITY_MAX_CANDIDATES)
+        similar = [
+            {
+                "contract_id": str(candidate["_id"]),
+                "filename": candidate["filename"],
+                "uploaded_at": candidate["uploaded_at"],
+                "similarity": round(similarity, 4),
+            }
+            for similarity, candidate in rank_candidates(
+                signature, candidates, threshold, limit
+            )
+        ]
+        return SimilarContractsResponse(
+            contract_id=contract_id,
+            template_id=contract.get("template_id"),
+            similar=similar,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error finding similar contracts: {e}")
+        raise
+
+
 @app.get("/contracts/{contract_id}", response_model=ContractData)
 async def get_contract_data(contract_id: str):
     try:
-        contract = await db.contracts.find_one({"_id": ObjectId(contract_id)})
+        contract = await db.contracts.find_one(
+            {"_id": ObjectId(contract_id)}, WITHOUT_SEARCH_TEXT
+        )
         if not contract:
             raise HTTPException(status_code=404, detail="Contract not found")
         if contract["status"] != "completed":
@@ -260,8 +717,9 @@ async def get_contract_data(contract_id: str):
             payment_structure=parsed_data.get("payment_structure", {}),
             revenue_classification=parsed_data.get("revenue_classification", {}),
             sla_terms=parsed_data.get("sla_terms", {}),
-            missing_fields=parsed_data.get("missing_fields", []),
-            confidence_levels=parsed_data.get("confidence_levels", {}),
+            missing_fields=missing_labels(parsed_data),
+            confidence_levels=confidence_levels(parsed_data),
+            time_budget_exceeded=contract.get("time_budget_exceeded", []),
         )
 
     except HTTPException:
@@ -298,7 +756,7 @@ async def get_all_contracts(
 
         # Get contracts
         cursor = (
-            db.contracts.find(filter_query)
+            db.contracts.find(filter_query, WITHOUT_SEARCH_TEXT)
             .sort(sort_by, sort_order)
             .skip(skip)
             .limit(limit)
@@ -336,9 +794,16 @@ async def get_all_contracts(
 @app.get("/contracts/{contract_id}/download")
 async def download_contract(contract_id: str):
     try:
-        contract = await db.contracts.find_one({"_id": ObjectId(contract_id)})
+        contract = await db.contracts.find_one(
+            {"_id": ObjectId(contract_id)}, {"file_id": 1, "filename": 1}
+        )
         if not contract:
             raise HTTPException(status_code=404, detail="Contract not found")
+        if not contract.get("file_id"):
+            # Loaded by the offline batch command, which stores no PDF
+            raise HTTPException(
+                status_code=404, detail="No stored PDF for this contract"
+            )
         file_id = ObjectId(contract["file_id"])
         grid_out = await fs_bucket.open_download_stream(file_id)
         contents = await grid_out.read()
@@ -354,23 +819,68 @@ async def download_contract(contract_id: str):
         raise
 
 
+@app.post("/contracts/{contract_id}/cancel")
+async def cancel_contract(contract_id: str):
+    """
+    Stop processing a contract. Its queued stages are dropped and a running
+    stage gives up at the next page or LLM chunk; the stored PDF is kept.
+    """
+    try:
+        contract = await _cancel_contract(contract_id)
+        if contract:
+            return {"message": "Contract cancelled", "status": "cancelled"}
+
+        contract = await db.contracts.find_one(
+            {"_id": ObjectId(contract_id)}, {"status": 1}
+        )
+        if not contract:
+            raise HTTPException(status_code=404, detail="Contract not found")
+        if contract["status"] == "cancelled":
+            return {"message": "Contract already cancelled", "status": "cancelled"}
+        raise HTTPException(
+            status_code=409,
+            detail=f"Contract status is {contract['status']}. Only unfinished contracts can be cancelled.",
+        )
+    except Exception as e:
+        print(f"Error cancelling contract: {e}")
+        raise
+
+
 @app.delete("/contracts/{contract_id}")
 async def delete_contract(contract_id: str):
     """
     Delete a contract and its associated file
     """
     try:
-        contract = await db.contracts.find_one({"_id": ObjectId(contract_id)})
+        contract = await db.contracts.find_one(
+            {"_id": ObjectId(contract_id)},
+            {
+                "file_id": 1,
+                "status": 1,
+                "parsed_data.overall_score": 1,
+                "parsed_data.category_scores": 1,
+                "parsed_data.missing_fields": 1,
+                "parsed_data.missing_mask": 1,
+                "parsed_data.party_identification.vendor.name": 1,
+            },
+        )
 
         if not contract:
             raise HTTPException(status_code=404, detail="Contract not found")
 
+        # Stop the pipeline first so it does not write into a deleted document
+        if contract["status"] in CANCELLABLE_STATUSES:
+            await _cancel_contract(contract_id)
+
         # Delete file from GridFS
-        file_id = ObjectId(contract["file_id"])
-        await fs_bucket.delete(file_id)
+        if contract.get("file_id"):
+            await fs_bucket.delete(ObjectId(contract["file_id"]))
+        await redis_client.delete(status_key(contract_id), queue_key(contract_id))
 
         # Delete contract metadata
-        await db.contracts.delete_one({"_id": ObjectId(contract_id)})
+        result = await db.contracts.delete_one({"_id": ObjectId(contract_id)})
+        if result.deleted_count and contract["status"] == "completed":
+            await asyncio.to_thread(remove_contract_analytics, contract["parsed_data"])
 
         return {"message": "Contract deleted successfully"}
 
@@ -380,6 +890,41 @@ async def delete_contract(contract_id: str):
         raise
 
 
+@app.get("/analytics/summary", response_model=AnalyticsSummary)
+async def get_analytics_summary(top: int = Query(10, ge=1, le=100)):
+    """Dashboard aggregates read from the incrementally maintained rollups"""
+    summary = await db.analytics.find_one({"_id": SUMMARY_ID})
+    vendors = (
+        await db.analytics_vendors.find({"contracts": {"$gt": 0}})
+        .sort("contracts", -1)
+        .limit(top)
+        .to_list(length=top)
+    )
+    return AnalyticsSummary(**build_summary(summary, vendors, top))
+
+
+@app.get("/field-codes")
+async def get_field_codes():
+    """Codes accepted by `missing` on /contracts/search"""
+    return [
+        {"code": code, "bit": bit, "label": label}
+        for bit, (code, label) in enumerate(MISSING_FIELDS)
+    ]
+
+
+@app.get("/metrics")
+async def metrics():
+    if redis_client:
+        for queue in (settings.EXTRACT_QUEUE, settings.LLM_QUEUE, settings.SCORE_QUEUE):
+            depth = 0
+            for name in broker_queue_names(queue):
+                depth += await redis_client.llen(name)
+            QUEUE_DEPTH.labels(queue).set(depth)
+    # This process only; the workers serve theirs on WORKER_METRICS_PORT
+    payload, content_type = await asyncio.to_thread(render_latest)
+    return Response(content=payload, media_type=content_type)
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
@@ -7,9 +7,11 @@ from typing import Optional, List, Dict, Tuple, Any
 
 class ContractStatus(str, Enum):
     pending = "pending"
+    deferred = "deferred"
     processing = "processing"
     completed = "completed"
     failed = "failed"
+    cancelled = "cancelled"
 
 
 class ContractResponse(BaseModel):
@@ -25,6 +27,11 @@ class ProcessingStatus(BaseModel):
     progress: int = 0
     error: Optional[str] = None
     updated_at: datetime
+    priority_class: Optional[str] = None
+    queue_position: Optional[int] = None
+    estimated_wait_seconds: Optional[float] = None
+    # Sections (and their category scores) persisted while the LLM streams
+    partial_results: Optional[Dict[str, Any]] = None
 
 
 class ContractListItem(BaseModel):
@@ -60,3 +67,69 @@ class ContractData(BaseModel):
     sla_terms: Dict[str, Any]
     missing_fields: List[str]
     confidence_levels: Dict[str, str]
+    # Stages that ran out of time and kept partial results (extract, llm)
+    time_budget_exceeded: List[str] = []
+
+
+class StageTiming(BaseModel):
+    stage: str
+    started_at: datetime
+    finished_at: datetime
+    duration: float
+    queue_wait: float = 0
+    error: Optional[str] = None
+
+
+class ContractTrace(BaseModel):
+    contract_id: str
+    status: ContractStatus
+    total_seconds: Optional[float] = None
+    stages: List[StageTiming] = []
+    pages: List[Dict[str, Any]] = []
+    profiles: List[Dict[str, Any]] = []
+
+
+class SimilarContract(BaseModel):
+    contract_id: str
+    filename: str
+    uploaded_at: datetime
+    similarity: float
+
+
+class SimilarContractsResponse(BaseModel):
+    contract_id: str
+    template_id: Optional[str] = None
+    similar: List[SimilarContract]
+
+
+class ContractSearchItem(ContractListItem):
+    vendor_name: Optional[str] = None
+    customer_name: Optional[str] = None
+    total_value: Optional[float] = None
+    currency: Optional[str] = None
+
+
+class ContractSearchResponse(BaseModel):
+    limit: int
+    next_cursor: Optional[str] = None
+    items: List[ContractSearchItem]
+
+
+class MissingFieldCount(BaseModel):
+    field: str
+    count: int
+
+
+class VendorSummary(BaseModel):
+    vendor: str
+    contracts: int
+    average_score: float
+
+
+class AnalyticsSummary(BaseModel):
+    total_contracts: int
+    average_score: Optional[float] = None
+    score_distribution: Dict[str, int]
+    average_category_scores: Dict[str, float]
+    top_missing_fields: List[MissingFieldCount]
+    top_vendors: List[VendorSummary]
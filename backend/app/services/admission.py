@@ -0,0 +1,115 @@
+"""
+Admission control for uploads
+
+Before an upload is accepted, the API reads two numbers from Redis: the
+contracts in flight (the per-tenant counters kept by scheduling) and the
+messages waiting in the extract queue. Above either limit the upload is
+refused with 429. Retry-After is the time the pipeline needs, at its
+observed completion rate, to work off the excess.
+
+Tenants listed in BULK_TENANTS may use the deferred lane instead. Their
+uploads are stored with status "deferred" and are not enqueued. A worker
+releases the oldest one, at the lowest priority, each time it finishes a
+contract while the pipeline is under its limits. The API tries a release
+right after deferring an upload, and a periodic task (worker.
+release_deferred_task) releases them while the pipeline sits idle. A bulk
+import then runs at whatever rate the pipeline drains, and the Celery
+backlog stays bounded.
+"""
+
+import math
+import time
+from typing import Dict, NamedTuple
+
+from app.config import settings
+from app.services.scheduling import TENANT_INFLIGHT_KEY
+
+COMPLETIONS_KEY = "admission:completions"
+_BUCKET_SECONDS = 60
+
+
+class Admission(NamedTuple):
+    admitted: bool
+    inflight: int
+    queued: int
+    retry_after: int = 0
+
+
+def broker_queue_names(queue: str):
+    # The Redis broker keeps one list per priority step ("queue:3")
+    return [queue] + [f"{queue}:{step}" for step in range(1, 10)]
+
+
+def bulk_tenants() -> set:
+    return {t.strip() for t in settings.BULK_TENANTS.split(",") if t.strip()}
+
+
+def _bucket(now: float) -> int:
+    return int(now // _BUCKET_SECONDS)
+
+
+def record_completion(redis):
+    """Count a contract leaving the pipeline (sync client, from the workers)"""
+    key = f"{COMPLETIONS_KEY}:{_bucket(time.time())}"
+    pipe = redis.pipeline(transaction=False)
+    pipe.incr(key)
+    pipe.expire(key, settings.ADMISSION_THROUGHPUT_WINDOW_SECONDS + _BUCKET_SECONDS)
+    pipe.execute()
+
+
+def _completion_keys(now: float):
+    buckets = math.ceil(settings.ADMISSION_THROUGHPUT_WINDOW_SECONDS / _BUCKET_SECONDS)
+    current = _bucket(now)
+    return [f"{COMPLETIONS_KEY}:{current - i}" for i in range(buckets + 1)]
+
+
+def throughput(counts, now: float) -> float:
+    """Contracts per second over the window, or the configured estimate"""
+    completed = sum(int(count) for count in counts if count)
+    # The current bucket is only partly elapsed
+    elapsed = (len(counts) - 1) * _BUCKET_SECONDS + now % _BUCKET_SECONDS
+    if completed and elapsed > 0:
+        return completed / elapsed
+    return settings.PIPELINE_CONCURRENCY / settings.DEFAULT_CONTRACT_SECONDS
+
+
+def decide(inflight: int, queued: int, rate: float) -> Admission:
+    excess = 0
+    if settings.ADMISSION_MAX_INFLIGHT:
+        excess = max(excess, inflight - settings.ADMISSION_MAX_INFLIGHT + 1)
+    if settings.ADMISSION_MAX_QUEUE_DEPTH:
+        excess = max(excess, queued - settings.ADMISSION_MAX_QUEUE_DEPTH + 1)
+    if excess <= 0:
+        return Admission(True, inflight, queued)
+    retry_after = min(
+        settings.ADMISSION_MAX_RETRY_AFTER, max(1, math.ceil(excess / rate))
+    )
+    return Admission(False, inflight, queued, retry_after)
+
+
+def _inflight(counts: Dict[str, str]) -> int:
+    return sum(max(0, int(count)) for count in counts.values())
+
+
+async def check_admission(redis) -> Admission:
+    """Whether the pipeline can take another upload (redis.asyncio client)"""
+    now = time.time()
+    pipe = redis.pipeline(transaction=False)
+    pipe.hgetall(TENANT_INFLIGHT_KEY)
+    for name in broker_queue_names(settings.EXTRACT_QUEUE):
+        pipe.llen(name)
+    pipe.mget(_completion_keys(now))
+    results = await pipe.execute()
+    return decide(
+        _inflight(results[0]), sum(results[1:-1]), throughput(results[-1], now)
+    )
+
+
+def has_capacity(redis) -> bool:
+    """Sync variant for the workers; ignores throughput"""
+    pipe = redis.pipeline(transaction=False)
+    pipe.hgetall(TENANT_INFLIGHT_KEY)
+    for name in broker_queue_names(settings.EXTRACT_QUEUE):
+        pipe.llen(name)
+    results = pipe.execute()
+    return decide(_inflight(results[0]), sum(results[1:]), 1.0).admitted
@@ -0,0 +1,171 @@
+"""
+Incrementally maintained analytics rollups
+
+`analytics` holds a single "summary" document of counters (contract
+count, score histogram, category score sums, missing field counts) and
+`analytics_vendors` one counter document per vendor. Workers apply $inc
+deltas as contracts complete or are deleted, so the summary endpoint reads
+a fixed number of small documents whatever the collection size.
+`rebuild_rollups` recomputes everything from the contracts for backfills.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from app.services.field_codes import missing_labels
+
+SUMMARY_ID = "summary"
+SCORE_BUCKET_WIDTH = 10
+
+
+def _key(name: str) -> str:
+    # Field names cannot contain "." or start with "$"
+    return name.replace(".", "．").replace("$", "＄")
+
+
+def _unkey(key: str) -> str:
+    return key.replace("．", ".").replace("＄", "$")
+
+
+def score_bucket(score: float) -> str:
+    bucket = min(
+        int(score // SCORE_BUCKET_WIDTH) * SCORE_BUCKET_WIDTH, 100 - SCORE_BUCKET_WIDTH
+    )
+    return f"{bucket}-{bucket + SCORE_BUCKET_WIDTH}"
+
+
+def vendor_name(parsed_data: Dict[str, Any]) -> Optional[str]:
+    name = parsed_data.get("party_identification", {}).get("vendor", {}).get("name")
+    return name.strip() if isinstance(name, str) and name.strip() else None
+
+
+def summary_increments(parsed_data: Dict[str, Any], sign: int = 1) -> Dict[str, float]:
+    """$inc deltas for the summary document; sign=-1 removes a contract"""
+    score = parsed_data.get("overall_score") or 0
+    inc = defaultdict(float)
+    inc["contracts"] += sign
+    inc["score_sum"] += sign * score
+    inc[f"score_histogram.{score_bucket(score)}"] += sign
+    for category, value in (parsed_data.get("category_scores") or {}).items():
+        inc[f"category_sums.{_key(category)}"] += sign * (value or 0)
+    for field in set(missing_labels(parsed_data)):
+        inc[f"missing_fields.{_key(field)}"] += sign
+    return dict(inc)
+
+
+def vendor_update(parsed_data: Dict[str, Any], sign: int = 1) -> Optional[tuple]:
+    """(filter, update) for the vendor's counter document, if it has a vendor"""
+    name = vendor_name(parsed_data)
+    if not name:
+        return None
+    update = {
+        "$inc": {
+            "contracts": sign,
+            "score_sum": sign * (parsed_data.get("overall_score") or 0),
+        }
+    }
+    if sign > 0:
+        update["$set"] = {"name": name}
+    return {"_id": name.lower()}, update
+
+
+def apply_rollup(db, parsed_data: Dict[str, Any], sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) one completed contract (sync)"""
+    db.analytics.update_one(
+        {"_id": SUMMARY_ID},
+        {"$inc": summary_increments(parsed_data, sign)},
+        upsert=True,
+    )
+    vendor = vendor_update(parsed_data, sign)
+    if vendor:
+        db.analytics_vendors.update_one(*vendor, upsert=True)
+        if sign < 0:
+            db.analytics_vendors.delete_one(
+                {"_id": vendor[0]["_id"], "contracts": {"$lte": 0}}
+            )
+
+
+def rebuild_rollups(db, batch_size: int = 500) -> int:
+    """Recompute the rollups from every completed contract; returns the count"""
+    summary = defaultdict(float)
+    vendors = {}
+    cursor = db.contracts.find(
+        {"status": "completed"},
+        {
+            "parsed_data.overall_score": 1,
+            "parsed_data.category_scores": 1,
+            "parsed_data.missing_fields": 1,
+            "parsed_data.missing_mask": 1,
+            "parsed_data.party_identification.vendor.name": 1,
+        },
+        batch_size=batch_size,
+    )
+    for contract in cursor:
+        parsed_data = contract.get("parsed_data") or {}
+        for path, delta in summary_increments(parsed_data).items():
+            summary[path] += delta
+        name = vendor_name(parsed_data)
+        if name:
+            vendor = vendors.setdefault(
+                name.lower(),
+                {"_id": name.lower(), "name": name, "contracts": 0, "score_sum": 0},
+            )
+            vendor["contracts"] += 1
+            vendor["score_sum"] += parsed_data.get("overall_score") or 0
+
+    document = {"_id": SUMMARY_ID}
+    for path, value in summary.items():
+        target = document
+        *parents, leaf = path.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    db.analytics.replace_one({"_id": SUMMARY_ID}, document, upsert=True)
+    db.analytics_vendors.delete_many({})
+    if vendors:
+        db.analytics_vendors.insert_many(list(vendors.values()))
+    return int(summary.get("contracts", 0))
+
+
+def build_summary(
+    summary: Optional[dict], vendors: List[dict], top: int
+) -> Dict[str, Any]:
+    """Shape the rollup documents for the API"""
+    summary = summary or {}
+    count = int(summary.get("contracts", 0))
+    histogram = summary.get("score_histogram", {})
+    missing = sorted(
+        (
+            (_unkey(field), int(n))
+            for field, n in summary.get("missing_fields", {}).items()
+            if n > 0
+        ),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {
+        "total_contracts": count,
+        "average_score": (
+            round(summary.get("score_sum", 0) / count, 2) if count else None
+        ),
+        "score_distribution": {
+            score_bucket(bucket): int(histogram.get(score_bucket(bucket), 0))
+            for bucket in range(0, 100, SCORE_BUCKET_WIDTH)
+        },
+        "average_category_scores": {
+            _unkey(category): round(total / count, 2) if count else 0
+            for category, total in summary.get("category_sums", {}).items()
+        },
+        "top_missing_fields": [
+            {"field": field, "count": n} for field, n in missing[:top]
+        ],
+        "top_vendors": [
+            {
+                "vendor": vendor.get("name", vendor["_id"]),
+                "contracts": int(vendor["contracts"]),
+                "average_score": round(vendor["score_sum"] / vendor["contracts"], 2),
+            }
+            for vendor in vendors
+            if vendor.get("contracts", 0) > 0
+        ],
+    }
@@ -0,0 +1,277 @@
+"""
+Offline batch processing of a directory of PDFs
+
+Runs the same extract -> parse -> score steps as the Celery pipeline, but
+in one process tree and without HTTP, GridFS or the broker. Extraction and
+scoring are CPU bound and run in a process pool (one process per core by
+default); the LLM calls wait on the network and fan out over a thread pool
+driven from an asyncio loop. A fixed number of files is in flight at any
+time, so memory does not grow with the size of the backlog.
+
+Each file produces one NDJSON line (status "completed" or "failed"). The
+output doubles as the checkpoint: a rerun with the same output skips the
+files that already have a completed line and retries the rest. A line cut
+short by a crash is ignored and its file redone. `load_results` upserts the
+completed lines into MongoDB keyed on the file's SHA-256, so loading twice
+does not duplicate contracts.
+"""
+
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.config import settings
+
+STAGES = ("extract", "llm", "score")
+
+
+def find_pdfs(inputs: Iterable[str]) -> List[str]:
+    """PDF paths from directories (searched recursively), globs or files"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)
+        else:
+            matches = glob.glob(item, recursive=True)
+        paths += [p for p in matches if p.lower().endswith(".pdf")]
+    return sorted({os.path.abspath(p) for p in paths})
+
+
+def read_results(path: str) -> Iterator[Dict[str, Any]]:
+    """Records of an output file, skipping a truncated last line"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def completed_files(path: str) -> set:
+    return {
+        record["source_file"]
+        for record in read_results(path)
+        if record.get("status") == "completed"
+    }
+
+
+def extract_file(path: str) -> Dict[str, Any]:
+    """Text, tables and signature of one PDF (runs in a pool process)"""
+    from app.services.similarity import minhash_signature, similarity_enabled
+    from app.services.table_extractor import table_fields
+    from app.utils.deadline import Deadline
+    from app.utils.pdf_extractor import PDFExtractor
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    extractor = PDFExtractor()
+    text = extractor.extract_text(path, deadline=Deadline(settings.EXTRACTION_TIMEOUT))
+    return {
+        "sha256": sha256,
+        "text": text,
+        "pages": len(extractor.pages),  # Of the engine that succeeded
+        "tables": table_fields(extractor.tables),
+        "minhash": minhash_signature(text) if similarity_enabled() else None,
+        "truncated": extractor.truncated,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def parse_text(text: str, tables: Dict[str, Any]) -> Dict[str, Any]:
+    """LLM extraction (runs on a thread of the fan-out pool)"""
+    from app.services.parser import ContractParser
+    from app.utils.deadline import Deadline
+
+    start = time.perf_counter()
+    parser = ContractParser(deadline=Deadline(settings.LLM_TIMEOUT))
+    parsed_data = parser.parse_contract(text, tables=tables)
+    return {
+        "parsed_data": parsed_data,
+        "timed_out": parser.timed_out,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def score_parsed(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """parsed_data with the scores, as the score stage stores it (pool process)"""
+    from app.services.scoring import ContractScorer
+
+    start = time.perf_counter()
+    score_result = ContractScorer().calculate_score(parsed_data)
+    contract_data = {
+        **parsed_data,
+        "overall_score": score_result["overall_score"],
+        "category_scores": score_result["category_scores"],
+        "missing_fields": score_result["missing_fields"],
+        "confidence_levels": score_result["confidence_levels"],
+    }
+    return {"parsed_data": contract_data, "seconds": time.perf_counter() - start}
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        output: str,
+        workers: Optional[int] = None,
+        llm_concurrency: int = 8,
+    ):
+        self.output = output
+        self.workers = workers or os.cpu_count() or 1
+        self.llm_concurrency = llm_concurrency
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+        self.completed = 0
+        self.failed = 0
+        self.pages = 0
+
+    def run(self, paths: List[str]) -> Dict[str, Any]:
+        done = completed_files(self.output)
+        pending = [p for p in paths if p not in done]
+        start = time.perf_counter()
+        asyncio.run(self._run(pending))
+        elapsed = time.perf_counter() - start
+        return {
+            "files": len(paths),
+            "skipped": len(paths) - len(pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "pages": self.pages,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_second": round(self.completed / elapsed, 3) if elapsed else 0,
+            "pages_per_second": round(self.pages / elapsed, 2) if elapsed else 0,
+            # Summed over files; divide by the pool size for wall time
+            "stage_seconds": {k: round(v, 2) for k, v in self.stage_seconds.items()},
+            "workers": self.workers,
+            "llm_concurrency": self.llm_concurrency,
+        }
+
+    async def _run(self, paths: List[str]):
+        queue = asyncio.Queue()
+        for path in paths:
+            queue.put_nowait(path)
+        self._cpu_pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency)
+        try:
+            with open(self.output, "a", encoding="utf-8") as out:
+                # Enough files in flight to keep both pools busy
+                lanes = max(self.workers, self.llm_concurrency)
+                await asyncio.gather(
+                    *(self._lane(queue, out, len(paths)) for _ in range(lanes))
+                )
+        finally:
+            self._cpu_pool.shutdown(cancel_futures=True)
+            self._llm_pool.shutdown(cancel_futures=True)
+
+    async def _lane(self, queue: asyncio.Queue, out, total: int):
+        loop = asyncio.get_running_loop()
+        while not queue.empty():
+            path = queue.get_nowait()
+            record = {"source_file": path, "filename": os.path.basename(path)}
+            try:
+                record.update(await self._process(loop, path))
+                record["status"] = "completed"
+                self.completed += 1
+            except Exception as e:
+                record.update(status="failed", error=str(e))
+                self.failed += 1
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+            print(
+                f"[{self.completed + self.failed}/{total}] {record['status']}: {path}"
+            )
+
+    async def _process(self, loop, path: str) -> Dict[str, Any]:
+        extracted = await loop.run_in_executor(self._cpu_pool, extract_file, path)
+        self.stage_seconds["extract"] += extracted["seconds"]
+        self.pages += extracted["pages"]
+        parsed = await loop.run_in_executor(
+            self._llm_pool, parse_text, extracted["text"], extracted["tables"]
+        )
+        self.stage_seconds["llm"] += parsed["seconds"]
+        scored = await loop.run_in_executor(
+            self._cpu_pool, score_parsed, parsed["parsed_data"]
+        )
+        self.stage_seconds["score"] += scored["seconds"]
+        budget_exceeded = ["extract"] if extracted["truncated"] else []
+        if parsed["timed_out"]:
+            budget_exceeded.append("llm")
+        return {
+            "sha256": extracted["sha256"],
+            "page_count": extracted["pages"],
+            "completed_at": datetime.utcnow().isoformat(),
+            "parsed_data": scored["parsed_data"],
+            "text": extracted["text"],
+            "minhash": extracted["minhash"],
+            "time_budget_exceeded": budget_exceeded,
+        }
+
+
+def contract_document(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The contracts document for a completed batch record"""
+    from app.services.field_codes import compact_scores
+    from app.services.search import search_fields
+    from app.services.similarity import similarity_document
+
+    completed_at = datetime.fromisoformat(record["completed_at"])
+    document = {
+        "filename": record["filename"],
+        "source_sha256": record["sha256"],
+        "page_count": record["page_count"],
+        "status": "completed",
+        "progress": 100,
+        "parsed_data": compact_scores(record["parsed_data"]),
+        "search": {"text": record["text"]},
+        "uploaded_at": completed_at,
+        "completed_at": completed_at,
+        "updated_at": completed_at,
+        "batch": True,  # No stored PDF (file_id) for batch loaded contracts
+    }
+    for field, value in search_fields(record["parsed_data"]).items():
+        document["search"][field.split(".", 1)[1]] = value
+    if record.get("minhash"):
+        document["similarity"] = similarity_document(record["minhash"])
+    if record.get("time_budget_exceeded"):
+        document["time_budget_exceeded"] = record["time_budget_exceeded"]
+    return document
+
+
+def load_results(db, path: str, batch_size: int = 500) -> int:
+    """
+    Upsert the completed records of an output file and rebuild the
+    analytics rollups; returns the number of contracts loaded
+    """
+    from pymongo import ReplaceOne
+
+    from app.services.analytics import rebuild_rollups
+
+    # The last completed line wins when a file was processed more than once
+    latest = {}
+    for record in read_results(path):
+        if record.get("status") == "completed":
+            latest[record["sha256"]] = record
+    db.contracts.create_index("source_sha256", sparse=True)
+    operations = []
+    for record in latest.values():
+        operations.append(
+            ReplaceOne(
+                {"source_sha256": record["sha256"]},
+                contract_document(record),
+                upsert=True,
+            )
+        )
+        if len(operations) >= batch_size:
+            db.contracts.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        db.contracts.bulk_write(operations, ordered=False)
+    if latest:
+        rebuild_rollups(db)
+    return len(latest)
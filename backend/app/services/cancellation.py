@@ -0,0 +1,63 @@
+"""
+Cooperative cancellation of contracts in the pipeline
+
+Cancelling marks the contract "cancelled" in MongoDB and sets a flag in
+Redis. Queued stages are revoked by task id (the pipeline gives each stage
+a predictable id, see pipeline_task_ids), and a stage that is already
+running polls the flag between pages and between chunks of the LLM stream,
+so it stops within a page or a chunk instead of finishing the contract.
+"""
+
+import time
+from typing import List
+
+from app.config import settings
+
+CANCEL_KEY_PREFIX = "contract_cancel"
+# Statuses a contract can still be cancelled from
+CANCELLABLE_STATUSES = ("pending", "deferred", "processing")
+PIPELINE_STAGES = ("extract", "parse", "score")
+
+
+class ContractCancelled(Exception):
+    """Raised inside a pipeline stage once its contract has been cancelled"""
+
+
+def cancel_key(contract_id: str) -> str:
+    return f"{CANCEL_KEY_PREFIX}:{contract_id}"
+
+
+def pipeline_task_ids(contract_id: str) -> List[str]:
+    return [f"{contract_id}:{stage}" for stage in PIPELINE_STAGES]
+
+
+async def request_cancel(redis, contract_id: str):
+    """Raise the flag for the workers (redis.asyncio client)"""
+    await redis.set(cancel_key(contract_id), 1, ex=settings.STATUS_CACHE_TTL)
+
+
+class CancelCheck:
+    """
+    Callable that raises ContractCancelled once the contract's flag is set.
+    Redis is asked at most every `interval` seconds (sync client, workers).
+    """
+
+    def __init__(self, redis, contract_id: str, interval: float = None):
+        self.redis = redis
+        self.contract_id = contract_id
+        self.interval = (
+            settings.CANCEL_CHECK_INTERVAL_SECONDS if interval is None else interval
+        )
+        self._checked_at = None
+
+    def __call__(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.interval:
+            return
+        self._checked_at = now
+        self.check()
+
+    def check(self):
+        """Ask Redis now, regardless of the interval"""
+        if self.redis.exists(cancel_key(self.contract_id)):
+            raise ContractCancelled(f"Contract {self.contract_id} was cancelled")
@@ -0,0 +1,111 @@
+"""
+Clause-level memoization of LLM extraction results
+
+Contract text is split into clauses at numbered headings, each clause is
+normalized (numbering, whitespace, quotes and page markers removed) and
+hashed, and the structured fields the LLM extracted from it are stored per
+section under that hash. Boilerplate reused across contracts is then served
+from Redis and only unseen clauses are sent to the model.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+from app.utils.metrics import CLAUSE_CACHE_CHARACTERS, record_cache_lookup
+
+KEY_PREFIX = "clause_cache"
+
+# Start of a numbered clause: "3. GENERAL TERMS", "4.2 Fees", "Section 7:"
+_HEADING = re.compile(
+    r"^(?=[ \t]*(?:\d+(?:\.\d+)*\.?|section\s+\d+[.:]?|article\s+[ivxlc\d]+[.:]?)"
+    r"[ \t]+[A-Za-z])",
+    re.IGNORECASE | re.MULTILINE,
+)
+_NUMBERING = re.compile(
+    r"^\s*(?:\d+(?:\.\d+)*\.?|section\s+\d+[.:]?|article\s+[ivxlc\d]+[.:]?)\s+",
+    re.IGNORECASE,
+)
+_PAGE_MARKER = re.compile(r"-{3} Page \d+ -{3}")
+_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def segment_clauses(text: str, min_chars: int = None) -> List[str]:
+    """
+    Split text into clauses at numbered headings. Pieces shorter than
+    `min_chars` (stray headings, page furniture) are folded into the
+    previous clause.
+    """
+    min_chars = settings.CLAUSE_MIN_CHARS if min_chars is None else min_chars
+    starts = [0] + [m.start() for m in _HEADING.finditer(text) if m.start()]
+    clauses = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        piece = text[start:end].strip()
+        if not piece:
+            continue
+        if clauses and len(piece) < min_chars:
+            clauses[-1] += "\n" + piece
+        else:
+            clauses.append(piece)
+    return clauses
+
+
+def normalize_clause(clause: str) -> str:
+    clause = _PAGE_MARKER.sub(" ", clause).translate(_QUOTES)
+    return _WHITESPACE.sub(" ", _NUMBERING.sub("", clause)).strip()
+
+
+class ClauseCache:
+    def __init__(self, redis_client, namespace: str, ttl: int = None):
+        self.redis = redis_client
+        self.namespace = namespace
+        self.ttl = settings.CLAUSE_CACHE_TTL if ttl is None else ttl
+
+    def key(self, clause: str) -> str:
+        digest = hashlib.sha256(normalize_clause(clause).encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}:{self.namespace}:{digest}"
+
+    def lookup(
+        self, clauses: List[str], sections: List[str]
+    ) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """
+        Return ({clause index: cached fragment}, [indexes of missed clauses]).
+        A clause only counts as a hit when every requested section is cached.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for clause in clauses:
+            pipe.hmget(self.key(clause), sections)
+
+        fragments, misses = {}, []
+        for index, values in enumerate(pipe.execute()):
+            hit = all(value is not None for value in values)
+            record_cache_lookup("clause", hit)
+            CLAUSE_CACHE_CHARACTERS.labels("hit" if hit else "miss").inc(
+                len(clauses[index])
+            )
+            if hit:
+                fragments[index] = {
+                    section: json.loads(value)
+                    for section, value in zip(sections, values)
+                    if value != "null"
+                }
+            else:
+                misses.append(index)
+        return fragments, misses
+
+    def store(self, clause: str, sections: List[str], fragment: Dict[str, Any]):
+        """Cache the fields found in one clause; sections it lacks are stored as null"""
+        key = self.key(clause)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(
+            key,
+            mapping={
+                section: json.dumps(fragment.get(section), separators=(",", ":"))
+                for section in sections
+            },
+        )
+        pipe.expire(key, self.ttl)
+        pipe.execute()
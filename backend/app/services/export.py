@@ -0,0 +1,338 @@
+"""
+Bulk export of completed contracts for the data warehouse
+
+Contracts are read from a batched cursor ordered by (completed_at, _id)
+and each batch is encoded and handed on before the next one is read, so
+memory stays flat however many contracts match.
+
+Nightly incremental loads pass the watermark of the previous export: the
+last contract's completed_at as `since` and its id as `after_id`. Several
+contracts can share a completed_at, so the watermark is the (completed_at,
+_id) pair; `since` alone is inclusive. A worker stamps completed_at before
+its write commits, so contracts completed within EXPORT_SETTLE_SECONDS of
+the export are left to the next one rather than risk one committing
+behind the watermark.
+
+NDJSON keeps the full parsed_data per line. CSV and Parquet use a fixed
+set of columns derived from the extraction schema (nested fields as
+dotted names, lists as JSON strings) so every batch has the same shape.
+"""
+
+import asyncio
+import csv
+import functools
+import io
+import json
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.config import settings
+from app.services.field_codes import expand_scores
+
+EXPORT_PROJECTION = {
+    "filename": 1,
+    "uploaded_at": 1,
+    "completed_at": 1,
+    "parsed_data": 1,
+}
+EXPORT_SORT = [("completed_at", 1), ("_id", 1)]
+EXPORT_INDEX = [("status", 1), ("completed_at", 1), ("_id", 1)]
+
+
+def _schema_columns(schema: Dict[str, Any], prefix: str = "") -> List[Tuple[str, str]]:
+    columns = []
+    for key, example in schema.items():
+        if isinstance(example, dict):
+            columns += _schema_columns(example, f"{prefix}{key}.")
+        elif isinstance(example, list):
+            columns.append((prefix + key, "json"))
+        elif isinstance(example, bool):
+            columns.append((prefix + key, "bool"))
+        elif isinstance(example, (int, float)):
+            columns.append((prefix + key, "float"))
+        else:
+            columns.append((prefix + key, "string"))
+    return columns
+
+
+@functools.lru_cache(maxsize=None)
+def export_columns() -> Tuple[Tuple[str, str], ...]:
+    """(column, kind) for the flattened formats"""
+    # Deferred so the API does not load the parser just to import this module
+    from app.services.parser import SECTION_SCHEMAS
+    from app.services.scoring import ContractScorer
+
+    return (
+        ("contract_id", "string"),
+        ("filename", "string"),
+        ("uploaded_at", "timestamp"),
+        ("completed_at", "timestamp"),
+        ("overall_score", "float"),
+        *[(f"category_scores.{name}", "float") for name in ContractScorer.WEIGHTS],
+        *[
+            (f"confidence_levels.{section}", "string")
+            for section in ContractScorer.SECTION_CATEGORIES
+        ],
+        ("missing_fields", "json"),
+        *_schema_columns(SECTION_SCHEMAS),
+    )
+
+
+def export_query(
+    since: Optional[datetime] = None,
+    after_id: Optional[ObjectId] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Completed contracts past the (since, after_id) watermark, settled ones only"""
+    horizon = (now or datetime.utcnow()) - timedelta(
+        seconds=settings.EXPORT_SETTLE_SECONDS
+    )
+    query: Dict[str, Any] = {"status": "completed"}
+    if since and after_id:
+        query["completed_at"] = {"$gte": since, "$lte": horizon}
+        query["$or"] = [
+            {"completed_at": {"$gt": since}},
+            {"completed_at": since, "_id": {"$gt": after_id}},
+        ]
+    elif since:
+        query["completed_at"] = {"$gte": since, "$lte": horizon}
+    else:
+        query["completed_at"] = {"$lte": horizon}
+    return query
+
+
+def export_cursor(
+    collection,
+    since: Optional[datetime],
+    batch_size: int,
+    after_id: Optional[ObjectId] = None,
+):
+    """Works for both pymongo (CLI) and motor (API) collections"""
+    return collection.find(
+        export_query(since, after_id), EXPORT_PROJECTION, batch_size=batch_size
+    ).sort(EXPORT_SORT)
+
+
+def export_record(contract: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "contract_id": str(contract["_id"]),
+        "filename": contract.get("filename"),
+        "uploaded_at": contract.get("uploaded_at"),
+        "completed_at": contract.get("completed_at"),
+        **expand_scores(contract.get("parsed_data") or {}),
+    }
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+def _get(record: Dict[str, Any], path: str) -> Any:
+    value = record
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """Fit an LLM-produced value to the column type, or None"""
+    if value is None:
+        return None
+    if kind == "json":
+        return _dumps(value)
+    if kind == "float":
+        if isinstance(value, bool):
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if kind == "bool":
+        return value if isinstance(value, bool) else None
+    if kind == "timestamp":
+        return value if isinstance(value, datetime) else None
+    return value if isinstance(value, str) else _dumps(value)
+
+
+def flatten_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        column: _coerce(_get(record, column), kind) for column, kind in export_columns()
+    }
+
+
+class ExportWriter:
+    """Encodes batches of contracts into chunks of the output file"""
+
+    media_type = "application/octet-stream"
+    extension = "bin"
+
+    def __init__(self):
+        self.rows = 0
+        # Watermark for the next incremental export
+        self.last_completed_at = None
+        self.last_id = None
+
+    def start(self) -> bytes:
+        return b""
+
+    def encode(self, contracts: List[dict]) -> bytes:
+        self.rows += len(contracts)
+        self.last_completed_at = contracts[-1].get("completed_at")
+        self.last_id = contracts[-1]["_id"]
+        return self.write([export_record(contract) for contract in contracts])
+
+    def write(self, records: List[Dict[str, Any]]) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NDJSONWriter(ExportWriter):
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def write(self, records):
+        return "".join(_dumps(record) + "\n" for record in records).encode("utf-8")
+
+
+class CSVWriter(ExportWriter):
+    media_type = "text/csv"
+    extension = "csv"
+
+    def _rows(self, rows) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def start(self):
+        return self._rows([[column for column, _ in export_columns()]])
+
+    def write(self, records):
+        rows = []
+        for record in records:
+            flat = flatten_record(record)
+            rows.append(
+                [
+                    value.isoformat() if isinstance(value, datetime) else value
+                    for value in flat.values()
+                ]
+            )
+        return self._rows(rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ParquetWriter(ExportWriter):
+    """One row group per batch; the footer is written by finish()"""
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(
+                "Parquet export requires pyarrow. Install with: pip install pyarrow"
+            )
+        types = {
+            "string": pa.string(),
+            "json": pa.string(),
+            "float": pa.float64(),
+            "bool": pa.bool_(),
+            "timestamp": pa.timestamp("ms"),
+        }
+        self.pa = pa
+        self.schema = pa.schema(
+            [(column, types[kind]) for column, kind in export_columns()]
+        )
+        self.sink = _ChunkSink()
+        self.writer = pq.ParquetWriter(self.sink, self.schema, compression="snappy")
+
+    def write(self, records):
+        table = self.pa.Table.from_pylist(
+            [flatten_record(record) for record in records], schema=self.schema
+        )
+        self.writer.write_table(table)
+        return self.sink.drain()
+
+    def finish(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+WRITERS = {"ndjson": NDJSONWriter, "csv": CSVWriter, "parquet": ParquetWriter}
+
+
+def get_writer(export_format: str) -> ExportWriter:
+    if export_format not in WRITERS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    return WRITERS[export_format]()
+
+
+def iter_export(cursor, writer: ExportWriter, batch_size: int) -> Iterator[bytes]:
+    """Encode a sync cursor batch by batch"""
+    yield writer.start()
+    batch = []
+    for contract in cursor:
+        batch.append(contract)
+        if len(batch) >= batch_size:
+            yield writer.encode(batch)
+            batch = []
+    if batch:
+        yield writer.encode(batch)
+    yield writer.finish()
+
+
+async def stream_export(
+    cursor, writer: ExportWriter, batch_size: int
+) -> AsyncIterator[bytes]:
+    """Encode an async (motor) cursor batch by batch, off the event loop"""
+    yield await asyncio.to_thread(writer.start)
+    batch = []
+    async for contract in cursor:
+        batch.append(contract)
+        if len(batch) >= batch_size:
+            yield await asyncio.to_thread(writer.encode, batch)
+            batch = []
+    if batch:
+        yield await asyncio.to_thread(writer.encode, batch)
+    yield await asyncio.to_thread(writer.finish)
@@ -0,0 +1,144 @@
+"""
+Stable codes for the scorer's missing fields and confidence levels
+
+Completed contracts store `parsed_data.missing_mask`, one bit per entry of
+MISSING_FIELDS, and `parsed_data.confidence_code`, three bits per entry of
+CONFIDENCE_SECTIONS (0 = not scored, otherwise the level's index + 1),
+instead of the label list and the section -> level map; labels are
+rendered from the codes when a contract is read. A bit test cannot use
+index bounds, so search filters on the codes themselves instead
+(`search.missing`, a multikey index; see services/search.py).
+
+The positions are part of the stored data: only append to these tuples,
+never reorder or remove entries.
+"""
+
+from typing import Any, Dict, Iterable, List, Tuple
+
+# (code, label as produced by ContractScorer); bit = position
+MISSING_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("currency", "Financial Details: Currency"),
+    ("line_items", "Financial Details: Line Items"),
+    ("total_value", "Financial Details: Total Value"),
+    ("tax_information", "Financial Details: Tax Information"),
+    ("subtotal", "Financial Details: Subtotal"),
+    ("customer_name", "Party Identification: Customer Name"),
+    ("customer_legal_entity", "Party Identification: Customer Legal Entity"),
+    ("customer_address", "Party Identification: Customer Address"),
+    ("customer_signatory", "Party Identification: Customer Signatory"),
+    ("vendor_name", "Party Identification: Vendor Name"),
+    ("vendor_legal_entity", "Party Identification: Vendor Legal Entity"),
+    ("vendor_address", "Party Identification: Vendor Address"),
+    ("vendor_signatory", "Party Identification: Vendor Signatory"),
+    ("payment_terms", "Payment Structure: Payment Terms"),
+    ("payment_schedule", "Payment Structure: Payment Schedule"),
+    ("payment_method", "Payment Structure: Payment Method"),
+    ("bank_details", "Payment Structure: Bank Details"),
+    ("performance_metrics", "SLA Terms: Performance Metrics"),
+    ("response_times", "SLA Terms: Response/Resolution Times"),
+    ("support_hours", "SLA Terms: Support Hours"),
+    ("penalty_clauses", "SLA Terms: Penalty Clauses"),
+    ("billing_contact", "Contact Information: Billing Contact"),
+    ("technical_contact", "Contact Information: Technical Contact"),
+    ("account_number", "Contact Information: Account Number"),
+)
+CONFIDENCE_SECTIONS = (
+    "financial_details",
+    "party_identification",
+    "payment_structure",
+    "sla_terms",
+    "account_information",
+)
+CONFIDENCE_LEVELS = ("very_low", "low", "medium", "high")
+_CONFIDENCE_BITS = 3
+
+_BIT_BY_CODE = {code: bit for bit, (code, _) in enumerate(MISSING_FIELDS)}
+_BIT_BY_LABEL = {label: bit for bit, (_, label) in enumerate(MISSING_FIELDS)}
+_CODE_BY_LABEL = {label: code for code, label in MISSING_FIELDS}
+
+
+def missing_mask(codes: Iterable[str]) -> int:
+    """Mask for query codes such as "bank_details"; ValueError if unknown"""
+    mask = 0
+    for code in codes:
+        if code not in _BIT_BY_CODE:
+            raise ValueError(f"Unknown field code: {code}")
+        mask |= 1 << _BIT_BY_CODE[code]
+    return mask
+
+
+def encode_missing(labels: Iterable[str]) -> Tuple[int, List[str]]:
+    """(mask, labels without a code) for the scorer's missing_fields"""
+    mask = 0
+    unregistered = []
+    for label in labels:
+        if label in _BIT_BY_LABEL:
+            mask |= 1 << _BIT_BY_LABEL[label]
+        else:
+            unregistered.append(label)
+    return mask, unregistered
+
+
+def decode_missing(mask: int) -> List[str]:
+    return [label for bit, (_, label) in enumerate(MISSING_FIELDS) if mask >> bit & 1]
+
+
+def encode_confidence(levels: Dict[str, str]) -> int:
+    code = 0
+    for position, section in enumerate(CONFIDENCE_SECTIONS):
+        if levels.get(section) in CONFIDENCE_LEVELS:
+            value = CONFIDENCE_LEVELS.index(levels[section]) + 1
+            code |= value << (position * _CONFIDENCE_BITS)
+    return code
+
+
+def decode_confidence(code: int) -> Dict[str, str]:
+    levels = {}
+    for position, section in enumerate(CONFIDENCE_SECTIONS):
+        value = code >> (position * _CONFIDENCE_BITS) & ((1 << _CONFIDENCE_BITS) - 1)
+        if value:
+            levels[section] = CONFIDENCE_LEVELS[value - 1]
+    return levels
+
+
+def compact_scores(contract_data: Dict[str, Any]) -> Dict[str, Any]:
+    """parsed_data as stored: codes in place of the labels"""
+    compact = dict(contract_data)
+    mask, unregistered = encode_missing(compact.pop("missing_fields", None) or [])
+    compact["missing_mask"] = mask
+    if unregistered:
+        # Kept as text until they get a code
+        compact["missing_fields"] = unregistered
+    if "confidence_levels" in compact:
+        compact["confidence_code"] = encode_confidence(
+            compact.pop("confidence_levels") or {}
+        )
+    return compact
+
+
+def missing_labels(parsed_data: Dict[str, Any]) -> List[str]:
+    """Missing field labels of a stored parsed_data, compact or not"""
+    labels = decode_missing(parsed_data.get("missing_mask") or 0)
+    return labels + list(parsed_data.get("missing_fields") or [])
+
+
+def missing_codes(parsed_data: Dict[str, Any]) -> List[str]:
+    """Codes of the missing fields of a parsed_data, compact or not"""
+    labels = missing_labels(parsed_data)
+    return [_CODE_BY_LABEL[label] for label in labels if label in _CODE_BY_LABEL]
+
+
+def confidence_levels(parsed_data: Dict[str, Any]) -> Dict[str, str]:
+    if "confidence_code" in parsed_data:
+        return decode_confidence(parsed_data["confidence_code"])
+    return parsed_data.get("confidence_levels") or {}
+
+
+def expand_scores(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of compact_scores, for responses and exports"""
+    expanded = dict(parsed_data)
+    expanded["missing_fields"] = missing_labels(parsed_data)
+    expanded["confidence_levels"] = confidence_levels(parsed_data)
+    expanded.pop("missing_mask", None)
+    expanded.pop("confidence_code", None)
+    return expanded
@@ -2,76 +2,60 @@
 Contract Parser using LLM for intelligent data extraction
 """
 
+import hashlib
 import json
 import re
-from typing import Dict, Any, List
-from app.utils.llm_client import LLMClient
+from contextlib import closing
+from typing import Dict, Any, List, Callable, Optional
+from app.config import settings
+from app.services.clause_cache import ClauseCache, segment_clauses
+from app.services.rule_extractor import RuleExtractor
+from app.services.scoring import ContractScorer
+from app.utils.deadline import Deadline
+from app.utils.llm_client import LLMClient, LLMTimeout
+from app.utils.metrics import EXTRACTION_TIER
+from app.utils.json_stream import SectionStreamParser, repair_json
 
+REQUIRED_SECTIONS = [
+    "party_identification",
+    "account_information",
+    "financial_details",
+    "payment_structure",
+    "revenue_classification",
+    "sla_terms"
+]
 
-class ContractParser:
-    def __init__(self):
-        self.llm_client = LLMClient()
-        
-    def parse_contract(self, text: str) -> Dict[str, Any]:
-        """
-        Parse contract text and extract structured data using LLM
-        """
-        # Create comprehensive prompt for extraction
-        prompt = self._create_extraction_prompt(text)
-        
-        # Get LLM response
-        response = self.llm_client.extract_data(prompt)
-        
-        # Parse JSON response
-        try:
-            extracted_data = json.loads(response)
-        except json.JSONDecodeError:
-            print("LLM response.text output:\n", response)  # log the issue
 
-            # Try to extract JSON from markdown code blocks
-            json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-            if json_match:
-                extracted_data = json.loads(json_match.group(1))
-            else:
-                # Fallback: basic extraction
-                extracted_data = self._fallback_extraction(text)
-        
-        # Post-process and validate data
-        return self._post_process_data(extracted_data)
-    
-    def _create_extraction_prompt(self, text: str) -> str:
-        """Create detailed extraction prompt for LLM"""
-        return f"""
+EXTRACTION_INSTRUCTIONS = """
 You MUST return ONLY valid minified JSON.
 No explanation. No markdown. No backticks. No comments.
 If data not found, use null.
 
-CONTRACT TEXT:
-{text}
-
 EXTRACT THE FOLLOWING (return null if not found):
 
-{{
-    "party_identification": {{
-        "customer": {{
+"""
+
+EXTRACTION_SCHEMA = """{
+    "party_identification": {
+        "customer": {
             "name": "Company name",
             "legal_entity": "Legal entity type",
             "registration_number": "Company registration number",
             "address": "Full address",
             "signatory": "Name of person signing",
             "signatory_role": "Title/role"
-        }},
-        "vendor": {{
+        },
+        "vendor": {
             "name": "Vendor company name",
             "legal_entity": "Legal entity type",
             "registration_number": "Registration number",
             "address": "Full address",
             "signatory": "Name of person signing",
             "signatory_role": "Title/role"
-        }},
+        },
         "third_parties": []
-    }},
-    "account_information": {{
+    },
+    "account_information": {
         "account_number": "Account or customer number",
         "billing_contact": "Billing contact name",
         "billing_email": "Billing email",
@@ -79,146 +63,510 @@ EXTRACT THE FOLLOWING (return null if not found):
         "technical_contact": "Technical contact name",
         "technical_email": "Technical email",
         "technical_phone": "Technical phone"
-    }},
-    "financial_details": {{
+    },
+    "financial_details": {
         "currency": "USD/EUR/etc",
         "line_items": [
-            {{
+            {
                 "description": "Product/service description",
                 "quantity": 1,
                 "unit_price": 100.00,
                 "total": 100.00
-            }}
+            }
         ],
         "subtotal": 0.00,
         "tax_rate": 0.00,
         "tax_amount": 0.00,
         "total_value": 0.00,
         "additional_fees": []
-    }},
-    "payment_structure": {{
+    },
+    "payment_structure": {
         "payment_terms": "Net 30/Net 60/etc",
         "payment_method": "Wire transfer/Credit card/etc",
         "payment_schedule": [
-            {{
+            {
                 "due_date": "2024-01-01",
                 "amount": 100.00,
                 "description": "Initial payment"
-            }}
+            }
         ],
         "due_dates": ["2024-01-01"],
-        "bank_details": {{
+        "bank_details": {
             "bank_name": "Bank name",
             "account_number": "Account number",
             "routing_number": "Routing number",
             "swift_code": "SWIFT code"
-        }}
-    }},
-    "revenue_classification": {{
+        }
+    },
+    "revenue_classification": {
         "has_recurring": true,
         "has_one_time": false,
         "billing_cycle": "monthly/quarterly/annual/one-time",
         "subscription_model": "Description of subscription",
         "auto_renewal": true,
         "renewal_terms": "Renewal terms description"
-    }},
-    "sla_terms": {{
+    },
+    "sla_terms": {
         "uptime_guarantee": "99.9%",
         "response_time": "4 hours",
         "resolution_time": "24 hours",
         "performance_metrics": [
-            {{
+            {
                 "metric": "Uptime",
                 "target": "99.9%",
                 "measurement": "Monthly"
-            }}
+            }
         ],
         "penalties": [
-            {{
+            {
                 "condition": "Uptime below 99%",
                 "penalty": "10% credit",
                 "calculation": "Description"
-            }}
+            }
         ],
         "support_hours": "24/7/365",
         "escalation_procedures": "Description of escalation"
-    }}
-}}
+    }
+}"""
+
+# Static instructions and schema come first so every request shares the same
+# prompt prefix and providers can serve it from their prompt cache. Anything
+# that varies per contract must go after it.
+EXTRACTION_PROMPT_PREFIX = EXTRACTION_INSTRUCTIONS + EXTRACTION_SCHEMA + """
+
+CONTRACT TEXT:
+"""
+
+SECTION_SCHEMAS = json.loads(EXTRACTION_SCHEMA)
+
+CLAUSE_INSTRUCTIONS = """
+
+The contract is split into clauses, each introduced by a marker like [[c0]].
+Return a JSON object with one member per clause id. Its value holds only the
+fields stated in that clause, shaped like the schema above; use {} for a
+clause with nothing to extract.
+
+CLAUSES:
+"""
+
+# Cached clause fragments are only valid for the prompt that produced them
+CLAUSE_CACHE_NAMESPACE = hashlib.sha256(
+    (EXTRACTION_SCHEMA + CLAUSE_INSTRUCTIONS).encode("utf-8")
+).hexdigest()[:12]
+
+
+class ContractParser:
+    def __init__(
+        self,
+        redis_client=None,
+        cancel_check: Optional[Callable[[], None]] = None,
+        deadline: Optional[Deadline] = None
+    ):
+        self.llm_client = LLMClient()
+        # Called before each LLM request and between streamed chunks; raises
+        # to abandon the request (see services/cancellation.py)
+        self.cancel_check = cancel_check
+        # Past the deadline the LLM output so far is kept and the sections
+        # it did not finish come from the rule extractor
+        self.deadline = deadline
+        self.timed_out = False
+        self.rule_extractor = RuleExtractor()
+        self.scorer = ContractScorer()
+        
+        # Clause-level memoization needs somewhere to keep the fragments
+        self.clause_cache = None
+        if settings.CLAUSE_CACHE and redis_client is not None:
+            namespace = f"{self.llm_client.provider}:{CLAUSE_CACHE_NAMESPACE}"
+            self.clause_cache = ClauseCache(redis_client, namespace)
+        
+    def parse_contract(
+        self,
+        text: str,
+        on_section: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        template: Optional[Dict[str, Any]] = None,
+        tables: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Parse contract text and extract structured data using LLM.
+        With streaming enabled, `on_section(name, data)` is called for each
+        top-level section as soon as the model has finished writing it.
+        `template` is the parsed data of a near-duplicate contract to reuse.
+        `tables` holds fields already read from the PDF's tables (see
+        table_extractor.table_fields); they take precedence over the LLM.
+        """
+        tables = tables or {}
+        if tables and on_section:
+            on_section = self._table_section_callback(on_section, tables)
+        
+        if template:
+            extracted_data = self._parse_from_template(text, template, on_section, tables)
+        elif settings.EXTRACTION_MODE == "tiered":
+            extracted_data = self._parse_tiered(text, on_section, tables)
+        else:
+            extracted_data = self._extract_sections(
+                text, REQUIRED_SECTIONS, self._section_callback(on_section)
+            )
+            EXTRACTION_TIER.labels("llm").inc()
+            
+            # Post-process and validate data
+            extracted_data = self._post_process_data(extracted_data)
+        
+        return self._apply_tables(extracted_data, tables)
+    
+    def _parse_tiered(
+        self,
+        text: str,
+        on_section: Optional[Callable[[str, Dict[str, Any]], None]],
+        tables: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Run the rule extractor first and send only the sections it could not
+        complete to the LLM, with a prompt trimmed to those sections
+        """
+        extracted_data = self._apply_tables(self.rule_extractor.extract(text), tables)
+        incomplete = self.scorer.incomplete_sections(
+            extracted_data, REQUIRED_SECTIONS, settings.RULES_MIN_CONFIDENCE
+        )
+        
+        callback = self._section_callback(on_section)
+        if callback:
+            for section in REQUIRED_SECTIONS:
+                if section not in incomplete:
+                    callback(section, extracted_data[section])
+        
+        if not incomplete:
+            EXTRACTION_TIER.labels("rules").inc()
+            return self._post_process_data(extracted_data)
+        
+        def merged_callback(name: str, value: Any):
+            if callback and name in incomplete:
+                callback(name, self._merge_sections(extracted_data.get(name), value))
+        
+        llm_data = self._extract_sections(
+            text, incomplete, merged_callback, fallback=extracted_data
+        )
+        EXTRACTION_TIER.labels("rules+llm").inc()
+        
+        for section in incomplete:
+            extracted_data[section] = self._merge_sections(
+                extracted_data.get(section), llm_data.get(section)
+            )
+        return self._post_process_data(extracted_data)
+    
+    def _parse_from_template(
+        self,
+        text: str,
+        template: Dict[str, Any],
+        on_section: Optional[Callable[[str, Dict[str, Any]], None]],
+        tables: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Reuse a near-duplicate's extraction: values that still appear in this
+        text are kept and only the remaining fields are asked of the LLM.
+        So are the schema fields the template has no value for (this
+        contract may add the clause) and flags, which the text cannot confirm.
+        """
+        normalized = _normalize_for_match(text)
+        extracted_data = self._apply_tables({}, tables)
+        differing = []
+        for section in REQUIRED_SECTIONS:
+            extracted_data.setdefault(section, {})
+            template_leaves = dict(
+                _leaves(template.get(section) or {}, (section,))
+            )
+            paths = [p for p, _ in _leaves(SECTION_SCHEMAS[section], (section,))]
+            paths += [p for p in template_leaves if p not in paths]
+            for path in paths:
+                if path[1:2] and path[1] in tables.get(section, {}):
+                    # Read from this contract's own tables
+                    continue
+                value = template_leaves.get(path)
+                if _appears_in(value, normalized):
+                    _set_path(extracted_data, path, value)
+                else:
+                    differing.append(path)
+        
+        sections = [s for s in REQUIRED_SECTIONS if any(p[0] == s for p in differing)]
+        callback = self._section_callback(on_section)
+        if callback:
+            for section in REQUIRED_SECTIONS:
+                if section not in sections:
+                    callback(section, extracted_data[section])
+        
+        if not differing:
+            EXTRACTION_TIER.labels("template").inc()
+            return self._post_process_data(extracted_data)
+        
+        fields = ", ".join(".".join(path) for path in differing)
+        response = self._request_llm(
+            self._create_extraction_prompt(text, fields),
+            self._create_targeted_prefix(sections),
+            None
+        )
+        EXTRACTION_TIER.labels("template+llm").inc()
+        
+        llm_data = self._decode_response(response, text)
+        for path in differing:
+            value = _get_path(llm_data, path)
+            if value is not None:
+                _set_path(extracted_data, path, value)
+        
+        if callback:
+            for section in sections:
+                callback(section, extracted_data[section])
+        return self._post_process_data(extracted_data)
+    
+    def _extract_sections(
+        self,
+        text: str,
+        sections: List[str],
+        callback: Optional[Callable[[str, Any], None]],
+        fallback: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Ask the LLM for `sections`, through the clause cache when enabled"""
+        if self.clause_cache:
+            return self._extract_by_clause(text, sections, callback, fallback)
+        
+        # Create comprehensive prompt for extraction
+        response = self._request_llm(
+            self._create_extraction_prompt(text),
+            self._create_targeted_prefix(sections),
+            callback
+        )
+        return self._decode_response(response, text, fallback)
+    
+    def _extract_by_clause(
+        self,
+        text: str,
+        sections: List[str],
+        callback: Optional[Callable[[str, Any], None]],
+        fallback: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Serve previously seen clauses from the cache, send the rest to the
+        LLM labelled by clause id and merge all fragments in document order
+        """
+        clauses = segment_clauses(text)
+        fragments, misses = self.clause_cache.lookup(clauses, sections)
+        print(f"Clause cache: {len(fragments)}/{len(clauses)} clauses reused")
+        
+        failed = False
+        if misses:
+            response = self._request_llm(
+                self._create_clause_prompt(clauses, misses),
+                self._create_targeted_prefix(sections, CLAUSE_INSTRUCTIONS),
+                None
+            )
+            try:
+                decoded = json.loads(response)
+            except json.JSONDecodeError:
+                print("LLM response.text output:\n", response)  # log the issue
+                decoded = repair_json(response) or {}
+            
+            for index in misses:
+                fragment = decoded.get(f"c{index}")
+                if not isinstance(fragment, dict):
+                    # Not cached, so the clause is retried next time
+                    failed = True
+                    continue
+                fragment = {s: v for s, v in fragment.items() if s in sections}
+                self.clause_cache.store(clauses[index], sections, fragment)
+                fragments[index] = fragment
+        
+        # Lists collect across clauses; for other fields earlier clauses win
+        # (definitions come first) and later ones fill gaps
+        extracted_data = {}
+        for index in sorted(fragments):
+            for section, value in fragments[index].items():
+                extracted_data[section] = self._merge_fragments(
+                    extracted_data.get(section), value
+                )
+        
+        if failed:
+            if fallback is None:
+                fallback = self._fallback_extraction(text)
+            for section in sections:
+                if not extracted_data.get(section):
+                    extracted_data[section] = fallback[section]
+        
+        if callback:
+            for section in sections:
+                callback(section, extracted_data.get(section) or {})
+        return extracted_data
+    
+    def _request_llm(
+        self,
+        prompt: str,
+        prefix: str,
+        callback: Optional[Callable[[str, Any], None]]
+    ) -> str:
+        self._check_cancelled()
+        if self._out_of_time():
+            return ""  # Decoded from the rules fallback
+        if self.deadline is not None:
+            # A request may not outlive the budget; Celery's hard limit is
+            # the only other stop on the gevent pool
+            self.llm_client.request_timeout = max(
+                1.0, min(settings.LLM_REQUEST_TIMEOUT, self.deadline.remaining())
+            )
+        if settings.LLM_STREAMING:
+            stream_parser = SectionStreamParser(callback)
+            try:
+                # Closing the stream early closes the provider's connection
+                with closing(self.llm_client.stream_data(prompt, cache_prefix=prefix)) as stream:
+                    for chunk in stream:
+                        stream_parser.feed(chunk)
+                        self._check_cancelled()
+                        if self._out_of_time():
+                            break
+            except LLMTimeout as e:
+                self._give_up(e)
+            # A truncated response keeps its complete sections (repair_json)
+            return stream_parser.text
+        try:
+            return self.llm_client.extract_data(prompt, cache_prefix=prefix)
+        except LLMTimeout as e:
+            self._give_up(e)
+            return ""
+    
+    def _check_cancelled(self):
+        if self.cancel_check:
+            self.cancel_check()
+    
+    def _out_of_time(self) -> bool:
+        if self.deadline is not None and self.deadline.expired():
+            if not self.timed_out:
+                print("LLM time budget spent; filling the rest from the rules")
+            self.timed_out = True
+        return self.timed_out
+    
+    def _give_up(self, error: LLMTimeout):
+        print(f"{error}; filling the rest from the rules")
+        self.timed_out = True
+    
+    def _decode_response(
+        self,
+        response: str,
+        text: str,
+        fallback: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Decode the LLM JSON, filling unusable sections from the rules"""
+        try:
+            return json.loads(response)
+        except json.JSONDecodeError:
+            print("LLM response.text output:\n", response)  # log the issue
+        
+        # Strip fences / close a truncated object, keeping complete sections
+        extracted_data = repair_json(response)
+        if fallback is None:
+            fallback = self._fallback_extraction(text)
+        if not extracted_data:
+            # Fallback: basic extraction
+            return fallback
+        for section in REQUIRED_SECTIONS:
+            if not extracted_data.get(section):
+                extracted_data[section] = fallback[section]
+        return extracted_data
+    
+    def _merge_sections(self, rules: Any, llm: Any) -> Any:
+        """LLM values win; rule values fill whatever the LLM left empty"""
+        if isinstance(rules, dict) and isinstance(llm, dict):
+            merged = dict(rules)
+            for key, value in llm.items():
+                merged[key] = self._merge_sections(rules.get(key), value)
+            return merged
+        if llm is None or llm == "" or llm == []:
+            return rules
+        return llm
+    
+    def _merge_fragments(self, earlier: Any, later: Any) -> Any:
+        """
+        Combine a section's values from two clauses. Line items, payment
+        schedules, fees and penalties are often spread over several clauses,
+        so lists are concatenated without repeats; otherwise the earlier
+        value wins unless it is empty.
+        """
+        if isinstance(earlier, dict) and isinstance(later, dict):
+            keys = list(earlier) + [key for key in later if key not in earlier]
+            return {
+                key: self._merge_fragments(earlier.get(key), later.get(key))
+                for key in keys
+            }
+        if isinstance(earlier, list) and isinstance(later, list):
+            return earlier + [item for item in later if item not in earlier]
+        if earlier is None or earlier == "" or earlier == []:
+            return later
+        return earlier
+    
+    def _apply_tables(
+        self,
+        data: Dict[str, Any],
+        tables: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Overwrite fields with the values read directly from the tables"""
+        for section, fields in tables.items():
+            if not isinstance(data.get(section), dict):
+                data[section] = {}
+            data[section].update(fields)
+        return data
+    
+    def _table_section_callback(self, on_section, tables: Dict[str, Dict[str, Any]]):
+        """Streamed sections also carry the table fields"""
+        
+        def callback(name: str, data: Dict[str, Any]):
+            on_section(name, {**data, **tables.get(name, {})})
+        
+        return callback
+    
+    def _section_callback(self, on_section):
+        """Clean each streamed section before handing it to the caller"""
+        if on_section is None:
+            return None
+        
+        def callback(name: str, value: Any):
+            if name in REQUIRED_SECTIONS and isinstance(value, dict):
+                on_section(name, self._clean_empty_values(value))
+        
+        return callback
+    
+    def _create_targeted_prefix(
+        self,
+        sections: List[str],
+        tail: str = "\n\nCONTRACT TEXT:\n"
+    ) -> str:
+        """Prompt prefix asking only for the given sections"""
+        if sections == REQUIRED_SECTIONS:
+            schema = EXTRACTION_SCHEMA
+        else:
+            schema = json.dumps(
+                {section: SECTION_SCHEMAS[section] for section in sections}, indent=4
+            )
+        return EXTRACTION_INSTRUCTIONS + schema + tail
+    
+    def _create_clause_prompt(self, clauses: List[str], indexes: List[int]) -> str:
+        """Per-contract part of a clause prompt (follows CLAUSE_INSTRUCTIONS)"""
+        body = "\n\n".join(f"[[c{i}]]\n{clauses[i]}" for i in indexes)
+        return f"""{body}
 
+Return ONLY the JSON object, no other text.
+"""
+    
+    def _create_extraction_prompt(self, text: str, fields: Optional[str] = None) -> str:
+        """Create the per-contract part of the prompt (follows EXTRACTION_PROMPT_PREFIX)"""
+        only = f"\nOnly extract these fields, the rest are known: {fields}\n" if fields else ""
+        return f"""{text}
+{only}
 Return ONLY the JSON object, no other text.
 """
     
     def _fallback_extraction(self, text: str) -> Dict[str, Any]:
         """Fallback extraction using regex patterns"""
-        return {
-            "party_identification": {
-                "customer": self._extract_party_info(text, "customer"),
-                "vendor": self._extract_party_info(text, "vendor")
-            },
-            "account_information": {},
-            "financial_details": {
-                "line_items": [],
-                "total_value": self._extract_total_value(text)
-            },
-            "payment_structure": {
-                "payment_terms": self._extract_payment_terms(text)
-            },
-            "revenue_classification": {},
-            "sla_terms": {}
-        }
-    
-    def _extract_party_info(self, text: str, party_type: str) -> Dict[str, Any]:
-        """Extract party information using patterns"""
-        party_info = {}
-        
-        # Look for company names (simple pattern)
-        company_pattern = r'([A-Z][A-Za-z\s&]+(?:Inc\.|LLC|Ltd\.|Corp\.|Corporation))'
-        matches = re.findall(company_pattern, text)
-        if matches:
-            party_info["name"] = matches[0] if party_type == "customer" else matches[1] if len(matches) > 1 else None
-        
-        return party_info
-    
-    def _extract_total_value(self, text: str) -> float:
-        """Extract total contract value"""
-        # Look for currency amounts
-        patterns = [
-            r'\$\s?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            r'USD\s?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-            r'total[:\s]+\$?\s?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)'
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                # Return the largest value found
-                values = [float(m.replace(',', '')) for m in matches]
-                return max(values)
-        
-        return None
-    
-    def _extract_payment_terms(self, text: str) -> str:
-        """Extract payment terms"""
-        terms_pattern = r'Net\s+(\d+)'
-        match = re.search(terms_pattern, text, re.IGNORECASE)
-        if match:
-            return f"Net {match.group(1)}"
-        
-        return None
+        return self.rule_extractor.extract(text)
     
     def _post_process_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Clean and validate extracted data"""
         # Ensure all required sections exist
-        required_sections = [
-            "party_identification",
-            "account_information",
-            "financial_details",
-            "payment_structure",
-            "revenue_classification",
-            "sla_terms"
-        ]
-        
-        for section in required_sections:
+        for section in REQUIRED_SECTIONS:
             if section not in data:
                 data[section] = {}
         
@@ -238,4 +586,62 @@ Return ONLY the JSON object, no other text.
         elif isinstance(obj, list):
             return [self._clean_empty_values(item) for item in obj if item is not None]
         else:
-            return obj
\ No newline at end of file
+            return obj
+
+
+def _normalize_for_match(text: str) -> str:
+    return re.sub(r"\s+", " ", text).lower()
+
+
+def _leaves(obj: Any, path: tuple):
+    """(path, value) for every scalar or list in a nested section"""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _leaves(value, path + (key,))
+    else:
+        yield path, obj
+
+
+def _appears_in(value: Any, normalized: str) -> bool:
+    """Whether a template value is stated verbatim in the new contract text"""
+    if isinstance(value, bool) or value is None:
+        # Derived flags cannot be checked against the text, and a field the
+        # template lacks has nothing to check
+        return False
+    if isinstance(value, (int, float)):
+        forms = {f"{value:,.2f}", f"{value:.2f}", str(value)}
+        if float(value).is_integer():
+            forms |= {f"{int(value):,}", str(int(value))}
+        return any(
+            re.search(rf"(?<![\d.,]){re.escape(form)}(?![\d]|[.,]\d)", normalized)
+            for form in forms
+        )
+    if isinstance(value, list):
+        return all(_appears_in(v, normalized) for _, v in _leaves_in_list(value))
+    if isinstance(value, dict):
+        return all(_appears_in(v, normalized) for _, v in _leaves(value, ()))
+    return _normalize_for_match(str(value)) in normalized
+
+
+def _leaves_in_list(items: list):
+    for item in items:
+        if isinstance(item, dict):
+            yield from _leaves(item, ())
+        elif isinstance(item, list):
+            yield from _leaves_in_list(item)
+        else:
+            yield (), item
+
+
+def _get_path(data: Dict[str, Any], path: tuple) -> Any:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _set_path(data: Dict[str, Any], path: tuple, value: Any):
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+    data[path[-1]] = value
@@ -0,0 +1,230 @@
+"""
+Deterministic rule-based contract extractor
+
+Captures the fields standard-form contracts state in predictable wording
+(parties, labelled signatories, fee lines, totals, Net N terms, SLA figures)
+with one precompiled pattern and a single scan over the text. Used as the
+first tier of extraction and as the fallback when the LLM response is
+unusable.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+_AMOUNT = r"[$€£]?\s?\d{1,3}(?:,\d{3})*(?:\.\d{2})?|[$€£]\s?\d+(?:\.\d{2})?"
+_CUSTOMER_ROLES = ("customer", "client", "buyer", "licensee")
+_VENDOR_ROLES = ("vendor", "provider", "supplier", "seller", "licensor")
+_ROLES = "|".join(_CUSTOMER_ROLES + _VENDOR_ROLES)
+
+# Each alternative is a named group; the outermost group name of a match
+# (Match.lastgroup) says which rule fired
+_RULES = [
+    # between Acme Corp. ("Customer") and Globex Inc. ("Vendor")
+    rf"(?P<party>\b(?:between|and)\s+(?P<party_name>[^()\n]{{2,80}}?)\s*"
+    rf"\(\s*(?:the\s+)?[\"“']?(?P<party_role>{_ROLES})[\"”']?\s*\))",
+    # Customer Signatory: Jane Doe, Chief Financial Officer
+    rf"(?P<labelled>\b(?P<labelled_role>{_ROLES})\s+"
+    r"(?P<labelled_field>signatory|address|registration number|legal entity)"
+    r"\s*:\s*(?P<labelled_value>[^\n]+))",
+    r"(?P<contact>\b(?P<contact_kind>billing|technical)\s+"
+    r"(?P<contact_field>contact|email|phone)\s*:\s*(?P<contact_value>[^\n]+))",
+    r"(?P<account>\baccount\s+(?:number|no\.?|#)\s*[:#]?\s*"
+    r"(?P<account_value>[A-Z0-9][A-Z0-9-]{2,}))",
+    r"(?P<bank>\b(?P<bank_field>bank name|routing number|swift(?: code)?|iban)"
+    r"\s*:\s*(?P<bank_value>[^\n]+))",
+    # Platform subscription: 5 x $1,200.00 = $6,000.00
+    rf"(?P<item>^(?P<item_desc>[A-Za-z][^:\n$]{{2,80}}?):\s*(?P<item_qty>\d+)\s*x\s*"
+    rf"(?P<item_price>{_AMOUNT})\s*=\s*(?P<item_total>{_AMOUNT})\s*$)",
+    # Table row as extracted from a PDF: Platform subscription 5 $1,200.00 $6,000.00
+    rf"(?P<row>^(?P<row_desc>[A-Za-z][^\n$]{{2,80}}?)\s+(?P<row_qty>\d+)\s+"
+    rf"(?P<row_price>[$€£]\s?[\d,]+\.\d{{2}})\s+(?P<row_total>[$€£]\s?[\d,]+\.\d{{2}})\s*$)",
+    rf"(?P<subtotal>\bsub-?total\s*[:=]?\s*(?P<subtotal_amount>{_AMOUNT}))",
+    rf"(?P<total>\b(?:grand\s+)?total(?:\s+contract)?(?:\s+(?:value|amount|price|fees?))?"
+    rf"\s*[:=]\s*(?P<total_amount>{_AMOUNT}))",
+    r"(?P<tax_rate>\btax(?:\s+rate)?\s*(?:of|[:=])?\s*(?P<tax_rate_value>\d+(?:\.\d+)?)\s*%)",
+    rf"(?P<tax_amount>\btax(?:\s+amount)?\s*[:=]\s*(?P<tax_amount_value>{_AMOUNT}))",
+    r"(?P<currency>\b(?P<currency_code>USD|EUR|GBP|CAD|AUD|JPY|CHF|INR)\b)",
+    r"(?P<net>\bnet\s+(?P<net_days>\d{1,3})\b)",
+    r"(?P<due_within>\bdue\s+within\s+(?P<due_days>\d{1,3})\s+days\b)",
+    r"(?P<due_date>\bdue\s+(?:on|by)\s+(?P<due_date_value>\d{4}-\d{2}-\d{2}"
+    r"|[A-Z][a-z]+\s+\d{1,2},\s+\d{4}))",
+    r"(?P<method>\b(?P<method_value>wire transfer|bank transfer|ACH|credit card"
+    r"|direct debit|check|cheque)\b)",
+    # "billed monthly" / "annual subscription", not "monthly uptime"
+    r"(?P<cycle>\b(?:billed|invoiced|payable|billing cycle:?)\s+"
+    r"(?P<cycle_value>monthly|quarterly|annual(?:ly)?|yearly)\b"
+    r"|\b(?P<cycle_prefix>monthly|quarterly|annual|yearly)\s+"
+    r"(?:fees?|subscription|billing|invoic\w*|payments?)\b)",
+    r"(?P<renewal>\b(?:automatically\s+renews?|auto-?renew(?:al|s)?)\b[^.\n]*)",
+    r"(?P<one_time>\b(?:one-time|setup fee|onboarding)\b)",
+    r"(?P<uptime>\b(?P<uptime_value>\d{2}(?:\.\d+)?\s*%)\s*(?:monthly\s+|annual\s+)?"
+    r"(?:uptime|availability)\b)",
+    r"(?P<response>\b(?P<response_value>\d+\s*(?:hour|minute|business day)s?)\s+"
+    r"(?P<response_kind>response|resolution)\s+time\b)",
+    r"(?P<support>\b(?P<support_value>24\s*/\s*7(?:\s*/\s*365)?)\b)",
+    r"(?P<credit>\bservice\s+credits?\s+of\s+(?P<credit_value>\d+(?:\.\d+)?\s*%)"
+    r"(?P<credit_condition>(?:[^.\n]|\.\d)*))",
+]
+_PATTERN = re.compile("|".join(_RULES), re.IGNORECASE | re.MULTILINE)
+
+_LEGAL_ENTITIES = [
+    (re.compile(r"\b(?:Inc\.?|Incorporated)$", re.IGNORECASE), "Corporation"),
+    (re.compile(r"\b(?:Corp\.?|Corporation)$", re.IGNORECASE), "Corporation"),
+    (re.compile(r"\bL\.?L\.?C\.?$", re.IGNORECASE), "LLC"),
+    (re.compile(r"\bL\.?L\.?P\.?$", re.IGNORECASE), "LLP"),
+    (re.compile(r"\b(?:Ltd\.?|Limited)$", re.IGNORECASE), "Limited"),
+    (re.compile(r"\bPLC$", re.IGNORECASE), "PLC"),
+    (re.compile(r"\bGmbH$"), "GmbH"),
+]
+_CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP"}
+_METHODS = {
+    "wire transfer": "Wire transfer",
+    "bank transfer": "Bank transfer",
+    "ach": "ACH",
+    "credit card": "Credit card",
+    "direct debit": "Direct debit",
+    "check": "Check",
+    "cheque": "Cheque",
+}
+
+
+def _amount(value: str) -> float:
+    return float(re.sub(r"[^\d.]", "", value))
+
+
+def _legal_entity(name: str) -> Optional[str]:
+    for pattern, entity in _LEGAL_ENTITIES:
+        if pattern.search(name):
+            return entity
+    return None
+
+
+def _side(role: str) -> str:
+    return "customer" if role.lower() in _CUSTOMER_ROLES else "vendor"
+
+
+class RuleExtractor:
+    def extract(self, text: str) -> Dict[str, Any]:
+        """Return data in the parser's section layout; missing fields are absent"""
+        parties = {"customer": {}, "vendor": {}}
+        account = {}
+        financial = {"line_items": []}
+        payment = {}
+        bank = {}
+        revenue = {}
+        sla = {"penalties": []}
+        totals: List[float] = []
+
+        for match in _PATTERN.finditer(text):
+            rule = match.lastgroup
+            g = match.group
+
+            if rule == "party":
+                party = parties[_side(g("party_role"))]
+                if "name" not in party:
+                    name = g("party_name").strip(" ,")
+                    party["name"] = name
+                    party["legal_entity"] = _legal_entity(name)
+            elif rule == "labelled":
+                party = parties[_side(g("labelled_role"))]
+                field = g("labelled_field").lower().replace(" ", "_")
+                value = g("labelled_value").strip()
+                if field == "signatory":
+                    name, _, role = value.partition(",")
+                    party["signatory"] = name.strip()
+                    party["signatory_role"] = role.strip() or None
+                else:
+                    party.setdefault(field, value)
+            elif rule == "contact":
+                kind = g("contact_kind").lower()
+                field = g("contact_field").lower()
+                key = f"{kind}_contact" if field == "contact" else f"{kind}_{field}"
+                account.setdefault(key, g("contact_value").strip())
+            elif rule == "account":
+                account.setdefault("account_number", g("account_value"))
+            elif rule == "bank":
+                field = g("bank_field").lower()
+                key = {"bank name": "bank_name", "routing number": "routing_number"}
+                bank.setdefault(
+                    key.get(field, "iban" if field == "iban" else "swift_code"),
+                    g("bank_value").strip(),
+                )
+            elif rule in ("item", "row"):
+                financial["line_items"].append(
+                    {
+                        "description": g(f"{rule}_desc").strip(),
+                        "quantity": int(g(f"{rule}_qty")),
+                        "unit_price": _amount(g(f"{rule}_price")),
+                        "total": _amount(g(f"{rule}_total")),
+                    }
+                )
+            elif rule == "subtotal":
+                financial.setdefault("subtotal", _amount(g("subtotal_amount")))
+            elif rule == "total":
+                totals.append(_amount(g("total_amount")))
+            elif rule == "tax_rate":
+                financial.setdefault("tax_rate", float(g("tax_rate_value")))
+            elif rule == "tax_amount":
+                financial.setdefault("tax_amount", _amount(g("tax_amount_value")))
+            elif rule == "currency":
+                financial.setdefault("currency", g("currency_code").upper())
+            elif rule == "net":
+                payment.setdefault("payment_terms", f"Net {g('net_days')}")
+            elif rule == "due_within":
+                payment.setdefault("payment_terms", f"Net {g('due_days')}")
+            elif rule == "due_date":
+                payment.setdefault("due_dates", []).append(g("due_date_value"))
+            elif rule == "method":
+                method = g("method_value").lower()
+                payment.setdefault("payment_method", _METHODS.get(method, method))
+            elif rule == "cycle":
+                cycle = (g("cycle_value") or g("cycle_prefix")).lower()
+                cycle = "annual" if cycle in ("annually", "yearly") else cycle
+                revenue.setdefault("billing_cycle", cycle)
+                revenue["has_recurring"] = True
+            elif rule == "renewal":
+                revenue["auto_renewal"] = True
+                revenue.setdefault("renewal_terms", g("renewal").strip())
+            elif rule == "one_time":
+                revenue["has_one_time"] = True
+            elif rule == "uptime":
+                sla.setdefault("uptime_guarantee", g("uptime_value").replace(" ", ""))
+            elif rule == "response":
+                sla.setdefault(
+                    f"{g('response_kind').lower()}_time", g("response_value")
+                )
+            elif rule == "support":
+                sla.setdefault("support_hours", g("support_value").replace(" ", ""))
+            elif rule == "credit":
+                sla["penalties"].append(
+                    {
+                        "condition": g("credit_condition").strip() or None,
+                        "penalty": f"{g('credit_value')} credit",
+                    }
+                )
+
+        items = financial["line_items"]
+        if items and "subtotal" not in financial:
+            financial["subtotal"] = round(sum(item["total"] for item in items), 2)
+        # Only a labelled total: the largest amount in the text may as well be
+        # a liability cap, and an unset total sends the section to the LLM
+        financial["total_value"] = max(totals) if totals else None
+        if "currency" not in financial:
+            for symbol, code in _CURRENCY_SYMBOLS.items():
+                if symbol in text:
+                    financial["currency"] = code
+                    break
+        if bank:
+            payment["bank_details"] = bank
+        if revenue.get("has_recurring") or revenue.get("has_one_time"):
+            revenue.setdefault("has_recurring", False)
+            revenue.setdefault("has_one_time", False)
+
+        return {
+            "party_identification": parties,
+            "account_information": account,
+            "financial_details": financial,
+            "payment_structure": payment,
+            "revenue_classification": revenue,
+            "sla_terms": sla,
+        }
@@ -0,0 +1,126 @@
+"""
+Size-aware priority scheduling with per-tenant fair share
+"""
+
+import math
+from typing import Optional
+
+from app.config import settings
+
+# Celery on Redis treats 0 as the highest priority and 9 as the lowest
+PRIORITY_CLASSES = {
+    "small": 0,
+    "medium": 3,
+    "large": 6,
+}
+LOWEST_PRIORITY = 9
+
+TENANT_INFLIGHT_KEY = "scheduling:tenant_inflight"
+DURATION_KEY = "scheduling:avg_duration"
+
+
+def classify_priority(page_count: int, file_size: int) -> str:
+    """Pick a priority class from the page count (or file size if unknown)"""
+    if page_count:
+        if page_count <= settings.SMALL_CONTRACT_PAGES:
+            return "small"
+        if page_count <= settings.MEDIUM_CONTRACT_PAGES:
+            return "medium"
+        return "large"
+
+    if file_size <= settings.SMALL_CONTRACT_BYTES:
+        return "small"
+    if file_size <= settings.MEDIUM_CONTRACT_BYTES:
+        return "medium"
+    return "large"
+
+
+def fair_share_penalty(tenant_inflight: int, total_inflight: int, tenants: int) -> int:
+    """
+    Number of priority steps to demote a tenant that is using more than
+    its fair share of the in-flight pipeline slots. Priorities are fixed at
+    enqueue, so a tenant alone in the pipeline is demoted too once it has
+    TENANT_FAIR_SHARE_SLOTS contracts in flight: a tenant arriving later
+    then queues behind that tenant's first slots only, not its backlog.
+    """
+    own = (tenant_inflight - 1) // max(1, settings.TENANT_FAIR_SHARE_SLOTS)
+    if tenants <= 1 or total_inflight == 0:
+        return min(3, own)
+    fair_share = total_inflight / tenants
+    relative = 0
+    if tenant_inflight > fair_share:
+        relative = math.ceil(tenant_inflight / fair_share) - 1
+    return min(3, max(own, relative))
+
+
+async def assign_priority(
+    redis, tenant_id: str, page_count: int, file_size: int
+) -> tuple:
+    """
+    Register an upload for a tenant and return (priority_class, priority).
+    `redis` is a redis.asyncio client.
+    """
+    priority_class = classify_priority(page_count, file_size)
+
+    inflight = await redis.hgetall(TENANT_INFLIGHT_KEY)
+    counts = {k: int(v) for k, v in inflight.items() if int(v) > 0}
+    tenant_inflight = counts.get(tenant_id, 0)
+    active_tenants = len(counts) + (0 if tenant_id in counts else 1)
+    penalty = fair_share_penalty(
+        tenant_inflight + 1, sum(counts.values()) + 1, active_tenants
+    )
+
+    await redis.hincrby(TENANT_INFLIGHT_KEY, tenant_id, 1)
+    priority = min(LOWEST_PRIORITY, PRIORITY_CLASSES[priority_class] + penalty)
+    return priority_class, priority
+
+
+def reserve_tenant_slot(redis, tenant_id: Optional[str]):
+    """Count a contract against its tenant when it enters the pipeline (sync client)"""
+    if tenant_id:
+        redis.hincrby(TENANT_INFLIGHT_KEY, tenant_id, 1)
+
+
+async def reserve_tenant_slot_async(redis, tenant_id: Optional[str]):
+    """reserve_tenant_slot for a redis.asyncio client (deferred release in the API)"""
+    if tenant_id:
+        await redis.hincrby(TENANT_INFLIGHT_KEY, tenant_id, 1)
+
+
+def release_tenant_slot(redis, tenant_id: Optional[str]):
+    """Free the tenant's in-flight slot once its contract finishes (sync client)"""
+    if not tenant_id:
+        return
+    if redis.hincrby(TENANT_INFLIGHT_KEY, tenant_id, -1) <= 0:
+        redis.hdel(TENANT_INFLIGHT_KEY, tenant_id)
+
+
+async def release_tenant_slot_async(redis, tenant_id: Optional[str]):
+    """release_tenant_slot for a redis.asyncio client (cancellation in the API)"""
+    if not tenant_id:
+        return
+    if await redis.hincrby(TENANT_INFLIGHT_KEY, tenant_id, -1) <= 0:
+        await redis.hdel(TENANT_INFLIGHT_KEY, tenant_id)
+
+
+def record_duration(redis, priority_class: str, seconds: float):
+    """Keep an exponentially weighted average of pipeline time per class"""
+    previous = redis.hget(DURATION_KEY, priority_class)
+    if previous is None:
+        average = seconds
+    else:
+        average = 0.8 * float(previous) + 0.2 * seconds
+    redis.hset(DURATION_KEY, priority_class, round(average, 3))
+
+
+async def estimate_wait_seconds(redis, queue_ahead: dict) -> float:
+    """
+    Estimate how long a pending contract will wait given the number of
+    contracts ahead of it in each priority class
+    """
+    averages = await redis.hgetall(DURATION_KEY)
+    total = 0.0
+    for priority_class, count in queue_ahead.items():
+        average = float(averages.get(priority_class, settings.DEFAULT_CONTRACT_SECONDS))
+        total += count * average
+    return round(total / max(1, settings.PIPELINE_CONCURRENCY), 1)
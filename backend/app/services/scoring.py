@@ -3,7 +3,7 @@ Contract Scoring Algorithm
 Implements weighted scoring system (0-100 points)
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 
 class ContractScorer:
@@ -16,6 +16,18 @@ class ContractScorer:
         "contact_information": 10
     }
     
+    # Parsed section -> (category, scoring method)
+    SECTION_CATEGORIES = {
+        "financial_details": ("financial_completeness", "_score_financial_details"),
+        "party_identification": ("party_identification", "_score_party_identification"),
+        "payment_structure": ("payment_terms_clarity", "_score_payment_terms"),
+        "sla_terms": ("sla_definition", "_score_sla_terms"),
+        "account_information": ("contact_information", "_score_contact_info")
+    }
+    
+    # Lowest to highest, as returned by _calculate_confidence
+    CONFIDENCE_LEVELS = ["very_low", "low", "medium", "high"]
+    
     def calculate_score(self, parsed_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Calculate overall score and category scores
@@ -75,6 +87,46 @@ class ContractScorer:
             "confidence_levels": confidence_levels
         }
     
+    def score_section(self, section: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Score a single parsed section (used for partial results while the
+        LLM is still streaming). Returns None for unscored sections.
+        """
+        if section not in self.SECTION_CATEGORIES:
+            return None
+        
+        category, method = self.SECTION_CATEGORIES[section]
+        score, missing, confidence = getattr(self, method)(data)
+        return {
+            "category": category,
+            "score": score,
+            "missing_fields": missing,
+            "confidence": confidence
+        }
+    
+    def incomplete_sections(
+        self,
+        parsed_data: Dict[str, Any],
+        sections: List[str],
+        min_confidence: str = "high"
+    ) -> List[str]:
+        """
+        Return the sections whose data scores below `min_confidence`.
+        Unscored sections are incomplete while they are empty.
+        """
+        required = self.CONFIDENCE_LEVELS.index(min_confidence)
+        incomplete = []
+        for section in sections:
+            data = parsed_data.get(section) or {}
+            result = self.score_section(section, data)
+            if result is None:
+                complete = bool(data)
+            else:
+                complete = self.CONFIDENCE_LEVELS.index(result["confidence"]) >= required
+            if not complete:
+                incomplete.append(section)
+        return incomplete
+    
     def _score_financial_details(self, financial: Dict[str, Any]) -> tuple:
         """Score financial completeness (30 points max)"""
         score = 0
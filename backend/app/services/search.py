@@ -0,0 +1,205 @@
+"""
+Contract search: text index plus indexed filters with keyset pagination
+
+Extracted text is stored under `search.text`. Filter values are stored
+normalized, whatever case the LLM returned them in: lowercased party
+names under `search.vendor` / `search.customer`, the currency upper case
+under `search.currency` and the billing cycle lower case under
+`search.billing_cycle`, and the codes of the fields the scorer found
+missing under `search.missing` (`python -m app.cli reindex-search` fills them in
+for older contracts). One weighted text index covers the text and the
+parsed party names. The filterable fields have their own indexes that end
+in the sort keys. Pages are fetched with an opaque cursor holding the last
+(sort value, _id), so each page is an index range scan instead of a skip
+over everything before it.
+"""
+
+import base64
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.services.field_codes import missing_codes, missing_mask
+
+VENDOR_NAME = "parsed_data.party_identification.vendor.name"
+CUSTOMER_NAME = "parsed_data.party_identification.customer.name"
+
+# Sortable fields (query parameter -> document path)
+SORT_FIELDS = {
+    "uploaded_at": "uploaded_at",
+    "total_value": "parsed_data.financial_details.total_value",
+    "overall_score": "parsed_data.overall_score",
+}
+
+TEXT_INDEX = (
+    [("search.text", "text"), (VENDOR_NAME, "text"), (CUSTOMER_NAME, "text")],
+    {
+        "name": "contract_search_text",
+        "weights": {VENDOR_NAME: 10, CUSTOMER_NAME: 10, "search.text": 1},
+    },
+)
+# Equality filters first, then the sort keys (equality, sort, range)
+FIELD_INDEXES = [
+    [("search.vendor", 1), ("uploaded_at", -1), ("_id", -1)],
+    [("search.customer", 1), ("uploaded_at", -1), ("_id", -1)],
+    [("search.currency", 1), ("uploaded_at", -1), ("_id", -1)],
+    [("search.billing_cycle", 1), ("uploaded_at", -1), ("_id", -1)],
+    [
+        ("parsed_data.revenue_classification.auto_renewal", 1),
+        ("uploaded_at", -1),
+        ("_id", -1),
+    ],
+    # Multikey: one key per missing field code
+    [("search.missing", 1), ("uploaded_at", -1), ("_id", -1)],
+    [(SORT_FIELDS["total_value"], -1), ("_id", -1)],
+    [(SORT_FIELDS["overall_score"], -1), ("_id", -1)],
+    [("uploaded_at", -1), ("_id", -1)],
+]
+
+
+async def create_search_indexes(collection):
+    keys, options = TEXT_INDEX
+    await collection.create_index(keys, **options)
+    for keys in FIELD_INDEXES:
+        await collection.create_index(keys)
+
+
+def _normalized(value: Any, case) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    return case(value.strip()) or None
+
+
+def search_fields(parsed_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized filter values stored alongside the (scored) parsed data"""
+    parties = parsed_data.get("party_identification") or {}
+    fields = {
+        f"search.{party}": _normalized(
+            (parties.get(party) or {}).get("name"), str.lower
+        )
+        for party in ("vendor", "customer")
+    }
+    financial = parsed_data.get("financial_details") or {}
+    revenue = parsed_data.get("revenue_classification") or {}
+    fields["search.currency"] = _normalized(financial.get("currency"), str.upper)
+    fields["search.billing_cycle"] = _normalized(
+        revenue.get("billing_cycle"), str.lower
+    )
+    fields["search.missing"] = missing_codes(parsed_data)
+    return fields
+
+
+def encode_cursor(value: Any, contract_id: ObjectId) -> str:
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    raw = json.dumps([value, str(contract_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, contract_id = json.loads(raw)
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return value, ObjectId(contract_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _prefix(value: str) -> Dict[str, str]:
+    # Anchored and case-normalized so the search.* indexes are usable
+    return {"$regex": "^" + re.escape(value.strip().lower())}
+
+
+def build_search_query(
+    q: Optional[str] = None,
+    vendor: Optional[str] = None,
+    customer: Optional[str] = None,
+    status: Optional[str] = None,
+    currency: Optional[str] = None,
+    billing_cycle: Optional[str] = None,
+    auto_renewal: Optional[bool] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    missing: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if q:
+        query["$text"] = {"$search": q}
+    if vendor:
+        query["search.vendor"] = _prefix(vendor)
+    if customer:
+        query["search.customer"] = _prefix(customer)
+    if status:
+        query["status"] = status
+    if currency:
+        query["search.currency"] = currency.strip().upper()
+    if billing_cycle:
+        query["search.billing_cycle"] = billing_cycle.strip().lower()
+    if auto_renewal is not None:
+        query["parsed_data.revenue_classification.auto_renewal"] = auto_renewal
+    if missing:
+        missing_mask(missing)  # ValueError on an unknown code
+        query["search.missing"] = {"$all": list(missing)}
+
+    for path, low, high in (
+        (SORT_FIELDS["total_value"], min_total, max_total),
+        (SORT_FIELDS["overall_score"], min_score, max_score),
+    ):
+        bounds = {}
+        if low is not None:
+            bounds["$gte"] = low
+        if high is not None:
+            bounds["$lte"] = high
+        if bounds:
+            query[path] = bounds
+    return query
+
+
+def apply_cursor(
+    query: Dict[str, Any], sort_path: str, direction: int, cursor: Optional[str]
+) -> Dict[str, Any]:
+    """Restrict the query to documents after the cursor in (sort, _id) order"""
+    # $text has to stay at the top level, so conditions go into $and
+    conditions = []
+    if sort_path != "uploaded_at":
+        # Documents without the sort value cannot be placed on a keyset page
+        conditions.append({sort_path: {"$ne": None}})
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        op = "$gt" if direction == 1 else "$lt"
+        conditions.append(
+            {
+                "$or": [
+                    {sort_path: {op: value}},
+                    {sort_path: value, "_id": {op: last_id}},
+                ]
+            }
+        )
+    if conditions:
+        query = {**query, "$and": conditions}
+    return query
+
+
+def sort_value(contract: Dict[str, Any], sort_path: str) -> Any:
+    value = contract
+    for key in sort_path.split("."):
+        value = (value or {}).get(key)
+    return value
+
+
+def page_items(
+    contracts: List[dict], limit: int, sort_path: str
+) -> Tuple[List[dict], Optional[str]]:
+    """Trim the limit + 1 lookahead row and build the next cursor"""
+    if len(contracts) <= limit:
+        return contracts, None
+    contracts = contracts[:limit]
+    last = contracts[-1]
+    return contracts, encode_cursor(sort_value(last, sort_path), last["_id"])
@@ -0,0 +1,141 @@
+"""
+Near-duplicate detection with MinHash signatures and LSH banding
+
+Each contract's extracted text is reduced to a MinHash signature over word
+shingles. The signature is cut into bands, and each band hashes to a
+bucket key stored on the contract document (`similarity.bands`, multikey
+indexed). Contracts sharing any bucket are candidates; their estimated
+Jaccard similarity is then computed from the full signatures. A lookup
+touches only the candidate documents, not the whole collection.
+"""
+
+import hashlib
+import random
+import re
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.config import settings
+
+# Mersenne prime for the universal hash family (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"[a-z0-9$%.,/-]+")
+_SHINGLE_SIZE = 5
+
+
+def similarity_enabled() -> bool:
+    """Whether completed contracts get a signature (the index or templates)"""
+    return settings.SIMILARITY_INDEX or settings.TEMPLATE_REUSE
+
+
+def _permutations(count: int) -> List[tuple]:
+    rng = random.Random(0x5EED)
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(count)]
+
+
+_PERMUTATIONS = _permutations(settings.MINHASH_PERMUTATIONS)
+
+
+def shingles(text: str) -> set:
+    """Hashed word 5-grams of the lowercased text"""
+    words = _WORD.findall(text.lower())
+    if len(words) < _SHINGLE_SIZE:
+        words += [""] * (_SHINGLE_SIZE - len(words))
+    return {
+        int.from_bytes(
+            hashlib.blake2b(
+                " ".join(words[i : i + _SHINGLE_SIZE]).encode("utf-8"),
+                digest_size=8,
+            ).digest(),
+            "big",
+        )
+        for i in range(len(words) - _SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(text: str) -> List[int]:
+    hashes = shingles(text)
+    rate = 1
+    while len(hashes) > settings.MINHASH_MAX_SHINGLES * rate:
+        rate *= 2
+    if rate > 1:
+        # Cost grows with permutations x shingles. Past the cap, sign only
+        # the shingles hashing into the lowest 1/rate of the range: contracts
+        # of similar length sample the same shingles, so the similarity
+        # estimate between them stays unbiased
+        limit = (1 << 64) // rate
+        hashes = [h for h in hashes if h < limit]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    """
+    Bucket keys, one per band. With b bands of r rows, two contracts become
+    candidates with probability 1 - (1 - s^r)^b at similarity s.
+    """
+    rows = len(signature) // settings.LSH_BANDS
+    bands = []
+    for band in range(settings.LSH_BANDS):
+        chunk = signature[band * rows : (band + 1) * rows]
+        digest = hashlib.blake2b(
+            ",".join(map(str, chunk)).encode("ascii"), digest_size=8
+        ).hexdigest()
+        bands.append(f"{band}:{digest}")
+    return bands
+
+
+def estimate_similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the two shingle sets"""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def similarity_document(signature: List[int]) -> Dict[str, Any]:
+    """What gets stored on the contract under `similarity`"""
+    return {"minhash": signature, "bands": lsh_bands(signature)}
+
+
+def candidate_query(
+    signature: List[int], exclude_id: Optional[str] = None
+) -> Dict[str, Any]:
+    query = {"status": "completed", "similarity.bands": {"$in": lsh_bands(signature)}}
+    if exclude_id:
+        query["_id"] = {"$ne": ObjectId(exclude_id)}
+    return query
+
+
+def rank_candidates(
+    signature: List[int], candidates: List[dict], threshold: float, limit: int
+) -> List[tuple]:
+    """[(similarity, contract)] above the threshold, most similar first"""
+    ranked = [
+        (estimate_similarity(signature, c["similarity"]["minhash"]), c)
+        for c in candidates
+    ]
+    ranked = [item for item in ranked if item[0] >= threshold]
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return ranked[:limit]
+
+
+def find_template(
+    collection, signature: List[int], exclude_id: Optional[str] = None
+) -> Optional[dict]:
+    """
+    The most similar completed contract at or above TEMPLATE_MATCH_THRESHOLD
+    (sync, for the workers), with its similarity under `similarity_score`
+    """
+    candidates = list(
+        collection.find(
+            candidate_query(signature, exclude_id),
+            {"similarity.minhash": 1, "parsed_data": 1},
+        ).limit(settings.SIMILARITY_MAX_CANDIDATES)
+    )
+    ranked = rank_candidates(
+        signature, candidates, settings.TEMPLATE_MATCH_THRESHOLD, 1
+    )
+    if not ranked:
+        return None
+    similarity, contract = ranked[0]
+    return {**contract, "similarity_score": similarity}
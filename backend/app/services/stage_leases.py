@@ -0,0 +1,46 @@
+"""
+Leases on running pipeline stages
+
+A stage takes a lease when it starts and returns it when it ends, however
+it ends. A lease still held past the stage's hard time limit belongs to a
+worker that died mid-stage (the prefork pool's hard limit kills the
+process, or it ran out of memory, or its host went away). Nothing else
+would move that contract out of "processing" or free its tenant slot, so
+the sweeper (worker.sweep_stale_contracts) fails it.
+"""
+
+import time
+from typing import List, Optional, Tuple
+
+LEASES_KEY = "pipeline:stage_leases"
+STAGES = ("extract", "llm", "score")
+
+
+def _member(contract_id: str, stage: str) -> str:
+    return f"{contract_id}:{stage}"
+
+
+def take_lease(redis, contract_id: str, stage: str, seconds: float):
+    """Hold the stage for `seconds` (sync client, from the workers)"""
+    redis.zadd(LEASES_KEY, {_member(contract_id, stage): time.time() + seconds})
+
+
+def return_lease(redis, contract_id: str, stage: str):
+    redis.zrem(LEASES_KEY, _member(contract_id, stage))
+
+
+def expired_leases(redis, now: Optional[float] = None) -> List[Tuple[str, str]]:
+    """(contract_id, stage) of the leases past their expiry"""
+    members = redis.zrangebyscore(LEASES_KEY, 0, now or time.time())
+    return [tuple(member.rsplit(":", 1)) for member in members]
+
+
+def claim_lease(redis, contract_id: str, stage: str) -> bool:
+    """Take an expired lease off the set; only one sweeper gets True"""
+    return bool(redis.zrem(LEASES_KEY, _member(contract_id, stage)))
+
+
+def held_stages(redis, contract_id: str) -> List[str]:
+    """Stages of the contract currently holding a lease"""
+    scores = redis.zmscore(LEASES_KEY, [_member(contract_id, s) for s in STAGES])
+    return [stage for stage, score in zip(STAGES, scores) if score is not None]
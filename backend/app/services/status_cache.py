@@ -0,0 +1,97 @@
+"""
+Redis hot cache for contract processing status
+
+Each contract has a small hash `contract_status:<id>` holding its status,
+progress and the sections streamed so far. Workers write every progress
+step there and send MongoDB only the durable transitions (processing,
+completed, failed). The status endpoint reads the hash, so polling does
+not touch MongoDB while a contract is known to the cache.
+
+Fields: status, progress, updated_at, error, priority_class, priority,
+uploaded_at, plus `section:<name>` / `score:<category>` for partial
+results (JSON encoded).
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+KEY_PREFIX = "contract_status"
+# Terminal states are safe to backfill from MongoDB; a worker will not
+# overwrite them afterwards
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+_FIELDS = ("progress", "priority")
+_DATES = ("updated_at", "uploaded_at")
+
+
+def status_key(contract_id: str) -> str:
+    return f"{KEY_PREFIX}:{contract_id}"
+
+
+def queue_key(contract_id: str) -> str:
+    return f"{KEY_PREFIX}:{contract_id}:queue"
+
+
+def encode_status(**fields: Any) -> Dict[str, str]:
+    """Hash mapping for the given fields (None values are skipped)"""
+    mapping = {}
+    for name, value in fields.items():
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif not isinstance(value, str):
+            value = json.dumps(value, separators=(",", ":"))
+        mapping[name] = value
+    return mapping
+
+
+def decode_status(raw: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Status document in the shape of the MongoDB fields, or None if empty"""
+    if not raw or "status" not in raw:
+        return None
+    status: Dict[str, Any] = {}
+    sections, scores = {}, {}
+    for name, value in raw.items():
+        if name.startswith("section:"):
+            sections[name[len("section:") :]] = json.loads(value)
+        elif name.startswith("score:"):
+            scores[name[len("score:") :]] = json.loads(value)
+        elif name in _FIELDS:
+            status[name] = json.loads(value)
+        elif name in _DATES:
+            status[name] = datetime.fromisoformat(value)
+        else:
+            status[name] = value
+    if sections or scores:
+        status["partial_results"] = {"sections": sections, "scores": scores}
+    return status
+
+
+def write_status(redis, contract_id: str, replace: bool = False, **fields: Any):
+    """
+    Update the hash and refresh its TTL (sync client, from the workers).
+    `replace` drops the partial results and other fields first.
+    """
+    key = status_key(contract_id)
+    pipe = redis.pipeline(transaction=False)
+    if replace:
+        pipe.delete(key)
+    pipe.hset(key, mapping=encode_status(updated_at=datetime.utcnow(), **fields))
+    pipe.expire(key, settings.STATUS_CACHE_TTL)
+    pipe.execute()
+
+
+async def write_status_async(redis, contract_id: str, **fields: Any):
+    """Same as write_status for a redis.asyncio client (the API)"""
+    key = status_key(contract_id)
+    pipe = redis.pipeline(transaction=False)
+    pipe.hset(key, mapping=encode_status(**fields))
+    pipe.expire(key, settings.STATUS_CACHE_TTL)
+    await pipe.execute()
+
+
+async def read_status(redis, contract_id: str) -> Optional[Dict[str, Any]]:
+    return decode_status(await redis.hgetall(status_key(contract_id)))
@@ -0,0 +1,149 @@
+"""
+Direct mapping of detected PDF tables to structured fields
+
+pdfplumber finds ruled tables on each page; tables whose header row looks
+like a price list or a payment schedule are read cell by cell into
+`financial_details.line_items` / `payment_structure.payment_schedule` and
+replaced in the contract text by a one-line summary. The LLM no longer
+rebuilds rows from flattened columns, and those tokens are not sent at all.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+# Table kind -> (section, field) it fills
+TABLE_FIELDS = {
+    "line_items": ("financial_details", "line_items"),
+    "payment_schedule": ("payment_structure", "payment_schedule"),
+}
+
+# Output key -> header words that identify the column (first match wins)
+_LINE_ITEM_COLUMNS = {
+    "quantity": ("qty", "quantity", "units", "seats"),
+    "unit_price": ("unit price", "unit cost", "price", "rate"),
+    "total": ("total", "amount", "extended", "subtotal"),
+    "description": ("description", "item", "service", "product", "module"),
+}
+_SCHEDULE_COLUMNS = {
+    "due_date": ("due date", "date", "due"),
+    "amount": ("amount", "payment", "installment", "total"),
+    "description": ("description", "milestone", "item", "phase"),
+}
+_NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+_SUMMARY_ROW = re.compile(r"^\s*(?:sub-?\s*)?total\b|^\s*(?:tax|vat)\b", re.IGNORECASE)
+
+
+def _number(cell: Optional[str]) -> Optional[float]:
+    match = _NUMBER.search(cell or "")
+    if not match:
+        return None
+    return float(match.group().replace(",", ""))
+
+
+def _cell(cell: Optional[str]) -> Optional[str]:
+    return " ".join((cell or "").split()) or None
+
+
+def _match_columns(header: List[str], columns: Dict[str, tuple]) -> Dict[str, int]:
+    """{output key: column index} for the header cells that name a column"""
+    found = {}
+    for key, words in columns.items():
+        for word in words:
+            index = next(
+                (
+                    i
+                    for i, name in enumerate(header)
+                    if word in name and i not in found.values()
+                ),
+                None,
+            )
+            if index is not None:
+                found[key] = index
+                break
+    return found
+
+
+def classify_table(rows: List[List[Optional[str]]]) -> Optional[tuple]:
+    """(kind, column map) if the header row is a pricing or schedule table"""
+    if len(rows) < 2:
+        return None
+    header = [(_cell(cell) or "").lower() for cell in rows[0]]
+
+    columns = _match_columns(header, _SCHEDULE_COLUMNS)
+    if "due_date" in columns and "amount" in columns:
+        return "payment_schedule", columns
+
+    columns = _match_columns(header, _LINE_ITEM_COLUMNS)
+    if "description" in columns and ("total" in columns or "unit_price" in columns):
+        return "line_items", columns
+    return None
+
+
+def _row_values(row: List[Optional[str]], columns: Dict[str, int]) -> Dict[str, str]:
+    return {
+        key: _cell(row[index]) if index < len(row) else None
+        for key, index in columns.items()
+    }
+
+
+def map_rows(kind: str, columns: Dict[str, int], rows: List[list]) -> List[dict]:
+    """Convert the body rows (header excluded) to field values"""
+    items = []
+    for row in rows:
+        values = _row_values(row, columns)
+        description = values.get("description")
+        if not any(values.values()) or _SUMMARY_ROW.match(description or ""):
+            continue
+        if kind == "line_items":
+            quantity = _number(values.get("quantity"))
+            unit_price = _number(values.get("unit_price"))
+            total = _number(values.get("total"))
+            if total is None and quantity is not None and unit_price is not None:
+                total = round(quantity * unit_price, 2)
+            items.append(
+                {
+                    "description": description,
+                    "quantity": (
+                        int(quantity)
+                        if quantity is not None and quantity.is_integer()
+                        else quantity
+                    ),
+                    "unit_price": unit_price,
+                    "total": total,
+                }
+            )
+        else:
+            items.append(
+                {
+                    "due_date": values.get("due_date"),
+                    "amount": _number(values.get("amount")),
+                    "description": description,
+                }
+            )
+    return items
+
+
+def summarize_table(kind: str, items: List[dict]) -> str:
+    """Compact stand-in for the table in the text sent to the LLM"""
+    if kind == "line_items":
+        names = "; ".join(item["description"] or "-" for item in items)
+        total = sum(item["total"] or 0 for item in items)
+        return (
+            f"[Pricing table, {len(items)} line items (extracted separately): "
+            f"{names}. Sum of line totals: {total:,.2f}]"
+        )
+    total = sum(item["amount"] or 0 for item in items)
+    dates = ", ".join(item["due_date"] or "-" for item in items)
+    return (
+        f"[Payment schedule table, {len(items)} payments (extracted separately) "
+        f"due {dates}. Sum: {total:,.2f}]"
+    )
+
+
+def table_fields(tables: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Merge the mapped tables into the parser's section layout"""
+    fields: Dict[str, Dict[str, Any]] = {}
+    for table in tables:
+        section, field = TABLE_FIELDS[table["kind"]]
+        fields.setdefault(section, {}).setdefault(field, []).extend(table["items"])
+    return fields
@@ -0,0 +1,30 @@
+"""
+Time budgets for the pipeline stages
+
+A stage creates a Deadline from its budget in Settings and checks it at
+natural break points (PDF pages, LLM stream chunks). When it runs out the
+stage keeps what it has and degrades instead of failing: extraction
+returns the pages read so far, the parser fills the sections the LLM did
+not finish from the rule extractor. Celery's time limits sit above the
+budgets (see celery_app.py) for work that cannot be interrupted; the llm
+queue's gevent pool only has the hard one, so the parser also caps each
+provider request at the time left.
+"""
+
+import time
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def limit(self, seconds: float) -> "Deadline":
+        """A deadline `seconds` from now, but no later than this one"""
+        return Deadline(min(seconds, self.remaining()))
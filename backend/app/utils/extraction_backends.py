@@ -0,0 +1,351 @@
+"""
+Text extraction backends and per-document-class selection
+
+Every engine implements the same page-streaming interface (`iter_pages`
+yields one page's text at a time), so PDFExtractor applies cancellation,
+time budgets and page timings the same way whichever one runs. Built in:
+
+    pdfplumber  layout-aware, maps pricing/schedule tables; slowest
+    pdfium      pypdfium2 (installed with pdfplumber); fast plain text
+    pypdf2      pure Python plain text
+    ocr         pytesseract on rendered pages; registered, not enabled
+
+Each run records its speed (chars per second) and yield (whether the text
+met min_text_threshold, chars per page) under a document class derived
+from the page count taken at upload and the file size (bytes per page).
+The selector tries the fastest backend that reliably meets the threshold for that class, then the
+rest in EXTRACTION_BACKENDS order; backends without enough samples are
+occasionally tried first so their stats fill in. More local engines can be
+added with register_backend from a module listed in EXTRACTION_PLUGINS.
+"""
+
+import importlib
+import importlib.util
+import random
+from typing import Dict, Iterator, List, Optional
+
+from app.config import settings
+from app.services.table_extractor import classify_table, map_rows, summarize_table
+from app.utils.metrics import OCR_PAGES, TABLES_EXTRACTED
+
+STATS_KEY = "extraction:stats"
+STATS = ("runs", "chars_per_second", "chars_per_page", "success_rate")
+_EWMA_WEIGHT = 0.2
+# A backend qualifies for a class once it met the threshold this often
+_MIN_SUCCESS_RATE = 0.9
+
+
+class ExtractionBackend:
+    name = ""
+    modules = ()  # Imports the backend needs (checked without importing)
+    tables = False  # Fills `tables` with mapped pricing/schedule tables
+    time_limit: Optional[float] = None  # Cap within the stage's budget
+
+    def available(self) -> bool:
+        return all(importlib.util.find_spec(m) is not None for m in self.modules)
+
+    def iter_pages(self, file_path: str, tables: list, deadline=None) -> Iterator[str]:
+        """Text of each page in order ("" for a page without text)"""
+        raise NotImplementedError
+
+
+class PdfplumberBackend(ExtractionBackend):
+    name = "pdfplumber"
+    modules = ("pdfplumber",)
+    tables = True
+
+    def iter_pages(self, file_path, tables, deadline=None):
+        import pdfplumber
+
+        with pdfplumber.open(file_path) as pdf:
+            for page_number, page in enumerate(pdf.pages, start=1):
+                yield self.page_text(page, page_number, tables)
+
+    def extract_pages(
+        self, file_path: str, page_numbers, tables: list
+    ) -> Dict[int, str]:
+        """Text of selected pages only (the table pass after a faster backend)"""
+        import pdfplumber
+
+        with pdfplumber.open(file_path) as pdf:
+            return {
+                n: self.page_text(pdf.pages[n - 1], n, tables) for n in page_numbers
+            }
+
+    def page_text(self, page, page_number: int, tables: list) -> str:
+        if settings.TABLE_EXTRACTION:
+            return _page_with_tables(page, page_number, tables)
+        return page.extract_text() or ""
+
+
+def _page_with_tables(page, page_number: int, tables: list) -> str:
+    """
+    Page text with each recognized pricing/schedule table replaced by a
+    one-line summary; the table rows go to `tables`
+    """
+    recognized = []
+    for table in page.find_tables():
+        rows = table.extract()
+        match = classify_table(rows)
+        if not match:
+            continue
+        kind, columns = match
+        items = map_rows(kind, columns, rows[1:])
+        if items:
+            recognized.append((table.bbox, summarize_table(kind, items)))
+            tables.append({"kind": kind, "page": page_number, "items": items})
+            TABLES_EXTRACTED.labels(kind).inc()
+    if not recognized:
+        return page.extract_text() or ""
+
+    # Text above, between and below the tables, top to bottom
+    parts = []
+    top = page.bbox[1]
+    for bbox, summary in sorted(recognized, key=lambda item: item[0][1]):
+        if bbox[1] > top:
+            parts.append(
+                page.crop((page.bbox[0], top, page.bbox[2], bbox[1])).extract_text()
+            )
+        parts.append(summary)
+        top = max(top, bbox[3])
+    if top < page.bbox[3]:
+        parts.append(
+            page.crop((page.bbox[0], top, page.bbox[2], page.bbox[3])).extract_text()
+        )
+    return "\n".join(part for part in parts if part)
+
+
+class PdfiumBackend(ExtractionBackend):
+    name = "pdfium"
+    modules = ("pypdfium2",)
+
+    def iter_pages(self, file_path, tables, deadline=None):
+        import pypdfium2
+
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                try:
+                    # pdfium ends lines with \r\n
+                    yield textpage.get_text_range().replace("\r\n", "\n").strip()
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+
+class PyPDF2Backend(ExtractionBackend):
+    name = "pypdf2"
+    modules = ("PyPDF2",)
+
+    def iter_pages(self, file_path, tables, deadline=None):
+        import PyPDF2
+
+        with open(file_path, "rb") as file:
+            for page in PyPDF2.PdfReader(file).pages:
+                yield page.extract_text() or ""
+
+
+class OCRBackend(ExtractionBackend):
+    """For scanned PDFs; enable by adding "ocr" to EXTRACTION_BACKENDS"""
+
+    name = "ocr"
+    modules = ("pytesseract", "pdf2image")
+
+    @property
+    def time_limit(self):
+        return settings.OCR_TIMEOUT
+
+    def iter_pages(self, file_path, tables, deadline=None):
+        from pdf2image import convert_from_path
+        import pytesseract
+
+        try:
+            images = convert_from_path(
+                file_path,
+                dpi=300,  # Higher DPI for better OCR
+                timeout=deadline.remaining() if deadline else None,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to convert PDF to images: {e}")
+
+        for i, image in enumerate(images):
+            try:
+                print(f"  OCR processing page {i+1}/{len(images)}...")
+                page_text = pytesseract.image_to_string(
+                    image,
+                    config=r"--oem 3 --psm 6",  # LSTM OCR, uniform text block
+                    lang="eng",  # Can add more languages: 'eng+fra+deu'
+                )
+                OCR_PAGES.inc()
+            except Exception as e:
+                print(f"  Failed to OCR page {i+1}: {e}")
+                page_text = ""
+            yield page_text
+
+
+BACKENDS: Dict[str, ExtractionBackend] = {}
+_plugins_loaded = False
+
+
+def register_backend(backend: ExtractionBackend):
+    """Add (or replace) a backend; enable it with EXTRACTION_BACKENDS"""
+    BACKENDS[backend.name] = backend
+
+
+for _backend in (PdfplumberBackend(), PdfiumBackend(), PyPDF2Backend(), OCRBackend()):
+    register_backend(_backend)
+
+
+def enabled_backends() -> List[ExtractionBackend]:
+    """Installed backends from EXTRACTION_BACKENDS, in the configured order"""
+    global _plugins_loaded
+    if not _plugins_loaded:
+        for module in filter(None, settings.EXTRACTION_PLUGINS.split(",")):
+            importlib.import_module(module.strip())
+        _plugins_loaded = True
+    names = [n.strip() for n in settings.EXTRACTION_BACKENDS.split(",") if n.strip()]
+    return [BACKENDS[n] for n in names if n in BACKENDS and BACKENDS[n].available()]
+
+
+def document_class(page_count: Optional[int], file_size: int) -> str:
+    """
+    Coarse class from page count and bytes per page ("text-short", ...).
+    The page count is the one taken at upload; without it only the file
+    size is known ("bytes-small", ...), as in scheduling.classify_priority.
+    """
+    if not page_count:
+        size = (
+            "small"
+            if file_size <= settings.SMALL_CONTRACT_BYTES
+            else "medium" if file_size <= settings.MEDIUM_CONTRACT_BYTES else "large"
+        )
+        return f"bytes-{size}"
+    per_page = file_size / page_count
+    # Scanned pages carry an image each; text pages are a few KB
+    density = (
+        "text" if per_page < 30_000 else "mixed" if per_page < 300_000 else "image"
+    )
+    length = (
+        "short"
+        if page_count <= settings.SMALL_CONTRACT_PAGES
+        else "medium" if page_count <= settings.MEDIUM_CONTRACT_PAGES else "long"
+    )
+    return f"{density}-{length}"
+
+
+class BackendStats:
+    """
+    Moving averages per (document class, backend): runs, chars per second,
+    chars per page and the share of runs that met the threshold. This one
+    lives in the process (batch CLI, benchmarks); see RedisBackendStats.
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    def read(self, doc_class: str) -> Dict[str, Dict[str, float]]:
+        return self._stats.get(doc_class, {})
+
+    def record(
+        self,
+        doc_class: str,
+        backend: str,
+        seconds: float,
+        chars: int,
+        pages: int,
+        ok: bool,
+    ):
+        current = self.read(doc_class).get(backend)
+        self._stats.setdefault(doc_class, {})[backend] = _updated(
+            current, seconds, chars, pages, ok
+        )
+
+
+class RedisBackendStats(BackendStats):
+    """Shared by all workers: one hash per class, "<backend>.<stat>" fields"""
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def read(self, doc_class):
+        stats: Dict[str, Dict[str, float]] = {}
+        for field, value in self.redis.hgetall(f"{STATS_KEY}:{doc_class}").items():
+            backend, stat = field.rsplit(".", 1)
+            stats.setdefault(backend, {})[stat] = float(value)
+        return stats
+
+    def record(self, doc_class, backend, seconds, chars, pages, ok):
+        key = f"{STATS_KEY}:{doc_class}"
+        fields = [f"{backend}.{stat}" for stat in STATS]
+
+        def update(pipe):
+            # Read and write under WATCH: a concurrent record from another
+            # worker makes the transaction retry instead of being overwritten
+            values = zip(STATS, pipe.hmget(key, fields))
+            current = {stat: float(v) for stat, v in values if v is not None}
+            updated = _updated(current, seconds, chars, pages, ok)
+            pipe.multi()
+            pipe.hset(
+                key,
+                mapping={f"{backend}.{stat}": value for stat, value in updated.items()},
+            )
+
+        self.redis.transaction(update, key)
+
+
+def _updated(current, seconds, chars, pages, ok) -> Dict[str, float]:
+    sample = {
+        "chars_per_second": round(chars / seconds, 4) if seconds > 0 else 0.0,
+        "chars_per_page": round(chars / pages, 4) if pages else 0.0,
+        "success_rate": 1.0 if ok else 0.0,
+    }
+    if not current:
+        return {"runs": 1, **sample}
+    updated = {"runs": current.get("runs", 0) + 1}
+    for stat, value in sample.items():
+        previous = current.get(stat, value)
+        updated[stat] = round((1 - _EWMA_WEIGHT) * previous + _EWMA_WEIGHT * value, 4)
+    return updated
+
+
+def select_backends(
+    stats: Dict[str, Dict[str, float]], rng: random.Random = random
+) -> List[ExtractionBackend]:
+    """Order to try the enabled backends in for a class with these stats"""
+    backends = enabled_backends()
+    qualified = [
+        b
+        for b in backends
+        if stats.get(b.name, {}).get("runs", 0) >= settings.EXTRACTION_MIN_SAMPLES
+        and stats[b.name]["success_rate"] >= _MIN_SUCCESS_RATE
+    ]
+    qualified.sort(key=lambda b: stats[b.name]["chars_per_second"], reverse=True)
+    order = qualified + [b for b in backends if b not in qualified]
+
+    undersampled = [
+        b
+        for b in backends
+        if stats.get(b.name, {}).get("runs", 0) < settings.EXTRACTION_MIN_SAMPLES
+        and b.time_limit is None  # Never explore with OCR
+    ]
+    if undersampled and rng.random() < settings.EXTRACTION_EXPLORE_RATE:
+        explore = rng.choice(undersampled)
+        order.remove(explore)
+        order.insert(0, explore)
+    return order
+
+
+def may_contain_table(page_text: str) -> bool:
+    """Whether a line of plain text reads like a pricing/schedule header"""
+    for line in page_text.lower().splitlines():
+        words = line.split()
+        if len(words) < 2:
+            continue
+        # Two-word column names ("unit price", "due date") as their own cells
+        cells = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        if classify_table([cells, cells]):
+            return True
+    return False
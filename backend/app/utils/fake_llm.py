@@ -0,0 +1,180 @@
+"""
+Deterministic fake LLM provider for offline benchmarks and load tests
+
+Selected with LLM_PROVIDER=fake. Responses are derived from the prompt so
+the same contract always produces the same JSON, and latency is drawn from
+a configurable distribution seeded by the prompt hash.
+"""
+
+import hashlib
+import json
+import random
+import re
+import time
+
+from app.config import settings
+
+_CLAUSE = re.compile(r"\[\[(c\d+)\]\]\n(.*?)(?=\n\[\[c\d+\]\]|\Z)", re.DOTALL)
+# A clause fragment only contains the sections the clause has evidence for
+_SECTION_EVIDENCE = {
+    "party_identification": re.compile(r"\(\"(?:Customer|Vendor)\"\)"),
+    "account_information": re.compile(r"account", re.IGNORECASE),
+    "financial_details": re.compile(r"\$"),
+    "payment_structure": re.compile(r"Net\s+\d+"),
+    "revenue_classification": re.compile(r"subscription|renew", re.IGNORECASE),
+    "sla_terms": re.compile(r"uptime|response time", re.IGNORECASE),
+}
+
+
+class FakeLLMProvider:
+    def __init__(
+        self,
+        distribution: str = None,
+        latency_ms: float = None,
+        sigma: float = None,
+        seed: int = None,
+    ):
+        self.distribution = distribution or settings.FAKE_LLM_LATENCY_DISTRIBUTION
+        self.latency_ms = (
+            settings.FAKE_LLM_LATENCY_MS if latency_ms is None else latency_ms
+        )
+        self.sigma = settings.FAKE_LLM_LATENCY_SIGMA if sigma is None else sigma
+        self.seed = settings.FAKE_LLM_SEED if seed is None else seed
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16) ^ self.seed)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Latency in seconds for one request"""
+        mean = self.latency_ms / 1000
+        if mean <= 0:
+            return 0.0
+        if self.distribution == "constant":
+            return mean
+        if self.distribution == "uniform":
+            spread = mean * self.sigma
+            return max(0.0, rng.uniform(mean - spread, mean + spread))
+        if self.distribution == "normal":
+            return max(0.0, rng.gauss(mean, mean * self.sigma))
+        if self.distribution == "lognormal":
+            # Parameterised so the median equals the configured latency
+            return rng.lognormvariate(0, self.sigma) * mean
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+    def extract_data(self, prompt: str, max_tokens: int = 4000) -> str:
+        rng = self._rng(prompt)
+        latency = self.sample_latency(rng)
+        if latency:
+            time.sleep(latency)
+        return json.dumps(self.respond(prompt, rng), separators=(",", ":"))
+
+    def stream_data(self, prompt: str, max_tokens: int = 4000, chunk_size: int = 64):
+        """Yield the response in chunks, spreading the latency across them"""
+        rng = self._rng(prompt)
+        latency = self.sample_latency(rng)
+        response = json.dumps(self.respond(prompt, rng), separators=(",", ":"))
+        chunks = [
+            response[i : i + chunk_size] for i in range(0, len(response), chunk_size)
+        ]
+        for chunk in chunks:
+            if latency:
+                time.sleep(latency / len(chunks))
+            yield chunk
+
+    def respond(self, prompt: str, rng: random.Random) -> dict:
+        """Full-document response, or one fragment per clause for clause prompts"""
+        clauses = _CLAUSE.findall(prompt.rsplit("CLAUSES:", 1)[-1])
+        if not clauses:
+            return self.build_response(prompt, rng)
+        fragments = {}
+        for clause_id, text in clauses:
+            response = self.build_response(text, rng)
+            fragments[clause_id] = {
+                section: value
+                for section, value in response.items()
+                if _SECTION_EVIDENCE[section].search(text)
+            }
+        return fragments
+
+    def build_response(self, prompt: str, rng: random.Random) -> dict:
+        # Only look at the contract, not the schema examples that precede it
+        prompt = prompt.rsplit("CONTRACT TEXT:", 1)[-1]
+        parties = re.search(
+            r"between\s+(.+?)\s+\(\"Customer\"\)\s+and\s+(.+?)\s+\(\"Vendor\"\)",
+            prompt,
+        )
+        customer, vendor = (
+            parties.groups() if parties else ("Acme Corp.", "Globex Inc.")
+        )
+        amounts = [
+            float(a.replace(",", ""))
+            for a in re.findall(r"\$\s?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)", prompt)
+        ]
+        total = max(amounts) if amounts else round(rng.uniform(1000, 250000), 2)
+        terms = re.search(r"Net\s+(\d+)", prompt)
+        quantity = rng.randint(1, 20)
+
+        return {
+            "party_identification": {
+                "customer": {
+                    "name": customer,
+                    "legal_entity": "Corporation",
+                    "address": f"{rng.randint(1, 999)} Market Street",
+                    "signatory": "Jane Doe",
+                    "signatory_role": "CFO",
+                },
+                "vendor": {
+                    "name": vendor,
+                    "legal_entity": "LLC",
+                    "address": f"{rng.randint(1, 999)} Main Street",
+                    "signatory": "John Roe",
+                    "signatory_role": "CEO",
+                },
+                "third_parties": [],
+            },
+            "account_information": {
+                "account_number": f"AC-{rng.randint(10000, 99999)}",
+                "billing_contact": "Accounts Payable",
+                "billing_email": "billing@example.com",
+                "technical_contact": None,
+            },
+            "financial_details": {
+                "currency": "USD",
+                "line_items": [
+                    {
+                        "description": "Platform subscription",
+                        "quantity": quantity,
+                        "unit_price": round(total / quantity, 2),
+                        "total": total,
+                    }
+                ],
+                "subtotal": total,
+                "tax_rate": None,
+                "tax_amount": None,
+                "total_value": total,
+                "additional_fees": [],
+            },
+            "payment_structure": {
+                "payment_terms": f"Net {terms.group(1)}" if terms else "Net 30",
+                "payment_method": rng.choice(["Wire transfer", "ACH", None]),
+                "payment_schedule": [],
+                "due_dates": [],
+                "bank_details": None,
+            },
+            "revenue_classification": {
+                "has_recurring": True,
+                "has_one_time": False,
+                "billing_cycle": rng.choice(["monthly", "quarterly", "annual"]),
+                "auto_renewal": rng.random() < 0.5,
+                "renewal_terms": None,
+            },
+            "sla_terms": {
+                "uptime_guarantee": "99.9%",
+                "response_time": "4 hours",
+                "resolution_time": None,
+                "performance_metrics": [],
+                "penalties": [],
+                "support_hours": "24/7",
+            },
+        }
@@ -0,0 +1,158 @@
+"""
+Tolerant JSON handling for streamed LLM output
+
+SectionStreamParser consumes a completion chunk by chunk and reports each
+top-level member of the JSON object as soon as its value is complete, so
+sections can be persisted before the model has finished. repair_json
+recovers as much of a fenced or truncated response as possible.
+"""
+
+import json
+from typing import Any, Callable, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class SectionStreamParser:
+    def __init__(self, on_section: Optional[Callable[[str, Any], None]] = None):
+        self.on_section = on_section
+        self.sections = {}
+
+        self._buffer = ""
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, chunk: str):
+        offset = len(self._buffer)
+        self._buffer += chunk
+        if self._done:
+            return
+        for i in range(offset, len(self._buffer)):
+            c = self._buffer[i]
+
+            # Skip any preamble or ```json fence before the object opens
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = self._buffer[self._key_start : i + 1]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+            elif c == ":" and self._depth == 1:
+                self._value_start = i + 1
+                self._expect_key = False
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_member(i)
+                    self._done = True
+                    return
+            elif c == "," and self._depth == 1:
+                self._finish_member(i)
+                self._expect_key = True
+
+    def _finish_member(self, end: int):
+        if self._key is None or self._value_start is None:
+            return
+        try:
+            key = json.loads(self._key)
+            value = json.loads(self._buffer[self._value_start : end])
+        except ValueError:
+            return
+        finally:
+            self._key = None
+            self._value_start = None
+
+        self.sections[key] = value
+        if self.on_section:
+            self.on_section(key, value)
+
+
+def repair_json(text: str) -> Optional[dict]:
+    """
+    Best-effort decode of an LLM response: ignores text around the object
+    (markdown fences, commentary) and closes a truncated object after the
+    last complete member.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    body = text[start:]
+
+    stack = []
+    in_string = False
+    escape = False
+    # Positions where cutting the text and closing the open brackets should
+    # leave valid JSON, with the bracket stack at that point
+    cut_points = []
+
+    for i, c in enumerate(body):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+            continue
+
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+            cut_points.append((i + 1, tuple(stack)))
+        elif c in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                try:
+                    return json.loads(body[: i + 1])
+                except ValueError:
+                    break
+            cut_points.append((i + 1, tuple(stack)))
+        elif c == ",":
+            cut_points.append((i, tuple(stack)))
+
+    # A string cut off mid-way is dropped rather than guessed at
+    attempts = [] if in_string else [(body, tuple(stack))]
+    attempts += [(body[:end], snapshot) for end, snapshot in reversed(cut_points)]
+
+    for prefix, snapshot in attempts[:64]:
+        candidate = prefix.rstrip().rstrip(",") + "".join(
+            _CLOSERS[c] for c in reversed(snapshot)
+        )
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
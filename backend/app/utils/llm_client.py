@@ -3,98 +3,372 @@ LLM Client for contract data extraction
 Supports both OpenAI and Anthropic APIs
 """
 
-from typing import Optional
+import time
+from typing import Iterator, Optional
 from app.config import settings
+from app.utils.metrics import LLM_DURATION, LLM_FIRST_TOKEN, record_llm_usage
+from app.utils.llm_recorder import LLMRecordingStore, ReplayLLMProvider
+
+PROMPT_CACHE_KEY = "contract-extraction"
+
+
+class LLMTimeout(Exception):
+    """A provider request exceeded LLM_REQUEST_TIMEOUT"""
 
 
 class LLMClient:
     def __init__(self):
+        # The provider SDK's timeout exceptions, mapped to LLMTimeout
+        self.timeout_errors = ()
+        # Per request; the parser lowers it to what is left of its budget
+        self.request_timeout = settings.LLM_REQUEST_TIMEOUT
+        self.use_fake = settings.LLM_PROVIDER == "fake"
+        self.use_replay = settings.LLM_PROVIDER == "replay"
+
+        # Record mode captures every live prompt/response pair for later replay
+        self.recorder = None
+        if settings.LLM_RECORD and not self.use_replay:
+            self.recorder = LLMRecordingStore(settings.LLM_RECORDINGS_DIR)
+
+        if self.use_fake or self.use_replay:
+            if self.use_fake:
+                from app.utils.fake_llm import FakeLLMProvider
+
+                self.fake_client = FakeLLMProvider()
+            else:
+                self.replay_client = ReplayLLMProvider(
+                    LLMRecordingStore(settings.LLM_RECORDINGS_DIR),
+                    with_latency=settings.LLM_REPLAY_LATENCY,
+                )
+            self.use_openai = self.use_anthropic = self.use_gemini = False
+            return
+
         self.use_openai = bool(settings.OPENAI_API_KEY)
         self.use_anthropic = bool(settings.ANTHROPIC_API_KEY)
         self.use_gemini = bool(settings.GEMINI_API_KEY)
 
         if self.use_openai:
-            from openai import OpenAI
+            from openai import APITimeoutError, OpenAI
 
-            self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.openai_client = OpenAI(
+                api_key=settings.OPENAI_API_KEY, timeout=settings.LLM_REQUEST_TIMEOUT
+            )
+            self.timeout_errors = (APITimeoutError,)
 
         elif self.use_anthropic:
-            from anthropic import Anthropic
+            from anthropic import Anthropic, APITimeoutError
 
-            self.anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+            self.anthropic_client = Anthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                timeout=settings.LLM_REQUEST_TIMEOUT,
+            )
+            self.timeout_errors = (APITimeoutError,)
 
         elif self.use_gemini:
             import google.generativeai as genai
+            from google.api_core.exceptions import DeadlineExceeded
 
             genai.configure(api_key=settings.GEMINI_API_KEY)
             self.gemini_client = genai.GenerativeModel(settings.GEMINI_MODEL)
+            self.timeout_errors = (DeadlineExceeded,)
         else:
             raise ValueError(
                 "Either OPENAI_API_KEY or ANTHROPIC_API_KEY or GEMINI_API_KEY must be set"
             )
 
-    def extract_data(self, prompt: str, max_tokens: int = 4000) -> str:
+    @property
+    def provider(self) -> str:
+        if self.use_fake:
+            return "fake"
+        if self.use_replay:
+            return "replay"
+        if self.use_openai:
+            return "openai"
+        if self.use_anthropic:
+            return "anthropic"
+        return "gemini"
+
+    def extract_data(
+        self, prompt: str, max_tokens: int = 4000, cache_prefix: Optional[str] = None
+    ) -> str:
         """
-        Send extraction prompt to LLM and get structured response
+        Send extraction prompt to LLM and get structured response.
+        `cache_prefix` is static text that precedes the prompt; providers that
+        support it are asked to cache it between requests.
         """
-        if self.use_openai:
-            return self._extract_with_openai(prompt, max_tokens)
+        start = time.perf_counter()
+        with LLM_DURATION.labels(self.provider).time():
+            response = self._dispatch(prompt, max_tokens, cache_prefix or "")
+        if self.recorder:
+            self.recorder.record(
+                (cache_prefix or "") + prompt,
+                max_tokens,
+                response,
+                latency=time.perf_counter() - start,
+                provider=self.provider,
+            )
+        return response
+
+    def stream_data(
+        self, prompt: str, max_tokens: int = 4000, cache_prefix: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Send extraction prompt to LLM and yield the response text as it arrives
+        """
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self._dispatch_stream(prompt, max_tokens, cache_prefix or ""):
+            if not chunks:
+                LLM_FIRST_TOKEN.labels(self.provider).observe(
+                    time.perf_counter() - start
+                )
+            chunks.append(chunk)
+            yield chunk
+
+        latency = time.perf_counter() - start
+        LLM_DURATION.labels(self.provider).observe(latency)
+        if self.recorder:
+            self.recorder.record(
+                (cache_prefix or "") + prompt,
+                max_tokens,
+                "".join(chunks),
+                latency=latency,
+                provider=self.provider,
+            )
+
+    def _dispatch_stream(
+        self, prompt: str, max_tokens: int, prefix: str
+    ) -> Iterator[str]:
+        if self.use_fake:
+            return self._stream_with_fake(prompt, max_tokens, prefix)
+        elif self.use_replay:
+            return iter([self.replay_client.extract_data(prefix + prompt, max_tokens)])
+        elif self.use_openai:
+            return self._stream_with_openai(prompt, max_tokens, prefix)
         elif self.use_anthropic:
-            return self._extract_with_anthropic(prompt, max_tokens)
+            return self._stream_with_anthropic(prompt, max_tokens, prefix)
         elif self.use_gemini:
-            return self._extract_with_gemini(prompt, max_tokens)
+            return self._stream_with_gemini(prompt, max_tokens, prefix)
         else:
             raise ValueError(
                 "Either OPENAI_API_KEY or ANTHROPIC_API_KEY or GEMINI_API_KEY must be set"
             )
 
-    def _extract_with_openai(self, prompt: str, max_tokens: int) -> str:
+    def _dispatch(self, prompt: str, max_tokens: int, prefix: str) -> str:
+        if self.use_fake:
+            return self._extract_with_fake(prompt, max_tokens, prefix)
+        elif self.use_replay:
+            return self.replay_client.extract_data(prefix + prompt, max_tokens)
+        elif self.use_openai:
+            return self._extract_with_openai(prompt, max_tokens, prefix)
+        elif self.use_anthropic:
+            return self._extract_with_anthropic(prompt, max_tokens, prefix)
+        elif self.use_gemini:
+            return self._extract_with_gemini(prompt, max_tokens, prefix)
+        else:
+            raise ValueError(
+                "Either OPENAI_API_KEY or ANTHROPIC_API_KEY or GEMINI_API_KEY must be set"
+            )
+
+    def _openai_request(self, prompt: str, prefix: str) -> dict:
+        # OpenAI caches the longest previously seen prefix automatically once
+        # the prompt exceeds 1024 tokens; the key keeps extraction requests
+        # routed to the same cache
+        request = {
+            "model": settings.OPENAI_MODEL,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a contract analysis expert. Extract structured data from contracts and return only valid JSON.",
+                },
+                {"role": "user", "content": prefix + prompt},
+            ],
+        }
+        if settings.LLM_PROMPT_CACHING and prefix:
+            request["prompt_cache_key"] = PROMPT_CACHE_KEY
+        return request
+
+    def _anthropic_request(self, prompt: str, prefix: str) -> dict:
+        # The static prefix goes in a system block marked as a cache breakpoint
+        # so later requests read it from the cache instead of reprocessing it
+        request = {"messages": [{"role": "user", "content": prompt}]}
+        if prefix:
+            block = {"type": "text", "text": prefix}
+            if settings.LLM_PROMPT_CACHING:
+                block["cache_control"] = {"type": "ephemeral"}
+            request["system"] = [block]
+        return request
+
+    def _record_openai_usage(self, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        record_llm_usage(
+            "openai",
+            usage.prompt_tokens,
+            usage.completion_tokens,
+            cached_tokens=getattr(details, "cached_tokens", None),
+        )
+
+    def _record_anthropic_usage(self, usage):
+        # input_tokens excludes cached reads and writes; report the full prompt
+        cached = usage.cache_read_input_tokens or 0
+        written = usage.cache_creation_input_tokens or 0
+        record_llm_usage(
+            "anthropic",
+            usage.input_tokens + cached + written,
+            usage.output_tokens,
+            cached_tokens=cached,
+            cache_write_tokens=written,
+        )
+
+    def _record_gemini_usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            record_llm_usage(
+                "gemini",
+                usage.prompt_token_count,
+                usage.candidates_token_count,
+                cached_tokens=getattr(usage, "cached_content_token_count", None),
+            )
+
+    def _extract_with_openai(self, prompt: str, max_tokens: int, prefix: str) -> str:
         """Use OpenAI API for extraction"""
         try:
             response = self.openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a contract analysis expert. Extract structured data from contracts and return only valid JSON.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+                **self._openai_request(prompt, prefix),
                 max_tokens=max_tokens,
                 temperature=0.1,  # Low temperature for consistent extraction
                 response_format={"type": "json_object"},  # Ensure JSON response
+                timeout=self.request_timeout,
             )
 
+            if response.usage:
+                self._record_openai_usage(response.usage)
             return response.choices[0].message.content
 
+        except self.timeout_errors as e:
+            raise LLMTimeout(f"OpenAI request timed out: {str(e)}")
         except Exception as e:
             raise Exception(f"OpenAI API error: {str(e)}")
 
-    def _extract_with_anthropic(self, prompt: str, max_tokens: int) -> str:
+    def _extract_with_anthropic(self, prompt: str, max_tokens: int, prefix: str) -> str:
         """Use Anthropic Claude API for extraction"""
         try:
             response = self.anthropic_client.messages.create(
+                **self._anthropic_request(prompt, prefix),
                 model=settings.ANTHROPIC_MODEL,
                 max_tokens=max_tokens,
                 temperature=0.1,
-                messages=[{"role": "user", "content": prompt}],
+                timeout=self.request_timeout,
             )
 
+            self._record_anthropic_usage(response.usage)
             return response.content[0].text
 
+        except self.timeout_errors as e:
+            raise LLMTimeout(f"Anthropic request timed out: {str(e)}")
         except Exception as e:
             raise Exception(f"Anthropic API error: {str(e)}")
 
-    def _extract_with_gemini(self, prompt: str, max_tokens: int) -> str:
+    def _extract_with_gemini(self, prompt: str, max_tokens: int, prefix: str) -> str:
+        # Gemini 2.x applies implicit caching to repeated prompt prefixes, so
+        # keeping the static part first is all that is needed
         try:
             response = self.gemini_client.generate_content(
-                prompt,
+                prefix + prompt,
                 generation_config={
                     "temperature": 0.1,
                     "max_output_tokens": max_tokens,
                 },
+                request_options={"timeout": self.request_timeout},
             )
             print("LLM raw response:\n", response)
+            self._record_gemini_usage(response)
             return response.text
+        except self.timeout_errors as e:
+            raise LLMTimeout(f"Gemini request timed out: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Gemini API error: {str(e)}")
+
+    def _extract_with_fake(self, prompt: str, max_tokens: int, prefix: str) -> str:
+        """Offline deterministic provider (benchmarks and load tests)"""
+        response = self.fake_client.extract_data(prefix + prompt, max_tokens)
+        # Rough 4-characters-per-token estimate keeps the token metrics populated
+        record_llm_usage("fake", len(prefix + prompt) // 4, len(response) // 4)
+        return response
+
+    def _stream_with_openai(
+        self, prompt: str, max_tokens: int, prefix: str
+    ) -> Iterator[str]:
+        try:
+            stream = self.openai_client.chat.completions.create(
+                **self._openai_request(prompt, prefix),
+                max_tokens=max_tokens,
+                temperature=0.1,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=self.request_timeout,
+            )
+            # Closed with the generator, so an abandoned stream ends the request
+            with stream:
+                for chunk in stream:
+                    if chunk.usage:
+                        self._record_openai_usage(chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+
+        except self.timeout_errors as e:
+            raise LLMTimeout(f"OpenAI request timed out: {str(e)}")
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+
+    def _stream_with_anthropic(
+        self, prompt: str, max_tokens: int, prefix: str
+    ) -> Iterator[str]:
+        try:
+            with self.anthropic_client.messages.stream(
+                **self._anthropic_request(prompt, prefix),
+                model=settings.ANTHROPIC_MODEL,
+                max_tokens=max_tokens,
+                temperature=0.1,
+                timeout=self.request_timeout,
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+                self._record_anthropic_usage(stream.get_final_message().usage)
+
+        except self.timeout_errors as e:
+            raise LLMTimeout(f"Anthropic request timed out: {str(e)}")
+        except Exception as e:
+            raise Exception(f"Anthropic API error: {str(e)}")
+
+    def _stream_with_gemini(
+        self, prompt: str, max_tokens: int, prefix: str
+    ) -> Iterator[str]:
+        try:
+            response = self.gemini_client.generate_content(
+                prefix + prompt,
+                generation_config={
+                    "temperature": 0.1,
+                    "max_output_tokens": max_tokens,
+                },
+                stream=True,
+                request_options={"timeout": self.request_timeout},
+            )
+            for chunk in response:
+                if chunk.parts:
+                    yield chunk.text
+            self._record_gemini_usage(response)
+        except self.timeout_errors as e:
+            raise LLMTimeout(f"Gemini request timed out: {str(e)}")
         except Exception as e:
             raise Exception(f"Gemini API error: {str(e)}")
+
+    def _stream_with_fake(
+        self, prompt: str, max_tokens: int, prefix: str
+    ) -> Iterator[str]:
+        response = ""
+        for chunk in self.fake_client.stream_data(prefix + prompt, max_tokens):
+            response += chunk
+            yield chunk
+        record_llm_usage("fake", len(prefix + prompt) // 4, len(response) // 4)
@@ -0,0 +1,79 @@
+"""
+Record/replay store for LLM prompt -> response pairs
+
+With LLM_RECORD=true every live completion is written to
+LLM_RECORDINGS_DIR, one JSON file per prompt hash. LLM_PROVIDER=replay then
+serves those responses back (optionally with the recorded latency), so a
+production-shaped workload can be re-run without network access.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+
+class LLMRecordingStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @staticmethod
+    def key(prompt: str, max_tokens: int) -> str:
+        return hashlib.sha256(f"{max_tokens}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small for large recordings
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, prompt: str, max_tokens: int) -> Optional[dict]:
+        try:
+            with open(self._path(self.key(prompt, max_tokens))) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def record(
+        self,
+        prompt: str,
+        max_tokens: int,
+        response: str,
+        latency: float,
+        provider: str,
+    ):
+        key = self.key(prompt, max_tokens)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "key": key,
+            "provider": provider,
+            "max_tokens": max_tokens,
+            "prompt": prompt,
+            "response": response,
+            "latency": round(latency, 4),
+            "recorded_at": datetime.utcnow().isoformat(),
+        }
+        # Write-then-rename so concurrent workers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+class ReplayLLMProvider:
+    def __init__(self, store: LLMRecordingStore, with_latency: bool = False):
+        self.store = store
+        self.with_latency = with_latency
+
+    def extract_data(self, prompt: str, max_tokens: int = 4000) -> str:
+        entry = self.store.get(prompt, max_tokens)
+        if entry is None:
+            raise Exception(
+                "Replay error: no recorded response for prompt "
+                f"{LLMRecordingStore.key(prompt, max_tokens)[:12]}"
+            )
+        if self.with_latency:
+            time.sleep(entry["latency"])
+        return entry["response"]
@@ -0,0 +1,85 @@
+"""
+Event loop lag monitor for the API
+
+A background task sleeps for a short interval and measures how late the
+loop wakes it up; the lateness is time some callback held the loop. The
+HTTP middleware registers every request while it is in flight, so when a
+stall exceeds EVENT_LOOP_LAG_THRESHOLD_MS the requests that were running
+(one of which blocked the loop) are logged and counted per route.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.utils.metrics import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+
+
+def _route(scope: dict) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+class LoopLagMonitor:
+    def __init__(
+        self, threshold_ms: Optional[float] = None, interval_ms: Optional[float] = None
+    ):
+        self.threshold = (
+            settings.EVENT_LOOP_LAG_THRESHOLD_MS
+            if threshold_ms is None
+            else threshold_ms
+        ) / 1000
+        self.interval = (
+            settings.EVENT_LOOP_LAG_INTERVAL_MS if interval_ms is None else interval_ms
+        ) / 1000
+        self.stalls = deque(maxlen=100)  # Most recent stalls, for inspection
+        self._in_flight: Dict[int, dict] = {}
+        self._ids = itertools.count()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @contextmanager
+    def track(self, scope: dict):
+        """Register a request (its ASGI scope) for the duration of the block"""
+        request_id = next(self._ids)
+        self._in_flight[request_id] = scope
+        try:
+            yield
+        finally:
+            del self._in_flight[request_id]
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag > self.threshold:
+                self._report(lag)
+
+    def _report(self, lag: float):
+        routes: List[str] = sorted({_route(s) for s in self._in_flight.values()})
+        for route in routes:
+            EVENT_LOOP_STALLS.labels(route).inc()
+        self.stalls.append({"lag_ms": round(lag * 1000, 1), "routes": routes})
+        print(
+            f"Event loop blocked for {lag * 1000:.0f}ms; "
+            f"in flight: {', '.join(routes) or 'no requests'}"
+        )
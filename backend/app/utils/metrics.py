@@ -0,0 +1,184 @@
+"""
+Prometheus metrics shared by the API and the Celery workers
+
+The API serves its own process's metrics on /metrics. Workers run with
+PROMETHEUS_MULTIPROC_DIR set so every pool process writes to a directory
+local to the worker container, which the worker's main process exposes on
+WORKER_METRICS_PORT; scrape each worker there. The directory has to be
+empty when a worker starts, or the files of the previous run (same pids
+after a container restart) are merged in: docker-compose wipes it before
+starting celery.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from pymongo import monitoring
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+TOKEN_BUCKETS = (100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+REQUEST_DURATION = Histogram(
+    "http_request_seconds", "API request latency", ["method", "route"]
+)
+ADMISSION_DECISIONS = Counter(
+    "upload_admission_total",
+    "Upload admission decisions (admitted, deferred, rejected)",
+    ["decision"],
+)
+CONTRACTS_CANCELLED = Counter(
+    "contracts_cancelled_total",
+    "Contracts cancelled (or deleted) before their pipeline finished",
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the API event loop woke the lag monitor",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+EVENT_LOOP_STALLS = Counter(
+    "event_loop_stalls_total",
+    "Loop stalls above the threshold, by route of the requests in flight",
+    ["route"],
+)
+STAGE_DURATION = Histogram(
+    "contract_stage_seconds",
+    "Pipeline stage duration",
+    ["stage"],
+    buckets=LONG_BUCKETS,
+)
+STAGE_FAILURES = Counter(
+    "contract_stage_failures_total", "Pipeline failures by stage", ["stage"]
+)
+EXTRACTION_DURATION = Histogram(
+    "pdf_extraction_seconds",
+    "Text extraction time by engine",
+    ["engine"],
+    buckets=LONG_BUCKETS,
+)
+EXTRACTION_ENGINE = Counter(
+    "pdf_extraction_engine_total", "Extraction engine chosen per document", ["engine"]
+)
+OCR_PAGES = Counter("pdf_ocr_pages_total", "Pages run through OCR")
+TABLES_EXTRACTED = Counter(
+    "pdf_tables_extracted_total",
+    "Tables mapped directly to structured fields instead of sent to the LLM",
+    ["kind"],
+)
+EXTRACTION_TIER = Counter(
+    "extraction_tier_total",
+    "Contracts by extraction path (rules, rules+llm, llm, template, template+llm)",
+    ["tier"],
+)
+LLM_DURATION = Histogram(
+    "llm_request_seconds",
+    "LLM request latency",
+    ["provider"],
+    buckets=LONG_BUCKETS,
+)
+LLM_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time until the first streamed chunk arrives",
+    ["provider"],
+    buckets=LONG_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "llm_tokens",
+    "Tokens per LLM request",
+    ["provider", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"]
+)
+CLAUSE_CACHE_CHARACTERS = Counter(
+    "clause_cache_characters_total",
+    "Contract text served from (hit) or sent past (miss) the clause cache",
+    ["result"],
+)
+MONGO_DURATION = Histogram(
+    "mongo_command_seconds",
+    "MongoDB command latency",
+    ["command"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+QUEUE_DEPTH = Gauge(
+    "celery_queue_depth",
+    "Messages waiting in each Celery queue",
+    ["queue"],
+    multiprocess_mode="livemax",
+)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Pymongo listener feeding MONGO_DURATION (pass via event_listeners)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_DURATION.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_DURATION.labels(event.command_name).observe(event.duration_micros / 1e6)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_llm_usage(
+    provider: str,
+    prompt_tokens,
+    completion_tokens,
+    cached_tokens=None,
+    cache_write_tokens=None,
+):
+    """
+    `cached_tokens` is the part of the prompt served from the provider's
+    prompt cache, `cache_write_tokens` the part written to it
+    """
+    if prompt_tokens is not None:
+        LLM_TOKENS.labels(provider, "prompt").observe(prompt_tokens)
+    if completion_tokens is not None:
+        LLM_TOKENS.labels(provider, "completion").observe(completion_tokens)
+    if cached_tokens is not None:
+        LLM_TOKENS.labels(provider, "cached").observe(cached_tokens)
+        record_cache_lookup("llm_prompt", cached_tokens > 0)
+    if cache_write_tokens:
+        LLM_TOKENS.labels(provider, "cache_write").observe(cache_write_tokens)
+
+
+def _registry():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_latest() -> tuple:
+    """Return (payload, content_type) for a scrape"""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_worker_metrics_server(port: int):
+    start_http_server(port, registry=_registry())
+
+
+def mark_process_dead(pid: int):
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
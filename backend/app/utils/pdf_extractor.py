@@ -1,166 +1,238 @@
 """
 PDF Text Extraction Utility
 Handles PDF parsing with multiple fallback methods including OCR
+
+The engines live in extraction_backends.py; this class picks their order
+per document from measured speed and drives the one running page by page.
+pdfplumber and PyPDF2 are imported where they are used, so importing this
+module (the API does, to count pages) does not load them.
 """
 
-import PyPDF2
-import pdfplumber
-from typing import Optional
-import tempfile
+from typing import Callable, Optional
+import io
 import os
+import time
+from app.config import settings
+from app.services.cancellation import ContractCancelled
+from app.utils.deadline import Deadline
+from app.utils.extraction_backends import (
+    BACKENDS,
+    BackendStats,
+    ExtractionBackend,
+    document_class,
+    may_contain_table,
+    select_backends,
+)
+from app.utils.metrics import EXTRACTION_DURATION, EXTRACTION_ENGINE
+
+# Speed stats of this process, for callers without shared ones (batch, CLI)
+LOCAL_STATS = BackendStats()
 
 
 class PDFExtractor:
-    def __init__(self):
+    def __init__(self, stats: Optional[BackendStats] = None):
         self.min_text_threshold = 100  # Minimum characters for valid extraction
-    
-    def extract_text(self, file_path: str) -> str:
+        self.stats = stats or LOCAL_STATS
+        self.page_timings = []  # Per-page extraction time of the last run
+        self.tables = []  # Pricing/schedule tables mapped in the last run
+        self.pages = []  # Text of the pages read by the current engine
+        self.truncated = False  # The time budget ran out before the last page
+        self.backend = None  # Engine whose text the last run returned
+        self.cancel_check = None
+        self.deadline = None
+
+    def extract_text(
+        self,
+        file_path: str,
+        cancel_check: Optional[Callable[[], None]] = None,
+        deadline: Optional[Deadline] = None,
+        page_count: Optional[int] = None,
+    ) -> str:
         """
-        Extract text from PDF using multiple methods with OCR fallback
+        Extract text from PDF, trying the engines fastest-first for this kind
+        of document (from `page_count`, as counted at upload, and the file
+        size). `cancel_check` is called before each page and may raise
+        ContractCancelled to stop the extraction. Once `deadline` passes no
+        further page is read and the pages read so far are returned.
         """
         text = ""
-        
-        # Try pdfplumber first (better for complex layouts)
-        try:
-            text = self._extract_with_pdfplumber(file_path)
-            if text and len(text.strip()) > self.min_text_threshold:
-                print("✓ Extracted text using pdfplumber")
-                return text
-        except Exception as e:
-            print(f"pdfplumber failed: {e}")
-        
-        # Fallback to PyPDF2
-        try:
-            text = self._extract_with_pypdf2(file_path)
-            if text and len(text.strip()) > self.min_text_threshold:
-                print("✓ Extracted text using PyPDF2")
+        self.page_timings = []
+        self.tables = []
+        self.pages = []
+        self.truncated = False
+        self.backend = None
+        self.cancel_check = cancel_check
+        self.deadline = deadline
+
+        doc_class = document_class(page_count, os.path.getsize(file_path))
+        for backend in select_backends(self.stats.read(doc_class)):
+            self.tables = []
+            start = time.perf_counter()
+            try:
+                text = self._run_backend(backend, file_path)
+            except ContractCancelled:
+                raise
+            except Exception as e:
+                print(f"{backend.name} failed: {e}")
+                text = ""
+            seconds = time.perf_counter() - start
+            EXTRACTION_DURATION.labels(backend.name).observe(seconds)
+            ok = len(text.strip()) > self.min_text_threshold
+            if not self.truncated:
+                # A cut-short run says nothing about the engine's speed
+                self.stats.record(
+                    doc_class, backend.name, seconds, len(text), len(self.pages), ok
+                )
+            if ok:
+                print(f"✓ Extracted text using {backend.name} ({doc_class})")
+                EXTRACTION_ENGINE.labels(backend.name).inc()
+                self.backend = backend.name
+                if settings.TABLE_EXTRACTION and not backend.tables:
+                    text = self._table_pass(file_path) or text
                 return text
-        except Exception as e:
-            print(f"PyPDF2 failed: {e}")
-        
-        # Final fallback to OCR (for scanned PDFs or image-based PDFs)
-        # try:
-        #     print("⚠ Insufficient text extracted, attempting OCR...")
-        #     text = self._extract_with_ocr(file_path)
-        #     if text and len(text.strip()) > self.min_text_threshold:
-        #         print("✓ Extracted text using OCR")
-        #         return text
-        # except Exception as e:
-        #     print(f"OCR extraction failed: {e}")
-        
-        if not text or len(text.strip()) < self.min_text_threshold:
-            raise Exception(
-                "Could not extract sufficient text from PDF. "
-                "The file may be corrupted, image-only without readable text, or empty."
+            if self._out_of_time():
+                # No budget left for the fallbacks
+                return self._partial_text()
+
+        raise Exception(
+            "Could not extract sufficient text from PDF. "
+            "The file may be corrupted, image-only without readable text, or empty."
+        )
+
+    def _run_backend(self, backend: ExtractionBackend, file_path: str) -> str:
+        """Read pages from one engine until the last page or the deadline"""
+        self.pages = []
+        deadline = self.deadline
+        if backend.time_limit is not None:
+            deadline = (deadline or Deadline(backend.time_limit)).limit(
+                backend.time_limit
             )
-        
-        return text
-    
-    def _extract_with_pdfplumber(self, file_path: str) -> str:
-        """Extract text using pdfplumber (better for tables and layouts)"""
-        text = ""
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
-        return text.strip()
-    
-    def _extract_with_pypdf2(self, file_path: str) -> str:
-        """Extract text using PyPDF2 (faster, simpler)"""
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
-        return text.strip()
-    
-    def _extract_with_ocr(self, file_path: str) -> str:
+        pages = backend.iter_pages(file_path, self.tables, deadline)
+        try:
+            page_number = 0
+            while True:
+                self._check_cancelled()
+                if self._out_of_time() or (deadline and deadline.expired()):
+                    self.truncated = True
+                    break
+                start = time.perf_counter()
+                page_text = next(pages, None)
+                if page_text is None:
+                    break
+                page_number += 1
+                self._record_page(backend.name, page_number, start, page_text)
+                self.pages.append(page_text)
+        finally:
+            pages.close()
+        return self._joined()
+
+    def _table_pass(self, file_path: str) -> Optional[str]:
         """
-        Extract text using OCR (pytesseract + pdf2image)
-        For scanned PDFs or image-based PDFs
+        After a plain-text engine: run pdfplumber's table mapping on the
+        pages that look like they hold a pricing/schedule table and use its
+        text for the pages where it recognized one
         """
+        plumber = BACKENDS.get("pdfplumber")
+        candidates = [
+            n
+            for n, page_text in enumerate(self.pages, start=1)
+            if may_contain_table(page_text)
+        ]
+        if not candidates or not plumber or not plumber.available():
+            return None
+        if self._out_of_time():
+            return None
         try:
-            from pdf2image import convert_from_path
-            import pytesseract
-            from PIL import Image
-        except ImportError:
-            raise Exception(
-                "OCR dependencies not installed. Install with: "
-                "pip install pytesseract pdf2image pillow"
-            )
-        
-        text = ""
-        
-        # Convert PDF pages to images
-        try:
-            images = convert_from_path(file_path, dpi=300)  # Higher DPI for better OCR
+            replaced = plumber.extract_pages(file_path, candidates, self.tables)
         except Exception as e:
-            raise Exception(f"Failed to convert PDF to images: {e}")
-        
-        # Run OCR on each page
-        for i, image in enumerate(images):
-            try:
-                print(f"  OCR processing page {i+1}/{len(images)}...")
-                
-                # Configure tesseract for better accuracy
-                custom_config = r'--oem 3 --psm 6'  # LSTM OCR, assume uniform text block
-                
-                page_text = pytesseract.image_to_string(
-                    image,
-                    config=custom_config,
-                    lang='eng'  # Can add more languages: 'eng+fra+deu'
-                )
-                
-                if page_text:
-                    text += f"\n\n--- Page {i+1} ---\n\n{page_text}"
-                    
-            except Exception as e:
-                print(f"  Failed to OCR page {i+1}: {e}")
-                continue
-        
-        return text.strip()
-    
+            print(f"Table pass failed: {e}")
+            self.tables = []
+            return None
+        for n in {table["page"] for table in self.tables}:
+            self.pages[n - 1] = replaced[n]
+        return self._joined()
+
+    def _joined(self) -> str:
+        return "\n\n".join(page for page in self.pages if page).strip()
+
+    def _check_cancelled(self):
+        if self.cancel_check:
+            self.cancel_check()
+
+    def _out_of_time(self) -> bool:
+        if self.deadline is not None and self.deadline.expired():
+            self.truncated = True
+        return self.truncated
+
+    def _partial_text(self) -> str:
+        """The pages read before the deadline, if they are enough to go on"""
+        text = self._joined()
+        if len(text) > self.min_text_threshold:
+            print(f"⚠ Time budget spent; continuing with {len(self.pages)} pages")
+            return text
+        raise Exception(
+            "Ran out of time before enough text was extracted from the PDF."
+        )
+
+    def _record_page(self, engine: str, page_number: int, start: float, page_text):
+        self.page_timings.append(
+            {
+                "engine": engine,
+                "page": page_number,
+                "seconds": round(time.perf_counter() - start, 4),
+                "chars": len(page_text or ""),
+            }
+        )
+
     def get_metadata(self, file_path: str) -> dict:
         """Extract PDF metadata"""
+        import PyPDF2
+
         try:
-            with open(file_path, 'rb') as file:
+            with open(file_path, "rb") as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 metadata = pdf_reader.metadata
                 return {
                     "num_pages": len(pdf_reader.pages),
-                    "title": metadata.get('/Title', '') if metadata else '',
-                    "author": metadata.get('/Author', '') if metadata else '',
-                    "subject": metadata.get('/Subject', '') if metadata else '',
-                    "creator": metadata.get('/Creator', '') if metadata else '',
-                    "producer": metadata.get('/Producer', '') if metadata else ''
+                    "title": metadata.get("/Title", "") if metadata else "",
+                    "author": metadata.get("/Author", "") if metadata else "",
+                    "subject": metadata.get("/Subject", "") if metadata else "",
+                    "creator": metadata.get("/Creator", "") if metadata else "",
+                    "producer": metadata.get("/Producer", "") if metadata else "",
                 }
         except Exception as e:
             return {"error": str(e)}
-    
+
+    def count_pages(self, data: bytes) -> int:
+        """Count pages of an in-memory PDF (0 if it cannot be read)"""
+        import PyPDF2
+
+        try:
+            return len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+        except Exception:
+            return 0
+
     def is_scanned_pdf(self, file_path: str) -> bool:
         """
         Detect if PDF is likely scanned (image-based) vs text-based
         """
         try:
             # Try to extract text with PyPDF2
-            text = self._extract_with_pypdf2(file_path)
-            
+            text = "\n\n".join(BACKENDS["pypdf2"].iter_pages(file_path, [])).strip()
+
             # Get metadata
             metadata = self.get_metadata(file_path)
-            num_pages = metadata.get('num_pages', 0)
-            
+            num_pages = metadata.get("num_pages", 0)
+
             if num_pages == 0:
                 return True
-            
+
             # Calculate average characters per page
             avg_chars_per_page = len(text) / num_pages if num_pages > 0 else 0
-            
+
             # If very few characters per page, likely scanned
             # Typical text PDF has 1000+ characters per page
             return avg_chars_per_page < 100
-            
+
         except Exception:
-            return True  # Assume scanned if we can't determine
\ No newline at end of file
+            return True  # Assume scanned if we can't determine
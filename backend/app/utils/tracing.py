@@ -0,0 +1,146 @@
+"""
+Per-contract timing traces and opt-in stage profiling
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from app.config import settings
+
+
+def should_profile(requested: bool) -> bool:
+    """Profile when asked to, or for a random sample of uploads"""
+    return requested or random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+class StageProfiler:
+    """
+    Sampling profiler for one pipeline stage. Uses pyinstrument when it is
+    installed and falls back to cProfile otherwise. A thread runs one
+    profiler at a time, and the gevent pool (llm stage) runs many tasks in
+    one thread: RuntimeError when another task is being profiled.
+    """
+
+    def __init__(self):
+        if sys.getprofile() is not None:
+            raise RuntimeError("A profiler is already running in this thread")
+        try:
+            from pyinstrument import Profiler
+
+            self.kind = "pyinstrument"
+            self.profiler = Profiler(interval=0.005)
+            self.profiler.start()
+        except ImportError:
+            import cProfile
+
+            self.kind = "cprofile"
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self):
+        if self.kind == "cprofile":
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+
+    def save(self, name: str) -> str:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        if self.kind == "cprofile":
+            path = os.path.join(settings.PROFILE_DIR, f"{name}.prof")
+            self.profiler.dump_stats(path)
+        else:
+            path = os.path.join(settings.PROFILE_DIR, f"{name}.html")
+            with open(path, "w") as f:
+                f.write(self.profiler.output_html())
+        return path
+
+
+class StageTrace:
+    """
+    Timing record for one pipeline stage. `finish` returns it as a trace
+    fragment; the fragments travel down the chain with the payload and are
+    stored with the contract's final completed or failed write (see
+    merge_traces), not one write per stage.
+    """
+
+    def __init__(self, stage: str, profile: bool = False):
+        self.stage = stage
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.pages: List[dict] = []
+        self.profiler: Optional[StageProfiler] = None
+        if profile:
+            try:
+                self.profiler = StageProfiler()
+            except RuntimeError as e:
+                print(f"Not profiling the {stage} stage: {e}")
+        self.fragment: Optional[dict] = None
+
+    def add_pages(self, page_timings: List[dict]):
+        self.pages.extend(page_timings)
+
+    def finish(self, contract_id: str, error: Optional[str] = None) -> dict:
+        """
+        The stage's fragment. Timed on the first call; a later call (the
+        stage failed after finishing its work) only adds the error.
+        """
+        if self.fragment is None:
+            self.fragment = self._fragment(contract_id)
+        if error:
+            self.fragment["stages"][0]["error"] = error
+        return self.fragment
+
+    def _fragment(self, contract_id: str) -> dict:
+        duration = time.perf_counter() - self.start
+        entry = {
+            "stage": self.stage,
+            "started_at": self.started_at,
+            "finished_at": datetime.utcnow(),
+            "duration": round(duration, 4),
+        }
+        fragment = {"stages": [entry], "pages": self.pages, "profiles": []}
+        if self.profiler:
+            self.profiler.stop()
+            if duration >= settings.PROFILE_SLOW_SECONDS:
+                path = self.profiler.save(f"{contract_id}-{self.stage}")
+                fragment["profiles"].append(
+                    {"stage": self.stage, "kind": self.profiler.kind, "path": path}
+                )
+        return fragment
+
+
+def merge_traces(fragments: List[dict]) -> dict:
+    """The contract's `trace` document from its stages' fragments"""
+    trace = {"stages": [], "pages": [], "profiles": []}
+    for fragment in fragments:
+        for key, items in trace.items():
+            items.extend(fragment.get(key, []))
+    return trace
+
+
+def summarize_trace(contract: dict) -> dict:
+    """Order the recorded stages and work out queue waits between them"""
+    trace = contract.get("trace", {})
+    stages = sorted(trace.get("stages", []), key=lambda s: s["started_at"])
+
+    previous_end = contract["uploaded_at"]
+    for stage in stages:
+        stage["queue_wait"] = round(
+            max(0.0, (stage["started_at"] - previous_end).total_seconds()), 4
+        )
+        previous_end = stage["finished_at"]
+
+    total = None
+    if stages:
+        total = round((previous_end - contract["uploaded_at"]).total_seconds(), 4)
+
+    return {
+        "stages": stages,
+        "pages": trace.get("pages", []),
+        "profiles": trace.get("profiles", []),
+        "total_seconds": total,
+    }
@@ -0,0 +1,498 @@
+"""
+Celery worker entry point
+
+    celery -A app.worker.celery_app worker -Q extract,score
+    celery -A app.worker.celery_app worker -Q llm -P gevent
+
+Registers the pipeline tasks on the shared Celery app. Imports the
+extraction stack (PDF libraries, parser, scorer) but not FastAPI.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from bson import ObjectId
+from celery.exceptions import Ignore, SoftTimeLimitExceeded, TimeLimitExceeded
+from celery.signals import worker_init, worker_process_shutdown
+
+from app.celery_app import celery_app, contract_pipeline
+from app.config import settings
+from app.services.admission import has_capacity, record_completion
+from app.services.analytics import apply_rollup
+from app.services.cancellation import (
+    CANCELLABLE_STATUSES,
+    CancelCheck,
+    ContractCancelled,
+)
+from app.services.field_codes import compact_scores
+from app.services.parser import ContractParser
+from app.services.scheduling import (
+    LOWEST_PRIORITY,
+    record_duration,
+    release_tenant_slot,
+    reserve_tenant_slot,
+)
+from app.services.scoring import ContractScorer
+from app.services.search import search_fields
+from app.services.status_cache import status_key, write_status
+from app.services.stage_leases import (
+    claim_lease,
+    expired_leases,
+    held_stages,
+    return_lease,
+    take_lease,
+)
+from app.services.similarity import (
+    find_template,
+    minhash_signature,
+    similarity_document,
+    similarity_enabled,
+)
+from app.services.table_extractor import table_fields
+from app.utils.metrics import (
+    STAGE_DURATION,
+    STAGE_FAILURES,
+    MongoCommandMetrics,
+    mark_process_dead,
+    start_worker_metrics_server,
+)
+from app.utils.deadline import Deadline
+from app.utils.extraction_backends import RedisBackendStats
+from app.utils.pdf_extractor import PDFExtractor
+from app.utils.tracing import StageTrace, merge_traces
+
+sync_client = None
+sync_redis = None
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    start_worker_metrics_server(settings.WORKER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def cleanup_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
+
+
+def get_sync_db():
+    """Lazily create the worker's MongoDB connection (after the pool forks)"""
+    global sync_client
+    if sync_client is None:
+        from pymongo import MongoClient
+
+        sync_client = MongoClient(
+            settings.MONGO_URL, event_listeners=[MongoCommandMetrics()]
+        )
+    return sync_client[settings.MONGO_DB]
+
+
+def get_sync_redis():
+    """Lazily create the worker's Redis connection"""
+    global sync_redis
+    if sync_redis is None:
+        import redis
+
+        sync_redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return sync_redis
+
+
+def _finish_scheduling(contract: dict, record: bool):
+    """Release the tenant's fair-share slot and feed the wait estimator"""
+    if not contract:
+        return
+    redis = get_sync_redis()
+    release_tenant_slot(redis, contract.get("tenant_id"))
+    record_completion(redis)
+    if record and contract.get("started_at") and contract.get("priority_class"):
+        elapsed = (datetime.utcnow() - contract["started_at"]).total_seconds()
+        record_duration(redis, contract["priority_class"], elapsed)
+    _release_deferred(redis)
+
+
+def _release_deferred(redis) -> bool:
+    """Enqueue the oldest deferred upload if the pipeline has room for it"""
+    if not has_capacity(redis):
+        return False
+    contract = get_sync_db().contracts.find_one_and_update(
+        {"status": "deferred", "priority": LOWEST_PRIORITY},
+        {"$set": {"status": "pending", "updated_at": datetime.utcnow()}},
+        sort=[("priority", 1), ("uploaded_at", 1)],
+        projection={"tenant_id": 1, "priority": 1, "profile": 1},
+    )
+    if not contract:
+        return False
+    reserve_tenant_slot(redis, contract.get("tenant_id"))
+    contract_id = str(contract["_id"])
+    write_status(redis, contract_id, status="pending")
+    contract_pipeline(
+        contract_id,
+        os.path.join(settings.UPLOAD_DIR, f"{contract_id}.pdf"),
+        contract["priority"],
+        contract.get("profile", False),
+    ).apply_async()
+    return True
+
+
+def _stop_cancelled(contract_id: str, stage: str):
+    """
+    End the chain for a cancelled contract. The API already released its
+    slot and cleaned up; drop whatever this stage cached since then.
+    """
+    print(f"Contract {contract_id} cancelled; stopping at the {stage} stage")
+    redis = get_sync_redis()
+    redis.delete(status_key(contract_id))
+    _release_deferred(redis)
+    # Ignore stops the chain without recording a failure
+    raise Ignore()
+
+
+def _lease_seconds(task_name: str) -> float:
+    """How long a stage holds its lease: its hard time limit plus the grace"""
+    limits = celery_app.conf.task_annotations[task_name]
+    return limits["time_limit"] + settings.STAGE_TIME_LIMIT_GRACE
+
+
+def _is_time_limit(error: BaseException) -> bool:
+    """
+    The pool's time limit firing inside the task. The gevent pool (llm
+    queue) has no soft limit; its hard limit raises gevent.Timeout, which
+    is a BaseException and skips `except Exception`.
+    """
+    if isinstance(error, (SoftTimeLimitExceeded, TimeLimitExceeded)):
+        return True
+    gevent = sys.modules.get("gevent")
+    return gevent is not None and isinstance(error, gevent.Timeout)
+
+
+def _mark_failed(
+    contract_id: str,
+    error: BaseException,
+    stage: str,
+    trace: Optional[List[dict]] = None,
+):
+    """Fail the contract; `trace` holds the fragments of the stages that ran"""
+    STAGE_FAILURES.labels(stage).inc()
+    if _is_time_limit(error):
+        error = f"The {stage} stage exceeded its time limit"
+    update = {
+        "status": "failed",
+        "error": str(error),
+        "updated_at": datetime.utcnow(),
+    }
+    if trace:
+        update["trace"] = merge_traces(trace)
+    # Only a contract still in the pipeline; a cancelled or deleted one was
+    # already cleaned up by the API, and a finished one keeps its result
+    contract = get_sync_db().contracts.find_one_and_update(
+        {"_id": ObjectId(contract_id), "status": {"$in": list(CANCELLABLE_STATUSES)}},
+        {"$set": update},
+        projection={"tenant_id": 1},
+    )
+    if contract is None:
+        return
+    write_status(get_sync_redis(), contract_id, status="failed", error=str(error))
+    _finish_scheduling(contract, record=False)
+
+
+def _stage_trace(
+    trace: Optional[StageTrace], contract_id: str, error: str
+) -> List[dict]:
+    """The failed stage's trace fragment; none if it failed before tracing"""
+    return [trace.finish(contract_id, error)] if trace else []
+
+
+@celery_app.task(name="extract_contract")
+@STAGE_DURATION.labels("extract").time()
+def extract_contract_task(
+    contract_id: str, file_path: str, profile: bool = False
+) -> dict:
+    """Pipeline stage 1: extract text from the uploaded PDF"""
+    sync_db = get_sync_db()
+    take_lease(
+        get_sync_redis(), contract_id, "extract", _lease_seconds("extract_contract")
+    )
+    trace = None
+    cancel_check = CancelCheck(get_sync_redis(), contract_id)
+    try:
+        trace = StageTrace("extract", profile)
+        cancel_check.check()
+        contract = sync_db.contracts.find_one_and_update(
+            {"_id": ObjectId(contract_id), "status": {"$ne": "cancelled"}},
+            {
+                "$set": {
+                    "status": "processing",
+                    "progress": 10,
+                    "started_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            projection={"page_count": 1},
+        )
+        write_status(get_sync_redis(), contract_id, status="processing", progress=10)
+
+        extractor = PDFExtractor(RedisBackendStats(get_sync_redis()))
+        try:
+            pdf_text = extractor.extract_text(
+                file_path,
+                cancel_check,
+                Deadline(settings.EXTRACTION_TIMEOUT),
+                page_count=(contract or {}).get("page_count"),
+            )
+        finally:
+            trace.add_pages(extractor.page_timings)
+        print(f"Extracted text from PDF Extractor \n${pdf_text}")
+        write_status(get_sync_redis(), contract_id, progress=30)
+        return {
+            "contract_id": contract_id,
+            "text": pdf_text,
+            # For the similarity index and template reuse; costs CPU on long
+            # contracts, so skipped when both are off
+            "minhash": minhash_signature(pdf_text) if similarity_enabled() else None,
+            "tables": table_fields(extractor.tables),
+            "profile": profile,
+            "time_budget_exceeded": ["extract"] if extractor.truncated else [],
+            "trace": [trace.finish(contract_id)],
+        }
+
+    except ContractCancelled:
+        # A cancelled contract keeps no trace; this stops the profiler
+        _stage_trace(trace, contract_id, "cancelled")
+        _stop_cancelled(contract_id, "extract")
+
+    except Exception as e:
+        _mark_failed(
+            contract_id, e, "extract", _stage_trace(trace, contract_id, str(e))
+        )
+        raise
+
+    finally:
+        return_lease(get_sync_redis(), contract_id, "extract")
+
+
+def _partial_result_writer(contract_id: str):
+    """Publish and score each section as soon as the LLM stream completes it"""
+    scorer = ContractScorer()
+    completed = []
+
+    def on_section(section: str, data: dict):
+        completed.append(section)
+        update = {
+            f"section:{section}": data,
+            "progress": 30 + 5 * len(completed),
+        }
+        section_score = scorer.score_section(section, data)
+        if section_score:
+            update[f"score:{section_score['category']}"] = section_score["score"]
+        write_status(get_sync_redis(), contract_id, **update)
+
+    return on_section
+
+
+@celery_app.task(name="parse_contract")
+@STAGE_DURATION.labels("llm").time()
+def parse_contract_task(payload: dict) -> dict:
+    """Pipeline stage 2: parse the extracted text using the LLM"""
+    contract_id = payload["contract_id"]
+    profile = payload.get("profile", False)
+    take_lease(get_sync_redis(), contract_id, "llm", _lease_seconds("parse_contract"))
+    trace = None
+    traces = payload.get("trace", [])
+    cancel_check = CancelCheck(get_sync_redis(), contract_id)
+    try:
+        trace = StageTrace("llm", profile)
+        cancel_check.check()
+        print(f"Parsing the PDF Text using LLM")
+        template = None
+        if settings.TEMPLATE_REUSE and payload.get("minhash"):
+            template = find_template(
+                get_sync_db().contracts, payload["minhash"], contract_id
+            )
+        parser = ContractParser(
+            get_sync_redis(), cancel_check, Deadline(settings.LLM_TIMEOUT)
+        )
+        parsed_data = parser.parse_contract(
+            payload["text"],
+            on_section=_partial_result_writer(contract_id),
+            template=template["parsed_data"] if template else None,
+            tables=payload.get("tables"),
+        )
+        write_status(get_sync_redis(), contract_id, progress=60)
+        print(f"parsed_data \n${parsed_data}")
+        return {
+            "contract_id": contract_id,
+            "parsed_data": parsed_data,
+            # Stored for search with the final write
+            "text": payload["text"],
+            "minhash": payload.get("minhash"),
+            "template_id": str(template["_id"]) if template else None,
+            "profile": profile,
+            "time_budget_exceeded": payload.get("time_budget_exceeded", [])
+            + (["llm"] if parser.timed_out else []),
+            "trace": traces + [trace.finish(contract_id)],
+        }
+
+    except ContractCancelled:
+        _stage_trace(trace, contract_id, "cancelled")
+        _stop_cancelled(contract_id, "llm")
+
+    except Exception as e:
+        _mark_failed(
+            contract_id, e, "llm", traces + _stage_trace(trace, contract_id, str(e))
+        )
+        raise
+
+    except BaseException as e:
+        # The gevent pool's hard limit; see _is_time_limit
+        if _is_time_limit(e):
+            finished = _stage_trace(trace, contract_id, "time limit exceeded")
+            _mark_failed(contract_id, e, "llm", traces + finished)
+        raise
+
+    finally:
+        return_lease(get_sync_redis(), contract_id, "llm")
+
+
+@celery_app.task(name="score_contract")
+@STAGE_DURATION.labels("score").time()
+def score_contract_task(payload: dict) -> dict:
+    """Pipeline stage 3: score the parsed data and store the results"""
+    contract_id = payload["contract_id"]
+    parsed_data = payload["parsed_data"]
+    take_lease(get_sync_redis(), contract_id, "score", _lease_seconds("score_contract"))
+    trace = None
+    traces = payload.get("trace", [])
+    try:
+        trace = StageTrace("score", payload.get("profile", False))
+        CancelCheck(get_sync_redis(), contract_id).check()
+        scorer = ContractScorer()
+        score_result = scorer.calculate_score(parsed_data)
+        print(f"Scored Result \n${score_result}")
+        # Prepare final data
+        contract_data = {
+            **parsed_data,
+            "overall_score": score_result["overall_score"],
+            "category_scores": score_result["category_scores"],
+            "missing_fields": score_result["missing_fields"],
+            "confidence_levels": score_result["confidence_levels"],
+        }
+
+        # Update contract with results
+        update = {
+            "status": "completed",
+            "progress": 100,
+            "parsed_data": compact_scores(contract_data),
+            "completed_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        # Add the contract to the near-duplicate index
+        if payload.get("minhash"):
+            update["similarity"] = similarity_document(payload["minhash"])
+        if payload.get("template_id"):
+            update["template_id"] = payload["template_id"]
+        update.update(search_fields(contract_data))
+        if payload.get("text"):
+            update["search.text"] = payload["text"]
+        # Stages that ran out of time and finished with partial results
+        if payload.get("time_budget_exceeded"):
+            update["time_budget_exceeded"] = payload["time_budget_exceeded"]
+        # Set whole, so a redelivered task does not record the stages twice
+        update["trace"] = merge_traces(traces + [trace.finish(contract_id)])
+        # Neither a deleted nor a cancelled contract gets the results
+        contract = get_sync_db().contracts.find_one_and_update(
+            {"_id": ObjectId(contract_id), "status": {"$ne": "cancelled"}},
+            {
+                "$set": update,
+                "$unset": {"partial_results": ""},
+            },
+            projection={
+                "tenant_id": 1,
+                "priority_class": 1,
+                "started_at": 1,
+                "status": 1,
+            },
+        )
+        if contract is None:
+            raise ContractCancelled(contract_id)
+        write_status(
+            get_sync_redis(),
+            contract_id,
+            replace=True,
+            status="completed",
+            progress=100,
+        )
+        # A redelivered task must not count the contract twice
+        if contract.get("status") != "completed":
+            apply_rollup(get_sync_db(), contract_data)
+        _finish_scheduling(contract, record=True)
+        return {
+            "contract_id": contract_id,
+            "overall_score": score_result["overall_score"],
+        }
+
+    except ContractCancelled:
+        _stage_trace(trace, contract_id, "cancelled")
+        _stop_cancelled(contract_id, "score")
+
+    except Exception as e:
+        _mark_failed(
+            contract_id, e, "score", traces + _stage_trace(trace, contract_id, str(e))
+        )
+        raise
+
+    finally:
+        return_lease(get_sync_redis(), contract_id, "score")
+
+
+@celery_app.task(name="sweep_stale_contracts")
+def sweep_stale_contracts_task():
+    """
+    Fail contracts whose stage died with its worker (periodic, see
+    celery_app.beat_schedule): their lease expired without being returned.
+    As a backstop, contracts "processing" for longer than
+    STALE_PROCESSING_SECONDS without a stage running are failed too.
+    """
+    redis = get_sync_redis()
+    for contract_id, stage in expired_leases(redis):
+        if claim_lease(redis, contract_id, stage):
+            print(f"Contract {contract_id}: {stage} stage lost with its worker")
+            _mark_failed(
+                contract_id,
+                RuntimeError(f"The {stage} stage stopped (worker lost)"),
+                stage,
+            )
+
+    if not settings.STALE_PROCESSING_SECONDS:
+        return
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.STALE_PROCESSING_SECONDS)
+    stale = get_sync_db().contracts.find(
+        {"status": "processing", "started_at": {"$lt": cutoff}}, {"_id": 1}
+    )
+    for contract in stale:
+        contract_id = str(contract["_id"])
+        if not held_stages(redis, contract_id):
+            print(f"Contract {contract_id}: no progress, failing it")
+            _mark_failed(
+                contract_id,
+                RuntimeError("The contract stopped making progress"),
+                "pipeline",
+            )
+
+
+@celery_app.task(name="release_deferred")
+def release_deferred_task():
+    """
+    Enqueue deferred uploads while the pipeline has room (periodic). Covers
+    an idle pipeline, where no finishing contract releases them.
+    """
+    redis = get_sync_redis()
+    while _release_deferred(redis):
+        pass
+
+
+@celery_app.task(name="remove_contract_analytics")
+def remove_contract_analytics_task(parsed_data: dict):
+    """Take a deleted contract back out of the analytics rollups"""
+    apply_rollup(get_sync_db(), parsed_data, sign=-1)
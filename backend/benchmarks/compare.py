@@ -0,0 +1,76 @@
+"""
+Compare two benchmark result files produced by benchmarks.run
+
+    python -m benchmarks.compare baseline.json results.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+
+def _key(result: dict) -> tuple:
+    return result["name"], tuple(sorted(result["params"].items()))
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Return (name, params, old, new, change %, regressed) rows for shared benchmarks"""
+    previous = {_key(r): r for r in baseline["benchmarks"]}
+    rows = []
+    for result in current["benchmarks"]:
+        old = previous.get(_key(result))
+        if not old:
+            continue
+        old_median = old["stats"]["median"]
+        new_median = result["stats"]["median"]
+        change = (new_median - old_median) / old_median * 100 if old_median else 0.0
+        rows.append(
+            (
+                result["name"],
+                result["params"],
+                old_median,
+                new_median,
+                change,
+                change > threshold,
+            )
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="percent slowdown in the median that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    print(
+        f"baseline {baseline['meta']['git_commit'][:10]}  "
+        f"current {current['meta']['git_commit'][:10]}"
+    )
+    regressions = 0
+    for name, params, old, new, change, regressed in compare(
+        baseline, current, args.threshold
+    ):
+        params = ", ".join(f"{k}={v}" for k, v in params.items())
+        flag = "  REGRESSION" if regressed else ""
+        print(
+            f"{name:<40} {params:<24} {old * 1000:9.2f} ms -> "
+            f"{new * 1000:9.2f} ms  {change:+6.1f}%{flag}"
+        )
+        regressions += regressed
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
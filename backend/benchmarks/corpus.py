@@ -0,0 +1,236 @@
+"""
+Synthetic contract PDF generator for offline benchmarks
+
+Writes plain PDF 1.4 files by hand (Helvetica, no embedded fonts) so the
+corpus can be built without extra dependencies. Content is seeded, so the
+same arguments always produce byte-identical files.
+
+    python -m benchmarks.corpus --out /tmp/corpus --pages 2 20 100 --tables
+"""
+
+import argparse
+import os
+import random
+from typing import List
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 72
+LINE_HEIGHT = 14
+
+COMPANIES = [
+    "Acme Corp.",
+    "Globex Inc.",
+    "Initech LLC",
+    "Umbrella Corporation",
+    "Stark Industries Inc.",
+    "Wayne Enterprises Corp.",
+    "Hooli Ltd.",
+    "Vandelay Industries LLC",
+]
+SERVICES = [
+    "Platform subscription",
+    "Premium support",
+    "Onboarding services",
+    "Data storage (per TB)",
+    "API requests (per million)",
+    "Professional services (per hour)",
+]
+BOILERPLATE = [
+    "Each party shall keep the other party's Confidential Information in strict confidence.",
+    "Neither party shall be liable for indirect, incidental or consequential damages.",
+    "This Agreement shall be governed by the laws of the State of Delaware.",
+    "Any notice under this Agreement shall be given in writing to the addresses above.",
+    "Vendor shall maintain commercially reasonable security controls at all times.",
+    "Customer may terminate this Agreement for material breach upon thirty days notice.",
+    "The parties shall attempt in good faith to resolve any dispute through negotiation.",
+    "Fees are exclusive of all taxes, levies and duties imposed by taxing authorities.",
+]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class _Page:
+    def __init__(self):
+        self.ops: List[str] = []
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def text(self, line: str, x: int = MARGIN, size: int = 10):
+        self.ops.append(f"BT /F1 {size} Tf {x} {self.y} Td ({_escape(line)}) Tj ET")
+        self.y -= LINE_HEIGHT
+
+    def rule(self, x1, y1, x2, y2):
+        self.ops.append(f"0.5 w {x1} {y1} m {x2} {y2} l S")
+
+    def table(self, rows: List[List[str]], widths: List[int]):
+        """Draw a ruled table so pdfplumber's line strategy can detect it"""
+        top = self.y + LINE_HEIGHT - 3
+        right = MARGIN + sum(widths)
+        for row in rows:
+            x = MARGIN
+            for cell, width in zip(row, widths):
+                self.ops.append(
+                    f"BT /F1 9 Tf {x + 3} {self.y} Td ({_escape(cell)}) Tj ET"
+                )
+                x += width
+            self.y -= LINE_HEIGHT
+        bottom = self.y + LINE_HEIGHT - 3
+        for i in range(len(rows) + 1):
+            y = top - i * LINE_HEIGHT
+            self.rule(MARGIN, y, right, y)
+        x = MARGIN
+        for width in [0] + widths:
+            x += width
+            self.rule(x, top, x, bottom)
+        self.y -= LINE_HEIGHT
+
+    def rows_left(self) -> int:
+        return (self.y - MARGIN) // LINE_HEIGHT
+
+    def content(self) -> bytes:
+        return "\n".join(self.ops).encode("latin-1", "replace")
+
+
+def _write_pdf(path: str, pages: List[_Page]):
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    page_ids = []
+    for page in pages:
+        stream = page.content()
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+
+def generate_contract_pdf(
+    path: str, pages: int = 2, with_tables: bool = False, seed: int = 0
+) -> dict:
+    """
+    Write a synthetic service agreement with roughly `pages` pages and return
+    the ground-truth values embedded in it
+    """
+    rng = random.Random(f"{pages}-{with_tables}-{seed}")
+    customer, vendor = rng.sample(COMPANIES, 2)
+    terms = rng.choice([15, 30, 45, 60])
+    items = []
+    for description in rng.sample(SERVICES, rng.randint(2, 5)):
+        quantity = rng.randint(1, 50)
+        unit_price = round(rng.uniform(10, 5000), 2)
+        items.append(
+            (description, quantity, unit_price, round(quantity * unit_price, 2))
+        )
+    total = round(sum(item[3] for item in items), 2)
+
+    doc = [_Page()]
+
+    def page() -> _Page:
+        if doc[-1].rows_left() < 2:
+            doc.append(_Page())
+        return doc[-1]
+
+    page().text("MASTER SERVICES AGREEMENT", size=14)
+    page().text(
+        f'This Agreement is made between {customer} ("Customer") and {vendor} ("Vendor").'
+    )
+    page().text("Customer Signatory: Jane Doe, Chief Financial Officer")
+    page().text("Vendor Signatory: John Roe, Chief Executive Officer")
+    page().text(f"Account Number: AC-{rng.randint(10000, 99999)}")
+    page().text("")
+    page().text("1. FEES AND PAYMENT")
+    if with_tables:
+        rows = [["Description", "Quantity", "Unit Price", "Total"]] + [
+            [d, str(q), f"${p:,.2f}", f"${t:,.2f}"] for d, q, p, t in items
+        ]
+        if page().rows_left() < len(rows) + 2:
+            doc.append(_Page())
+        doc[-1].table(rows, [220, 70, 90, 90])
+    else:
+        for description, quantity, unit_price, line_total in items:
+            page().text(
+                f"{description}: {quantity} x ${unit_price:,.2f} = ${line_total:,.2f}"
+            )
+    page().text(f"Total Contract Value: ${total:,.2f} USD")
+    page().text(f"Payment Terms: Net {terms}. Payment by wire transfer.")
+    page().text("")
+    page().text("2. SERVICE LEVELS")
+    page().text("Vendor guarantees 99.9% monthly uptime with a 4 hour response time.")
+    page().text("Support is available 24/7. Service credits of 10% apply below 99%.")
+
+    section = 3
+    # Fill with boilerplate sections until the last requested page is full
+    while len(doc) < pages or doc[-1].rows_left() >= 14:
+        page().text("")
+        page().text(f"{section}. GENERAL TERMS")
+        for _ in range(rng.randint(4, 10)):
+            page().text(rng.choice(BOILERPLATE))
+        section += 1
+
+    _write_pdf(path, doc)
+    return {
+        "path": path,
+        "pages": len(doc),
+        "with_tables": with_tables,
+        "customer": customer,
+        "vendor": vendor,
+        "total_value": total,
+        "payment_terms": f"Net {terms}",
+        "line_items": len(items),
+    }
+
+
+def build_corpus(out_dir: str, sizes: List[int], tables: bool, seed: int = 0):
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for pages in sizes:
+        for with_tables in ([False, True] if tables else [False]):
+            suffix = "tables" if with_tables else "text"
+            path = os.path.join(out_dir, f"contract-{pages:03d}p-{suffix}.pdf")
+            corpus.append(generate_contract_pdf(path, pages, with_tables, seed))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 20, 100])
+    parser.add_argument("--tables", action="store_true", help="also emit tables")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for entry in build_corpus(args.out, args.pages, args.tables, args.seed):
+        print(f"{entry['path']}: {entry['pages']} pages")
+
+
+if __name__ == "__main__":
+    main()
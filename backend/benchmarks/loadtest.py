@@ -0,0 +1,334 @@
+"""
+End-to-end load test against the FastAPI app with local stand-ins
+
+The app is driven in-process through httpx's ASGI transport. MongoDB is
+replaced by mongomock (shared between the API and the worker), GridFS by an
+in-memory bucket, Redis by fakeredis, the Celery broker by a thread pool
+running the real pipeline tasks, and the LLM by the fake provider.
+
+    python -m benchmarks.loadtest benchmarks/scenarios/poll_storm.json
+
+Exits with status 1 when any contract failed in the pipeline: the latency
+figures of a run whose contracts did not finish are not comparable.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bson import ObjectId
+
+
+class InMemoryGridFSBucket:
+    """Just enough of AsyncIOMotorGridFSBucket for the API handlers"""
+
+    def __init__(self):
+        self.files = {}
+
+    async def upload_from_stream(self, filename, source, metadata=None):
+        file_id = ObjectId()
+        self.files[file_id] = source.read()
+        return file_id
+
+    async def open_download_stream(self, file_id):
+        return _GridOut(self.files[file_id])
+
+    async def delete(self, file_id):
+        self.files.pop(file_id, None)
+
+
+class _GridOut:
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+
+class CountingProxy:
+    """Counts MongoDB operations issued through the wrapped object"""
+
+    def __init__(self, target, counts, prefix=""):
+        self._target = target
+        self._counts = counts
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name == "contracts":
+            return CountingProxy(attr, self._counts, "contracts.")
+        if callable(attr) and self._prefix:
+            self._counts[self._prefix + name] += 1
+        return attr
+
+
+class ThreadPoolBroker:
+    """Stands in for Celery: runs the pipeline stages on worker threads"""
+
+    def __init__(self, worker, workers: int):
+        self.worker = worker
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.errors = Counter()  # "<type>: <message>" of the failed contracts
+
+    def process_contract_task(self, contract_id, file_path, priority=5, profile=False):
+        broker = self
+
+        class _Chain:
+            def apply_async(self):
+                broker.pool.submit(broker._run, contract_id, file_path, profile)
+
+        return _Chain()
+
+    def _run(self, contract_id, file_path, profile):
+        worker = self.worker
+        try:
+            payload = worker.extract_contract_task(contract_id, file_path, profile)
+            payload = worker.parse_contract_task(payload)
+            worker.score_contract_task(payload)
+        except Exception as e:
+            with self.lock:
+                self.failed += 1
+                self.errors[f"{type(e).__name__}: {e}"[:200]] += 1
+            return
+        with self.lock:
+            self.completed += 1
+
+
+def setup_app(scenario: dict, upload_dir: str):
+    """Import the app and wire it to the local stand-ins"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "loadtest")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(scenario.get("llm_latency_ms", 800))
+    os.environ["UPLOAD_DIR"] = upload_dir
+
+    import fakeredis
+    import fakeredis.aioredis
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+
+    import app.main as main
+    import app.worker as worker
+
+    store = mongomock.MongoClient()
+    server = fakeredis.FakeServer()
+    counts = defaultdict(int)
+
+    main.db = CountingProxy(
+        AsyncMongoMockClient(mock_mongo_client=store)[main.settings.MONGO_DB], counts
+    )
+    main.fs_bucket = InMemoryGridFSBucket()
+    main.redis_client = fakeredis.aioredis.FakeRedis(
+        server=server, decode_responses=True
+    )
+    worker.sync_client = store
+    worker.sync_redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+
+    # Bind the tasks now: binding them lazily from the broker threads races
+    worker.celery_app.finalize(auto=True)
+    broker = ThreadPoolBroker(worker, scenario.get("workers", 4))
+    main.process_contract_task = broker.process_contract_task
+    return main, broker, counts
+
+
+async def monitor_loop_lag(samples: list, stop: asyncio.Event, interval=0.01):
+    """Measure how late the event loop wakes a sleeping coroutine"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def virtual_user(client, scenario, pdfs, contract_ids, results, rng, deadline):
+    actions = list(scenario["mix"])
+    weights = [scenario["mix"][action] for action in actions]
+    think_time = scenario.get("think_time_ms", 0) / 1000
+
+    while time.perf_counter() < deadline:
+        action = rng.choices(actions, weights)[0]
+        if action != "upload" and action != "list" and not contract_ids:
+            action = "upload"
+
+        start = time.perf_counter()
+        if action == "upload":
+            name, data = rng.choice(pdfs)
+            response = await client.post(
+                "/contracts/upload",
+                files={"file": (name, data, "application/pdf")},
+                headers={
+                    "X-Tenant-ID": f"tenant-{rng.randint(1, scenario.get('tenants', 1))}"
+                },
+            )
+            if response.status_code == 200:
+                contract_ids.append(response.json()["contract_id"])
+        elif action == "status":
+            response = await client.get(f"/contracts/{rng.choice(contract_ids)}/status")
+        elif action == "list":
+            response = await client.get("/contracts", params={"limit": 20})
+        elif action == "download":
+            response = await client.get(
+                f"/contracts/{rng.choice(contract_ids)}/download"
+            )
+        else:
+            raise ValueError(f"Unknown action: {action}")
+
+        results[action]["latencies"].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            results[action]["errors"] += 1
+        if think_time:
+            await asyncio.sleep(think_time)
+
+
+async def run_scenario(scenario: dict) -> dict:
+    import httpx
+
+    from benchmarks.corpus import build_corpus
+
+    work_dir = tempfile.mkdtemp(prefix="contract-loadtest-")
+    main, broker, mongo_ops = setup_app(scenario, os.path.join(work_dir, "uploads"))
+
+    corpus = build_corpus(
+        os.path.join(work_dir, "corpus"),
+        scenario.get("pages", [2, 10]),
+        tables=scenario.get("tables", False),
+    )
+    pdfs = []
+    for entry in corpus:
+        with open(entry["path"], "rb") as f:
+            pdfs.append((os.path.basename(entry["path"]), f.read()))
+
+    results = defaultdict(lambda: {"latencies": [], "errors": 0})
+    contract_ids = []
+    lag_samples = []
+    stop = asyncio.Event()
+    rng = random.Random(scenario.get("seed", 0))
+
+    transport = httpx.ASGITransport(app=main.app)
+    # The handlers and tasks print liberally; keep the report readable
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    quiet.__enter__()
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+        started = time.perf_counter()
+        deadline = started + scenario.get("duration_seconds", 30)
+        await asyncio.gather(
+            *(
+                virtual_user(
+                    client,
+                    scenario,
+                    pdfs,
+                    contract_ids,
+                    results,
+                    random.Random(rng.random()),
+                    deadline,
+                )
+                for _ in range(scenario.get("concurrency", 10))
+            )
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await monitor
+    broker.pool.shutdown(wait=True, cancel_futures=True)
+    quiet.__exit__(None, None, None)
+
+    endpoints = {}
+    for action, data in results.items():
+        latencies = data["latencies"]
+        endpoints[action] = {
+            "requests": len(latencies),
+            "errors": data["errors"],
+            "throughput": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        }
+    return {
+        "scenario": scenario.get("name", "unnamed"),
+        "timestamp": datetime.utcnow().isoformat(),
+        "elapsed_seconds": elapsed,
+        "contracts_completed": broker.completed,
+        "contracts_failed": broker.failed,
+        "pipeline_errors": dict(broker.errors.most_common(10)),
+        "endpoints": endpoints,
+        "event_loop_lag_ms": {
+            "p50": percentile(lag_samples, 50) * 1000,
+            "p95": percentile(lag_samples, 95) * 1000,
+            "p99": percentile(lag_samples, 99) * 1000,
+            "max": max(lag_samples, default=0.0) * 1000,
+        },
+        "mongo_ops": dict(mongo_ops),
+    }
+
+
+def print_report(report: dict):
+    print(
+        f"Scenario {report['scenario']}: {report['elapsed_seconds']:.1f}s, "
+        f"{report['contracts_completed']} contracts completed, "
+        f"{report['contracts_failed']} failed"
+    )
+    for error, count in report["pipeline_errors"].items():
+        print(f"  {count} x {error}")
+    print(
+        f"{'endpoint':<10} {'reqs':>7} {'err':>5} {'req/s':>8} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    )
+    for name, stats in sorted(report["endpoints"].items()):
+        print(
+            f"{name:<10} {stats['requests']:>7} {stats['errors']:>5} "
+            f"{stats['throughput']:>8.1f} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+    lag = report["event_loop_lag_ms"]
+    print(
+        f"event loop lag ms: p50 {lag['p50']:.2f}  p95 {lag['p95']:.2f}  "
+        f"p99 {lag['p99']:.2f}  max {lag['max']:.2f}"
+    )
+    print("mongo ops:", ", ".join(f"{k}={v}" for k, v in report["mongo_ops"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API load test with local stand-ins")
+    parser.add_argument("scenario", help="scenario JSON file")
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--duration", type=float, help="override duration_seconds")
+    args = parser.parse_args()
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    if args.duration:
+        scenario["duration_seconds"] = args.duration
+
+    report = asyncio.run(run_scenario(scenario))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if report["contracts_failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
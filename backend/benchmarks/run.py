@@ -0,0 +1,233 @@
+"""
+Offline benchmark suite for the contract pipeline
+
+Runs entirely in-process: PDFs come from the synthetic corpus, the LLM is
+the deterministic fake provider and the worker's MongoDB/Redis connections
+are replaced with mongomock/fakeredis for the full-task benchmark.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.compare baseline.json results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """Call fn repeatedly and summarise the wall-clock timings in seconds"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "mean": statistics.fmean(timings),
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        "min": timings[0],
+        "max": timings[-1],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def _quiet(fn):
+    """The pipeline prints extracted text and LLM output; keep the report readable"""
+
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+
+    return wrapper
+
+
+def bench_extractor(corpus, repeat):
+    from app.utils.pdf_extractor import PDFExtractor
+
+    results = []
+    for entry in corpus:
+        extractor = PDFExtractor()
+        stats = measure(_quiet(lambda: extractor.extract_text(entry["path"])), repeat)
+        results.append(
+            {
+                "name": "pdf_extractor.extract_text",
+                "params": {"pages": entry["pages"], "tables": entry["with_tables"]},
+                "stats": stats,
+                "extra": {"pages_per_second": entry["pages"] / stats["median"]},
+            }
+        )
+    return results
+
+
+def bench_parser(corpus, repeat):
+    import copy
+
+    from app.services.parser import ContractParser
+    from app.utils.fake_llm import FakeLLMProvider
+    from app.utils.pdf_extractor import PDFExtractor
+
+    parser = ContractParser()
+    results = []
+
+    sample = FakeLLMProvider(latency_ms=0).build_response("", random.Random(0))
+    stats = measure(
+        lambda: parser._post_process_data(copy.deepcopy(sample)), repeat * 100
+    )
+    results.append(
+        {"name": "contract_parser._post_process_data", "params": {}, "stats": stats}
+    )
+
+    for entry in corpus:
+        with contextlib.redirect_stdout(io.StringIO()):
+            text = PDFExtractor().extract_text(entry["path"])
+        stats = measure(_quiet(lambda: parser.parse_contract(text)), repeat)
+        results.append(
+            {
+                "name": "contract_parser.parse_contract",
+                "params": {"pages": entry["pages"], "tables": entry["with_tables"]},
+                "stats": stats,
+            }
+        )
+    return results
+
+
+def bench_scorer(repeat):
+    from app.services.parser import ContractParser
+    from app.services.scoring import ContractScorer
+    from app.utils.fake_llm import FakeLLMProvider
+
+    parsed = ContractParser()._post_process_data(
+        FakeLLMProvider(latency_ms=0).build_response("", random.Random(0))
+    )
+    scorer = ContractScorer()
+    stats = measure(lambda: scorer.calculate_score(parsed), repeat * 100)
+    return [{"name": "contract_scorer.calculate_score", "params": {}, "stats": stats}]
+
+
+def bench_full_task(corpus, repeat):
+    import fakeredis
+    import mongomock
+
+    import app.worker as worker
+
+    worker.sync_client = mongomock.MongoClient()
+    worker.sync_redis = fakeredis.FakeRedis(decode_responses=True)
+    contracts = worker.get_sync_db().contracts
+
+    def run(path):
+        contract_id = str(
+            contracts.insert_one(
+                {
+                    "filename": os.path.basename(path),
+                    "status": "pending",
+                    "progress": 0,
+                    "uploaded_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow(),
+                }
+            ).inserted_id
+        )
+        payload = worker.extract_contract_task(contract_id, path)
+        payload = worker.parse_contract_task(payload)
+        worker.score_contract_task(payload)
+
+    results = []
+    for entry in corpus:
+        stats = measure(_quiet(lambda: run(entry["path"])), repeat)
+        results.append(
+            {
+                "name": "pipeline.full_task",
+                "params": {"pages": entry["pages"], "tables": entry["with_tables"]},
+                "stats": stats,
+            }
+        )
+    return results
+
+
+BENCHMARKS = ["extractor", "parser", "scorer", "full_task"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 20, 100])
+    parser.add_argument("--no-tables", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument(
+        "--llm-latency-ms",
+        type=float,
+        default=0,
+        help="median fake LLM latency (0 measures pipeline CPU time only)",
+    )
+    parser.add_argument("--llm-distribution", default="lognormal")
+    parser.add_argument("--corpus-dir", help="reuse/keep the generated PDFs here")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure them before importing app
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("MONGO_DB", "benchmarks")
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_LATENCY_DISTRIBUTION"] = args.llm_distribution
+
+    from benchmarks.corpus import build_corpus
+
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="contract-corpus-")
+    corpus = build_corpus(corpus_dir, args.pages, tables=not args.no_tables)
+
+    results = []
+    if "extractor" in args.only:
+        results += bench_extractor(corpus, args.repeat)
+    if "parser" in args.only:
+        results += bench_parser(corpus, args.repeat)
+    if "scorer" in args.only:
+        results += bench_scorer(args.repeat)
+    if "full_task" in args.only:
+        results += bench_full_task(corpus, args.repeat)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "benchmarks": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for result in results:
+        params = ", ".join(f"{k}={v}" for k, v in result["params"].items())
+        print(
+            f"{result['name']:<40} {params:<24} "
+            f"median {result['stats']['median'] * 1000:9.2f} ms  "
+            f"p95 {result['stats']['p95'] * 1000:9.2f} ms"
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
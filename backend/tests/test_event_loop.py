@@ -0,0 +1,156 @@
+"""
+Event loop responsiveness of the API handlers under load
+
+The app is driven in-process with the local fakes from the benchmarks
+(mongomock, fakeredis, an in-memory GridFS bucket) and a broker that only
+records submissions, so the only work on the loop is the handlers' own.
+The loop lag monitor must not see any stall past the threshold.
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import time
+
+import pytest
+
+pytest.importorskip("fakeredis")
+pytest.importorskip("mongomock_motor")
+httpx = pytest.importorskip("httpx")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "loop_lag")
+
+THRESHOLD_MS = float(os.getenv("LOOP_LAG_TEST_THRESHOLD_MS", "100"))
+DURATION_SECONDS = 2.0
+CONCURRENCY = 20
+
+
+class RecordingBroker:
+    def __init__(self):
+        self.submitted = []
+
+    def process_contract_task(self, contract_id, file_path, priority=5, profile=False):
+        broker = self
+
+        class _Chain:
+            def apply_async(self):
+                broker.submitted.append(contract_id)
+
+        return _Chain()
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    import fakeredis.aioredis
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+
+    import app.main as main
+    from benchmarks.loadtest import InMemoryGridFSBucket
+
+    broker = RecordingBroker()
+    store = mongomock.MongoClient()
+    monkeypatch.setattr(
+        main, "db", AsyncMongoMockClient(mock_mongo_client=store)["loop_lag"]
+    )
+    monkeypatch.setattr(main, "fs_bucket", InMemoryGridFSBucket())
+    monkeypatch.setattr(
+        main, "redis_client", fakeredis.aioredis.FakeRedis(decode_responses=True)
+    )
+    monkeypatch.setattr(main, "process_contract_task", broker.process_contract_task)
+    monkeypatch.setattr(main.settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    return main
+
+
+def _pdfs(tmp_path):
+    from benchmarks.corpus import generate_contract_pdf
+
+    pdfs = []
+    for seed, pages in enumerate([2, 10, 30]):
+        path = str(tmp_path / f"contract-{seed}.pdf")
+        generate_contract_pdf(path, pages, with_tables=True, seed=seed)
+        with open(path, "rb") as f:
+            pdfs.append((os.path.basename(path), f.read()))
+    return pdfs
+
+
+async def _virtual_user(client, pdfs, contract_ids, rng, deadline):
+    while time.perf_counter() < deadline:
+        action = rng.choice(["upload", "status", "list", "download", "summary"])
+        if action == "upload" or not contract_ids:
+            name, data = rng.choice(pdfs)
+            response = await client.post(
+                "/contracts/upload", files={"file": (name, data, "application/pdf")}
+            )
+            assert response.status_code == 200, response.text
+            contract_ids.append(response.json()["contract_id"])
+        elif action == "status":
+            await client.get(f"/contracts/{rng.choice(contract_ids)}/status")
+        elif action == "list":
+            await client.get("/contracts", params={"limit": 20})
+        elif action == "download":
+            await client.get(f"/contracts/{rng.choice(contract_ids)}/download")
+        else:
+            await client.get("/analytics/summary")
+
+
+def test_no_handler_blocks_the_loop(api, monkeypatch, tmp_path):
+    from app.utils.loop_monitor import LoopLagMonitor
+
+    pdfs = _pdfs(tmp_path)
+    monitor = LoopLagMonitor(threshold_ms=THRESHOLD_MS)
+    monkeypatch.setattr(api, "loop_monitor", monitor)
+    contract_ids = []
+
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://t"
+        ) as client:
+            # Warm up lazy imports before measuring
+            await _virtual_user(client, pdfs, contract_ids, random.Random(0), 0)
+            monitor.start()
+            deadline = time.perf_counter() + DURATION_SECONDS
+            rng = random.Random(1)
+            await asyncio.gather(
+                *(
+                    _virtual_user(
+                        client,
+                        pdfs,
+                        contract_ids,
+                        random.Random(rng.random()),
+                        deadline,
+                    )
+                    for _ in range(CONCURRENCY)
+                )
+            )
+            await monitor.stop()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run())
+
+    assert len(contract_ids) > CONCURRENCY
+    assert list(monitor.stalls) == []
+
+
+def test_monitor_names_the_blocking_request():
+    from app.utils.loop_monitor import LoopLagMonitor
+
+    monitor = LoopLagMonitor(threshold_ms=50, interval_ms=10)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        with monitor.track({"method": "GET", "path": "/slow"}):
+            time.sleep(0.2)
+            await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run())
+
+    assert [stall["routes"] for stall in monitor.stalls] == [["GET /slow"]]
+    assert monitor.stalls[0]["lag_ms"] >= 150
@@ -0,0 +1,68 @@
+"""
+Incremental export watermarks: consecutive exports neither skip nor repeat
+contracts that share a completed_at
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "export")
+
+from app.services.export import NDJSONWriter, export_cursor, iter_export  # noqa: E402
+
+
+def _export(contracts, since=None, after_id=None, batch_size=2):
+    writer = NDJSONWriter()
+    cursor = export_cursor(contracts, since, batch_size, after_id)
+    lines = b"".join(iter_export(cursor, writer, batch_size)).splitlines()
+    return lines, writer
+
+
+def _insert(contracts, completed_at, count=1):
+    for _ in range(count):
+        contracts.insert_one({"status": "completed", "completed_at": completed_at})
+
+
+def test_watermark_keeps_contracts_sharing_its_timestamp():
+    contracts = mongomock.MongoClient()["export"].contracts
+    noon = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    _insert(contracts, noon - timedelta(minutes=1))
+    _insert(contracts, noon, 3)
+
+    first, writer = _export(contracts)
+    assert len(first) == 4
+    assert writer.last_completed_at == noon
+
+    # Another contract lands on the watermark's timestamp after the export
+    _insert(contracts, noon)
+    second, writer = _export(contracts, writer.last_completed_at, writer.last_id)
+
+    assert len(second) == 1
+    assert len(set(first + second)) == 5
+
+
+def test_export_resumes_inside_a_run_of_equal_timestamps():
+    contracts = mongomock.MongoClient()["export"].contracts
+    noon = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    _insert(contracts, noon, 4)
+    ids = sorted(c["_id"] for c in contracts.find())
+
+    lines, writer = _export(contracts, noon, ids[1])
+
+    assert len(lines) == 2
+    assert writer.last_id == ids[3]
+
+
+def test_recent_completions_wait_for_the_next_export():
+    contracts = mongomock.MongoClient()["export"].contracts
+    _insert(contracts, datetime.utcnow() - timedelta(hours=1))
+    _insert(contracts, datetime.utcnow())
+
+    lines, _ = _export(contracts)
+
+    assert len(lines) == 1
@@ -0,0 +1,141 @@
+"""
+Backend selection per document class and the speed stats behind it
+
+Fake backends stand in for the PDF engines; only the ordering and the
+bookkeeping are exercised.
+"""
+
+import os
+import random
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "backends")
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    from app.config import settings
+    from app.utils import extraction_backends as eb
+
+    class Fake(eb.ExtractionBackend):
+        def __init__(self, name, time_limit=None):
+            self.name = name
+            self.time_limit = time_limit
+
+    monkeypatch.setattr(eb, "BACKENDS", {})
+    for fake in (Fake("slow"), Fake("fast"), Fake("new"), Fake("scan", 240)):
+        eb.register_backend(fake)
+    monkeypatch.setattr(eb, "_plugins_loaded", True)
+    monkeypatch.setattr(settings, "EXTRACTION_BACKENDS", "slow,fast,new,scan")
+    monkeypatch.setattr(settings, "EXTRACTION_MIN_SAMPLES", 5)
+    monkeypatch.setattr(settings, "EXTRACTION_EXPLORE_RATE", 0.0)
+    return eb
+
+
+def _stats(runs, chars_per_second, success_rate=1.0):
+    return {
+        "runs": runs,
+        "chars_per_second": chars_per_second,
+        "chars_per_page": 2000.0,
+        "success_rate": success_rate,
+    }
+
+
+def _names(order):
+    return [b.name for b in order]
+
+
+def test_fastest_reliable_backend_goes_first(backends):
+    stats = {
+        "slow": _stats(10, 1000.0),
+        "fast": _stats(10, 9000.0),
+        "new": _stats(2, 50000.0),  # Too few runs to rank
+    }
+
+    assert _names(backends.select_backends(stats)) == ["fast", "slow", "new", "scan"]
+
+
+def test_unreliable_backend_is_not_ranked(backends):
+    stats = {"slow": _stats(10, 1000.0), "fast": _stats(10, 9000.0, 0.5)}
+
+    assert _names(backends.select_backends(stats))[:2] == ["slow", "fast"]
+
+
+def test_explore_puts_an_undersampled_backend_first(backends, monkeypatch):
+    monkeypatch.setattr(backends.settings, "EXTRACTION_EXPLORE_RATE", 1.0)
+    stats = {"slow": _stats(10, 1000.0), "fast": _stats(10, 9000.0)}
+
+    firsts = {
+        backends.select_backends(stats, random.Random(seed))[0].name
+        for seed in range(20)
+    }
+
+    # "scan" has a time limit of its own (OCR) and is never explored
+    assert firsts == {"new"}
+
+
+def test_no_exploring_once_every_backend_has_samples(backends, monkeypatch):
+    monkeypatch.setattr(backends.settings, "EXTRACTION_EXPLORE_RATE", 1.0)
+    stats = {name: _stats(10, 1000.0) for name in ("slow", "fast", "new", "scan")}
+    stats["fast"]["chars_per_second"] = 9000.0
+
+    assert backends.select_backends(stats, random.Random(0))[0].name == "fast"
+
+
+def test_stats_decay_towards_recent_runs(backends):
+    stats = backends.BackendStats()
+    stats.record("text-short", "fast", 1.0, 1000, 1, True)
+    stats.record("text-short", "fast", 1.0, 2000, 1, False)
+
+    fast = stats.read("text-short")["fast"]
+    assert fast["runs"] == 2
+    assert fast["chars_per_second"] == pytest.approx(1200.0)
+    assert fast["success_rate"] == pytest.approx(0.8)
+
+
+def test_redis_stats_match_the_in_process_ones(backends):
+    fakeredis = pytest.importorskip("fakeredis")
+    local = backends.BackendStats()
+    shared = backends.RedisBackendStats(fakeredis.FakeRedis(decode_responses=True))
+    runs = [(2.0, 8000, 4, True), (1.0, 500, 4, False), (0.5, 6000, 4, True)]
+    for seconds, chars, pages, ok in runs:
+        for stats in (local, shared):
+            stats.record("text-short", "fast", seconds, chars, pages, ok)
+
+    assert shared.read("text-short") == local.read("text-short")
+
+
+def test_document_class_from_pages_or_size(backends):
+    assert backends.document_class(3, 60_000) == "text-short"
+    assert backends.document_class(80, 80 * 500_000) == "image-long"
+    assert backends.document_class(None, 5 * 1048576) == "bytes-medium"
+
+
+def test_batch_page_count_is_the_successful_engines(backends, monkeypatch, tmp_path):
+    from app.services.batch import extract_file
+
+    class Broken(backends.ExtractionBackend):
+        name = "broken"
+
+        def iter_pages(self, file_path, tables, deadline=None):
+            yield "garbled"
+            yield "garbled"
+            raise ValueError("bad xref")
+
+    class Working(backends.ExtractionBackend):
+        name = "working"
+
+        def iter_pages(self, file_path, tables, deadline=None):
+            for n in range(3):
+                yield f"Page {n} of the agreement. " * 20
+
+    backends.register_backend(Broken())
+    backends.register_backend(Working())
+    monkeypatch.setattr(backends.settings, "EXTRACTION_BACKENDS", "broken,working")
+    monkeypatch.setattr(backends.settings, "TABLE_EXTRACTION", False)
+    path = tmp_path / "contract.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    assert extract_file(str(path))["pages"] == 3
@@ -0,0 +1,100 @@
+"""
+Compact missing-field and confidence codes, and the bit-test search filter
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "field_codes")
+
+from app.services.field_codes import (  # noqa: E402
+    CONFIDENCE_SECTIONS,
+    MISSING_FIELDS,
+    compact_scores,
+    confidence_levels,
+    decode_confidence,
+    decode_missing,
+    encode_confidence,
+    encode_missing,
+    expand_scores,
+    missing_labels,
+    missing_mask,
+)
+
+
+def test_every_label_the_scorer_reports_has_a_code():
+    from app.services.scoring import ContractScorer
+
+    result = ContractScorer().calculate_score({})
+
+    mask, unregistered = encode_missing(result["missing_fields"])
+    assert unregistered == []
+    assert decode_missing(mask) == result["missing_fields"]
+
+
+def test_missing_round_trip_keeps_unregistered_labels():
+    labels = [MISSING_FIELDS[0][1], MISSING_FIELDS[-1][1], "New: Field"]
+
+    stored = compact_scores({"overall_score": 40, "missing_fields": labels})
+
+    assert stored["missing_mask"] == 1 | 1 << (len(MISSING_FIELDS) - 1)
+    assert stored["missing_fields"] == ["New: Field"]
+    assert missing_labels(stored) == labels
+
+
+def test_confidence_round_trip():
+    levels = {"financial_details": "very_low", "account_information": "high"}
+
+    code = encode_confidence({**levels, "unknown_section": "high"})
+
+    assert decode_confidence(code) == levels
+    assert code < 1 << (3 * len(CONFIDENCE_SECTIONS))
+
+
+def test_expand_is_the_inverse_of_compact():
+    from app.services.scoring import ContractScorer
+
+    scored = ContractScorer().calculate_score({})
+    parsed = {
+        "overall_score": scored["overall_score"],
+        "missing_fields": scored["missing_fields"],
+        "confidence_levels": scored["confidence_levels"],
+    }
+
+    stored = compact_scores(parsed)
+
+    assert "confidence_levels" not in stored
+    assert expand_scores(stored) == parsed
+
+
+def test_uncompacted_documents_still_read():
+    legacy = {"missing_fields": ["Old: Label"], "confidence_levels": {"a": "low"}}
+
+    assert missing_labels(legacy) == ["Old: Label"]
+    assert confidence_levels(legacy) == {"a": "low"}
+
+
+def test_missing_filter_matches_the_stored_codes():
+    mongomock = pytest.importorskip("mongomock")
+    from app.services.search import build_search_query, search_fields
+
+    contracts = mongomock.MongoClient()["field_codes"].contracts
+    for labels in (
+        ["Financial Details: Currency", "Payment Structure: Bank Details"],
+        ["Financial Details: Currency"],
+    ):
+        parsed = compact_scores({"missing_fields": labels})
+        contract_id = contracts.insert_one({"parsed_data": parsed}).inserted_id
+        contracts.update_one({"_id": contract_id}, {"$set": search_fields(parsed)})
+
+    query = build_search_query(missing=["currency", "bank_details"])
+
+    assert query["search.missing"] == {"$all": ["currency", "bank_details"]}
+    assert contracts.count_documents(query) == 1
+
+
+def test_unknown_missing_code():
+    with pytest.raises(ValueError):
+        missing_mask(["not_a_field"])
@@ -0,0 +1,76 @@
+"""
+Cold-start checks for the API and worker entry points
+
+Each entry point is imported in a fresh interpreter, so the numbers cover
+everything it pulls in. The module checks catch the structural regressions
+(the API loading the extraction stack, a worker loading FastAPI) on any
+machine; the time budgets are generous multiples of the current figures
+and can be tightened per environment with IMPORT_BUDGET_SCALE.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_SCALE = float(os.getenv("IMPORT_BUDGET_SCALE", "1"))
+
+API_BUDGET_SECONDS = 1.5 * BUDGET_SCALE
+WORKER_BUDGET_SECONDS = 1.0 * BUDGET_SCALE
+
+# Loaded on first use by the API, never at import
+API_DEFERRED = [
+    "celery",
+    "pdfplumber",
+    "PyPDF2",
+    "pyarrow",
+    "app.worker",
+    "app.services.parser",
+    "app.utils.llm_client",
+]
+WORKER_EXCLUDED = ["fastapi", "starlette", "app.main"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+
+def _import(module, modules, runs=3):
+    """Best of `runs` cold imports: (seconds, [probed modules loaded], stdout)"""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("MONGO_DB", "import_time")
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, modules=modules)],
+            cwd=BACKEND,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        lines = result.stdout.strip().splitlines()
+        report = json.loads(lines[-1])
+        if best is None or report["seconds"] < best[0]:
+            best = (report["seconds"], report["loaded"], lines[:-1])
+    return best
+
+
+def test_api_import_skips_extraction_stack():
+    seconds, loaded, output = _import("app.main", API_DEFERRED)
+    assert loaded == []
+    assert output == [], "importing the API should not print"
+    assert seconds < API_BUDGET_SECONDS, f"app.main imported in {seconds:.3f}s"
+
+
+def test_worker_import_skips_fastapi():
+    seconds, loaded, output = _import("app.worker", WORKER_EXCLUDED)
+    assert loaded == []
+    assert output == [], "importing the worker should not print"
+    assert seconds < WORKER_BUDGET_SECONDS, f"app.worker imported in {seconds:.3f}s"
@@ -0,0 +1,76 @@
+"""
+Streamed LLM output: sections reported as they complete, and the repair of
+fenced or truncated responses
+"""
+
+import json
+
+from app.utils.json_stream import SectionStreamParser, repair_json
+
+RESPONSE = {
+    "party_identification": {"customer": {"name": "Acme {Holdings}, Inc."}},
+    "financial_details": {"line_items": [{"description": "Setup [once]"}]},
+    "sla_terms": {"uptime_guarantee": "99.9%", "note": 'quoted \\" and }'},
+}
+
+
+def _stream(text, size):
+    reported = []
+    parser = SectionStreamParser(lambda key, value: reported.append((key, value)))
+    for start in range(0, len(text), size):
+        parser.feed(text[start : start + size])
+    return parser, reported
+
+
+def test_sections_are_reported_as_they_complete():
+    text = "```json\n" + json.dumps(RESPONSE, indent=2) + "\n```"
+
+    for size in (1, 7, len(text)):
+        parser, reported = _stream(text, size)
+        assert reported == list(RESPONSE.items())
+        assert parser.sections == RESPONSE
+        assert parser.text == text
+
+
+def test_a_section_is_reported_before_the_next_one_arrives():
+    text = json.dumps(RESPONSE)
+    cut = text.index('"financial_details"')
+
+    parser, reported = _stream(text[:cut], 5)
+
+    assert [key for key, _ in reported] == ["party_identification"]
+
+
+def test_braces_inside_strings_do_not_end_a_section():
+    text = json.dumps({"a": {"b": "} ] {"}, "c": 1})
+
+    _, reported = _stream(text, 3)
+
+    assert reported == [("a", {"b": "} ] {"}), ("c", 1)]
+
+
+def test_repair_ignores_fences_and_commentary():
+    text = "Here you go:\n```json\n" + json.dumps(RESPONSE) + "\n```\nDone."
+
+    assert repair_json(text) == RESPONSE
+
+
+def test_repair_keeps_the_members_before_a_truncation():
+    text = json.dumps(RESPONSE)
+    cut = text.index("99.9%")
+
+    data = repair_json(text[:cut])
+
+    assert data["party_identification"] == RESPONSE["party_identification"]
+    assert data["financial_details"] == RESPONSE["financial_details"]
+    assert "uptime_guarantee" not in data.get("sla_terms", {})
+
+
+def test_repair_drops_a_string_cut_off_mid_way():
+    text = '{"items": [{"a": 1}, {"b": 2}], "note": "unfinis'
+
+    assert repair_json(text) == {"items": [{"a": 1}, {"b": 2}]}
+
+
+def test_repair_without_an_object():
+    assert repair_json("I could not find any contract data.") is None
@@ -0,0 +1,114 @@
+"""
+ContractParser paths that merge LLM output with data from elsewhere
+
+The LLM request is replaced by a canned response, so only the parser's
+own bookkeeping is exercised.
+"""
+
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "parser")
+
+
+@pytest.fixture
+def parser(monkeypatch):
+    from app.config import settings
+    from app.services.parser import ContractParser
+
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    return ContractParser()
+
+
+def _answer(monkeypatch, parser, response: dict) -> list:
+    """Make every LLM request return `response`; returns the prompts sent"""
+    prompts = []
+
+    def request(prompt, prefix, callback):
+        prompts.append(prompt)
+        return json.dumps(response)
+
+    monkeypatch.setattr(parser, "_request_llm", request)
+    return prompts
+
+
+def test_template_reuse_asks_for_fields_the_template_lacks(monkeypatch, parser):
+    template = {
+        "party_identification": {"customer": {"name": "Acme Corp"}},
+        "revenue_classification": {"auto_renewal": True},
+    }
+    prompts = _answer(
+        monkeypatch,
+        parser,
+        {
+            "sla_terms": {"penalties": [{"condition": "Uptime below 99%"}]},
+            "revenue_classification": {"auto_renewal": False},
+        },
+    )
+
+    data = parser.parse_contract(
+        "Agreement with Acme Corp. A 10% credit applies if uptime is below 99%.",
+        template=template,
+    )
+
+    fields = prompts[0].split("the rest are known:")[1]
+    assert "sla_terms.penalties" in fields
+    assert "revenue_classification.auto_renewal" in fields
+    assert "party_identification.customer.name" not in fields
+    assert data["party_identification"]["customer"]["name"] == "Acme Corp"
+    assert data["sla_terms"]["penalties"] == [{"condition": "Uptime below 99%"}]
+    assert data["revenue_classification"]["auto_renewal"] is False
+
+
+def test_template_values_missing_from_the_text_are_asked_again(monkeypatch, parser):
+    template = {"account_information": {"account_number": "AC-1001"}}
+    prompts = _answer(
+        monkeypatch, parser, {"account_information": {"account_number": "AC-2002"}}
+    )
+
+    data = parser.parse_contract("Account number AC-2002.", template=template)
+
+    assert "account_information.account_number" in prompts[0]
+    assert data["account_information"]["account_number"] == "AC-2002"
+
+
+def test_clause_fragments_collect_list_fields(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.config import settings
+    from app.services.clause_cache import segment_clauses
+    from app.services.parser import ContractParser
+
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "CLAUSE_CACHE", True)
+    parser = ContractParser(fakeredis.FakeRedis(decode_responses=True))
+    text = (
+        "1. Fees. The customer pays for the platform subscription as listed "
+        "in the order form, in USD.\n"
+        "2. Services. Professional services are billed per hour as stated in "
+        "the statement of work.\n"
+    )
+    assert len(segment_clauses(text)) == 2
+    platform = {"description": "Platform", "total": 1200}
+    services = {"description": "Services", "total": 300}
+    _answer(
+        monkeypatch,
+        parser,
+        {
+            "c0": {"financial_details": {"currency": "USD", "line_items": [platform]}},
+            "c1": {
+                "financial_details": {
+                    "currency": "EUR",
+                    "line_items": [platform, services],
+                }
+            },
+        },
+    )
+
+    data = parser.parse_contract(text)
+
+    financial = data["financial_details"]
+    assert financial["line_items"] == [platform, services]
+    assert financial["currency"] == "USD"
@@ -0,0 +1,131 @@
+"""
+Rule extractor and the tiered extraction built on it: sections the rules
+complete never reach the LLM
+"""
+
+import json
+import os
+
+import pytest
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "rules")
+
+CONTRACT = """MASTER SERVICES AGREEMENT
+This agreement is made between Acme Corp. ("Customer") and Globex Inc. ("Vendor").
+Customer Signatory: Jane Doe, Chief Financial Officer
+Vendor Signatory: John Roe, VP Sales
+Customer Address: 1 Main St, Springfield
+Vendor Address: 9 Side Rd, Shelbyville
+Account number: AC-1001
+Billing contact: Ann Lee
+Billing email: billing@acme.test
+Technical contact: Bob Ray
+Technical email: ops@acme.test
+Platform subscription: 5 x $1,200.00 = $6,000.00
+Implementation: 1 x $500.00 = $500.00
+Subtotal: $6,500.00
+Tax rate: 8%
+Tax amount: $520.00
+Total: $7,020.00
+All amounts in USD, billed monthly. Setup fee invoiced once.
+{payment}
+This agreement automatically renews for successive one-year terms.
+Vendor guarantees 99.9% uptime with 4 hours response time and 24/7 support.
+Service credits of 10% apply if monthly uptime falls below 99.9%.
+"""
+PAYMENT = """Payment is due Net 30 by wire transfer. First invoice due on 2026-01-15.
+Bank name: First Bank
+Routing number: 123456789"""
+
+
+@pytest.fixture
+def parser(monkeypatch):
+    from app.config import settings
+    from app.services.parser import ContractParser
+
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "EXTRACTION_MODE", "tiered")
+    monkeypatch.setattr(settings, "RULES_MIN_CONFIDENCE", "high")
+    return ContractParser()
+
+
+def _answer(monkeypatch, parser, response: dict) -> list:
+    """Make every LLM request return `response`; returns the prompt prefixes"""
+    prefixes = []
+
+    def request(prompt, prefix, callback):
+        prefixes.append(prefix)
+        return json.dumps(response)
+
+    monkeypatch.setattr(parser, "_request_llm", request)
+    return prefixes
+
+
+def test_rules_read_the_standard_wording():
+    from app.services.rule_extractor import RuleExtractor
+
+    data = RuleExtractor().extract(CONTRACT.format(payment=PAYMENT))
+
+    customer = data["party_identification"]["customer"]
+    assert customer["name"] == "Acme Corp."
+    assert customer["legal_entity"] == "Corporation"
+    assert customer["signatory_role"] == "Chief Financial Officer"
+    financial = data["financial_details"]
+    assert [item["total"] for item in financial["line_items"]] == [6000.0, 500.0]
+    assert financial["total_value"] == 7020.0
+    assert financial["currency"] == "USD"
+    assert data["payment_structure"]["payment_terms"] == "Net 30"
+    assert data["payment_structure"]["due_dates"] == ["2026-01-15"]
+    assert data["revenue_classification"]["billing_cycle"] == "monthly"
+    assert data["revenue_classification"]["has_one_time"] is True
+    assert data["sla_terms"]["uptime_guarantee"] == "99.9%"
+    assert data["sla_terms"]["penalties"][0]["penalty"] == "10% credit"
+
+
+def test_unlabelled_total_is_left_to_the_llm(monkeypatch, parser):
+    text = CONTRACT.format(payment=PAYMENT).replace(
+        "Total: $7,020.00", "Liability is capped at $1,000,000.00."
+    )
+    prefixes = _answer(
+        monkeypatch, parser, {"financial_details": {"total_value": 7020.0}}
+    )
+
+    data = parser.parse_contract(text)
+
+    assert len(prefixes) == 1
+    assert '"financial_details"' in prefixes[0]
+    assert data["financial_details"]["total_value"] == 7020.0
+
+
+def test_complete_rules_skip_the_llm(monkeypatch, parser):
+    prompts = _answer(monkeypatch, parser, {})
+
+    data = parser.parse_contract(CONTRACT.format(payment=PAYMENT))
+
+    assert prompts == []
+    assert data["payment_structure"]["payment_method"] == "Wire transfer"
+
+
+def test_llm_is_asked_only_for_incomplete_sections(monkeypatch, parser):
+    prompts = _answer(
+        monkeypatch,
+        parser,
+        {
+            "payment_structure": {
+                "payment_terms": "Net 45",
+                "payment_method": "ACH",
+                "due_dates": ["2026-02-01"],
+            },
+            "sla_terms": {"uptime_guarantee": "50%"},
+        },
+    )
+
+    data = parser.parse_contract(CONTRACT.format(payment=""))
+
+    assert len(prompts) == 1
+    assert '"payment_structure"' in prompts[0]
+    assert '"sla_terms"' not in prompts[0]
+    assert data["payment_structure"]["payment_terms"] == "Net 45"
+    # Sections the rules completed keep the rules' values
+    assert data["sla_terms"]["uptime_guarantee"] == "99.9%"
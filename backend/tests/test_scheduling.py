@@ -0,0 +1,55 @@
+"""
+Priorities at enqueue: size classes and per-tenant fair share
+"""
+
+import asyncio
+import os
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "scheduling")
+
+from app.config import settings  # noqa: E402
+from app.services.scheduling import assign_priority, fair_share_penalty  # noqa: E402
+
+
+def _uploads(order):
+    """Priorities assigned to (tenant, pages) uploads in this order"""
+
+    async def run():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        return [
+            (await assign_priority(redis, tenant, pages, 50_000))[1]
+            for tenant, pages in order
+        ]
+
+    return asyncio.run(run())
+
+
+def test_flooding_tenant_is_demoted_before_a_second_tenant_arrives(monkeypatch):
+    monkeypatch.setattr(settings, "TENANT_FAIR_SHARE_SLOTS", 4)
+
+    priorities = _uploads([("bulk", 2)] * 50 + [("other", 3)])
+
+    bulk, nda = priorities[:-1], priorities[-1]
+    assert nda == 0
+    # Only the bulk tenant's first slots stay ahead of the NDA (FIFO at 0)
+    assert bulk.count(0) == 4
+    assert bulk[4:8] == [1] * 4
+    assert max(bulk) == 3
+
+
+def test_size_class_still_orders_a_single_upload():
+    assert _uploads([("a", 2), ("b", 30), ("c", 200)]) == [0, 3, 6]
+
+
+def test_tenant_over_its_share_of_a_busy_pipeline(monkeypatch):
+    monkeypatch.setattr(settings, "TENANT_FAIR_SHARE_SLOTS", 100)
+
+    assert fair_share_penalty(1, 10, 2) == 0
+    assert fair_share_penalty(9, 10, 2) == 1
+    assert fair_share_penalty(30, 32, 2) == 1
+    assert fair_share_penalty(30, 33, 3) == 2
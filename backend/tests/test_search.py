@@ -0,0 +1,121 @@
+"""
+Search cursors and keyset pages: every contract appears once, in
+(sort value, _id) order, also when sort values repeat
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "search")
+
+from app.services.search import (  # noqa: E402
+    SORT_FIELDS,
+    apply_cursor,
+    build_search_query,
+    decode_cursor,
+    encode_cursor,
+    page_items,
+)
+
+
+@pytest.mark.parametrize(
+    "value", [datetime(2026, 3, 1, 12, 30, 15, 250000), 1234.5, 80, "usd"]
+)
+def test_cursor_round_trip(value):
+    contract_id = ObjectId()
+
+    assert decode_cursor(encode_cursor(value, contract_id)) == (value, contract_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(1, "x" * 24)])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_bounds_keep_ties_on_the_next_page():
+    last_id = ObjectId()
+    cursor = encode_cursor(100.0, last_id)
+
+    query = apply_cursor(
+        {"status": "completed"}, SORT_FIELDS["total_value"], -1, cursor
+    )
+
+    path = SORT_FIELDS["total_value"]
+    assert query["status"] == "completed"
+    assert query["$and"] == [
+        {path: {"$ne": None}},
+        {"$or": [{path: {"$lt": 100.0}}, {path: 100.0, "_id": {"$lt": last_id}}]},
+    ]
+
+
+@pytest.mark.parametrize("sort", ["uploaded_at", "total_value"])
+def test_pages_cover_every_contract_once(sort):
+    mongomock = pytest.importorskip("mongomock")
+    contracts = mongomock.MongoClient()["search"].contracts
+    start = datetime(2026, 1, 1)
+    for i in range(23):
+        contracts.insert_one(
+            {
+                "status": "completed",
+                "uploaded_at": start + timedelta(hours=i // 4),  # Ties
+                "parsed_data": {"financial_details": {"total_value": float(i % 5)}},
+            }
+        )
+    contracts.insert_one({"status": "completed", "uploaded_at": start})  # No total
+    path = SORT_FIELDS[sort]
+    expected = [
+        c["_id"]
+        for c in contracts.find(apply_cursor({}, path, -1, None)).sort(
+            [(path, -1), ("_id", -1)]
+        )
+    ]
+
+    seen, cursor = [], None
+    while True:
+        query = apply_cursor(build_search_query(status="completed"), path, -1, cursor)
+        rows = list(contracts.find(query).sort([(path, -1), ("_id", -1)]).limit(6))
+        items, cursor = page_items(rows, 5, path)
+        seen += [c["_id"] for c in items]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    assert len(seen) == (24 if sort == "uploaded_at" else 23)
+
+
+def test_range_filters():
+    query = build_search_query(min_total=10, max_score=80, vendor=" Acme ")
+
+    assert query[SORT_FIELDS["total_value"]] == {"$gte": 10}
+    assert query[SORT_FIELDS["overall_score"]] == {"$lte": 80}
+    assert query["search.vendor"] == {"$regex": "^acme"}
+
+
+def test_filter_values_are_stored_and_queried_normalized():
+    mongomock = pytest.importorskip("mongomock")
+    from app.services.search import search_fields
+
+    contracts = mongomock.MongoClient()["search"].contracts
+    for currency, cycle in (("usd", "Monthly"), (" USD ", "monthly"), ("EUR", None)):
+        parsed = {
+            "financial_details": {"currency": currency},
+            "revenue_classification": {"billing_cycle": cycle},
+        }
+        contract_id = contracts.insert_one({"parsed_data": parsed}).inserted_id
+        contracts.update_one({"_id": contract_id}, {"$set": search_fields(parsed)})
+
+    query = build_search_query(currency="Usd", billing_cycle="MONTHLY")
+
+    assert contracts.count_documents(query) == 2
+    assert contracts.find_one({"search.billing_cycle": None})["search"] == {
+        "vendor": None,
+        "customer": None,
+        "currency": "EUR",
+        "billing_cycle": None,
+        "missing": [],
+    }
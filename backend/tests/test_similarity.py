@@ -0,0 +1,53 @@
+"""
+MinHash signatures of long contracts (shingle sampling past the cap)
+"""
+
+import os
+import random
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "similarity")
+
+
+def _words(count, seed=0):
+    rng = random.Random(seed)
+    return [f"w{rng.randrange(5000)}" for _ in range(count)]
+
+
+def test_sampled_signature_still_finds_near_duplicates(monkeypatch):
+    from app.services import similarity
+
+    monkeypatch.setattr(similarity.settings, "MINHASH_MAX_SHINGLES", 1024)
+    words = _words(20000)
+    edited = list(words)
+    for i in range(0, len(edited), 200):
+        edited[i] = "amended"
+
+    original = similarity.minhash_signature(" ".join(words))
+    near = similarity.minhash_signature(" ".join(edited))
+    other = similarity.minhash_signature(" ".join(_words(20000, seed=1)))
+
+    # 2.5% of the shingles differ
+    assert similarity.estimate_similarity(original, near) > 0.85
+    assert similarity.estimate_similarity(original, other) < 0.1
+    assert similarity.minhash_signature(" ".join(words)) == original
+
+
+def test_short_contracts_are_signed_in_full(monkeypatch):
+    from app.services import similarity
+
+    text = " ".join(_words(500))
+    signature = similarity.minhash_signature(text)
+    monkeypatch.setattr(similarity.settings, "MINHASH_MAX_SHINGLES", 10**6)
+
+    assert similarity.minhash_signature(text) == signature
+
+
+def test_index_is_kept_without_template_reuse(monkeypatch):
+    from app.services import similarity
+
+    monkeypatch.setattr(similarity.settings, "TEMPLATE_REUSE", False)
+    assert similarity.similarity_enabled()
+
+    monkeypatch.setattr(similarity.settings, "SIMILARITY_INDEX", False)
+    assert not similarity.similarity_enabled()
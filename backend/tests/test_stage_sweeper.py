@@ -0,0 +1,118 @@
+"""
+Stage leases and the sweeper for contracts stranded by a dead worker
+
+The worker module runs against mongomock and fakeredis; nothing is sent
+to a broker (the pipeline is idle, so no deferred upload is released).
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("fakeredis")
+pytest.importorskip("mongomock")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "sweeper")
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    import fakeredis
+    import mongomock
+
+    import app.worker as worker
+
+    db = mongomock.MongoClient()["sweeper"]
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(worker, "get_sync_db", lambda: db)
+    monkeypatch.setattr(worker, "get_sync_redis", lambda: redis)
+    monkeypatch.setattr(worker, "_release_deferred", lambda redis: None)
+    return worker, db, redis
+
+
+def _processing(db, redis, tenant="acme", started=None):
+    from app.services.scheduling import TENANT_INFLIGHT_KEY
+
+    contract_id = db.contracts.insert_one(
+        {
+            "status": "processing",
+            "tenant_id": tenant,
+            "started_at": started or datetime.utcnow(),
+        }
+    ).inserted_id
+    redis.hincrby(TENANT_INFLIGHT_KEY, tenant, 1)
+    return str(contract_id)
+
+
+def test_expired_lease_fails_contract_and_frees_slot(worker):
+    from app.services.scheduling import TENANT_INFLIGHT_KEY
+    from app.services.stage_leases import LEASES_KEY, take_lease
+
+    worker, db, redis = worker
+    contract_id = _processing(db, redis)
+    take_lease(redis, contract_id, "extract", -1)
+
+    worker.sweep_stale_contracts_task()
+
+    contract = db.contracts.find_one()
+    assert contract["status"] == "failed"
+    assert "extract" in contract["error"]
+    assert redis.hget(TENANT_INFLIGHT_KEY, "acme") is None
+    assert redis.zcard(LEASES_KEY) == 0
+
+
+def test_running_stage_is_left_alone(worker):
+    from app.services.stage_leases import take_lease
+
+    worker, db, redis = worker
+    contract_id = _processing(db, redis, started=datetime.utcnow() - timedelta(days=1))
+    take_lease(redis, contract_id, "llm", 60)
+
+    worker.sweep_stale_contracts_task()
+
+    assert db.contracts.find_one()["status"] == "processing"
+
+
+def test_backstop_fails_processing_without_a_stage(worker):
+    worker, db, redis = worker
+    _processing(db, redis, started=datetime.utcnow() - timedelta(days=1))
+    _processing(db, redis, tenant="other")
+
+    worker.sweep_stale_contracts_task()
+
+    statuses = sorted(c["status"] for c in db.contracts.find())
+    assert statuses == ["failed", "processing"]
+
+
+def test_gevent_hard_limit_counts_as_time_limit(worker):
+    gevent = pytest.importorskip("gevent")
+    worker, _, _ = worker
+
+    assert worker._is_time_limit(gevent.Timeout(1))
+    assert not worker._is_time_limit(KeyboardInterrupt())
+
+
+def test_lease_expires_after_its_seconds(worker):
+    from app.services.stage_leases import expired_leases, take_lease
+
+    worker, _, redis = worker
+    take_lease(redis, "c1", "score", 5)
+
+    assert expired_leases(redis) == []
+    assert expired_leases(redis, now=time.time() + 10) == [("c1", "score")]
+
+
+def test_failure_of_a_cancelled_contract_leaves_its_status(worker):
+    from app.services.status_cache import status_key, write_status
+
+    worker, db, redis = worker
+    contract_id = str(db.contracts.insert_one({"status": "cancelled"}).inserted_id)
+    write_status(redis, contract_id, status="cancelled")
+
+    worker._mark_failed(contract_id, RuntimeError("boom"), "llm")
+
+    assert db.contracts.find_one()["status"] == "cancelled"
+    assert redis.hget(status_key(contract_id), "status") == "cancelled"
@@ -0,0 +1,102 @@
+"""
+Stage traces: carried down the chain and stored with the final write
+
+The worker module runs against mongomock and fakeredis; the stages before
+scoring are represented by the fragments they would have passed on.
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("fakeredis")
+pytest.importorskip("mongomock")
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB", "tracing")
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    import fakeredis
+    import mongomock
+
+    import app.worker as worker
+
+    db = mongomock.MongoClient()["tracing"]
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(worker, "get_sync_db", lambda: db)
+    monkeypatch.setattr(worker, "get_sync_redis", lambda: redis)
+    monkeypatch.setattr(worker, "_release_deferred", lambda redis: None)
+    return worker, db
+
+
+def _contract(db):
+    return str(
+        db.contracts.insert_one(
+            {
+                "status": "processing",
+                "tenant_id": "acme",
+                "uploaded_at": datetime.utcnow(),
+                "started_at": datetime.utcnow(),
+            }
+        ).inserted_id
+    )
+
+
+def _earlier_stages(contract_id):
+    from app.utils.tracing import StageTrace
+
+    extract = StageTrace("extract")
+    extract.add_pages([{"page": 1, "seconds": 0.01}])
+    return [extract.finish(contract_id), StageTrace("llm").finish(contract_id)]
+
+
+def test_trace_is_written_with_the_completed_update(worker):
+    worker, db = worker
+    contract_id = _contract(db)
+
+    payload = {
+        "contract_id": contract_id,
+        "parsed_data": {},
+        "trace": _earlier_stages(contract_id),
+    }
+    worker.score_contract_task(payload)
+    worker.score_contract_task(payload)  # Redelivered
+
+    contract = db.contracts.find_one()
+    assert contract["status"] == "completed"
+    stages = [stage["stage"] for stage in contract["trace"]["stages"]]
+    assert stages == ["extract", "llm", "score"]
+    assert contract["trace"]["pages"] == [{"page": 1, "seconds": 0.01}]
+
+
+def test_failed_stage_adds_its_error_to_the_trace(worker):
+    from app.utils.tracing import StageTrace
+
+    worker, db = worker
+    contract_id = _contract(db)
+    score = StageTrace("score")
+    score.finish(contract_id)
+
+    traces = _earlier_stages(contract_id) + [score.finish(contract_id, "boom")]
+    worker._mark_failed(contract_id, RuntimeError("boom"), "score", traces)
+
+    contract = db.contracts.find_one()
+    assert contract["status"] == "failed"
+    assert contract["trace"]["stages"][-1]["error"] == "boom"
+    assert len(contract["trace"]["stages"]) == 3
+
+
+def test_second_profiled_stage_in_a_thread_runs_unprofiled():
+    from app.utils.tracing import StageTrace
+
+    first = StageTrace("llm", profile=True)
+    try:
+        second = StageTrace("llm", profile=True)
+        assert first.profiler is not None
+        assert second.profiler is None
+        second.finish("c2")
+    finally:
+        first.profiler.stop()